@@ -22,6 +22,7 @@ from .lib.util.inout import read_crv
 from .lib.util.seq import get_lifter
 from .lib.util.seq import liftover
 from .lib.util.seq import get_wgs_reader
+from .lib.util.seq import get_cached_wgs_reader
 from .cli import CliOuter
 import signal
 
@@ -145,5 +146,5 @@ _ = (
 _ = CravatFilter or Cravat
 _ = cli or wgs
 _ = stdouter
-_ = get_lifter or liftover or get_wgs_reader
+_ = get_lifter or liftover or get_wgs_reader or get_cached_wgs_reader
 _ = get_df_from_db or read_crv
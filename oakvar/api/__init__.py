@@ -60,6 +60,8 @@ def run(
     mapper_name: List[str] = [],
     postaggregators: List[str] = [],
     vcf2vcf: bool = False,
+    bgzip: bool = False,
+    tabix: bool = False,
     logtofile: bool = False,
     loglevel: str = "INFO",
     combine_input: bool = False,
@@ -68,6 +70,15 @@ def run(
     ignore_sample: bool = False,
     uid: Optional[str] = None,
     skip_variant_deduplication: bool=False,
+    regions: Optional[List[str]] = None,
+    scatter: Optional[int] = None,
+    scatter_by: str = "chrom",
+    shard: Optional[List[str]] = None,
+    gather: Optional[str] = None,
+    profile: Optional[str] = None,
+    resume: bool = False,
+    annotation_cache: bool = False,
+    add_annotators: List[str] = [],
     loop=None,
     outer=None,
 ) -> Optional[Dict[str, Any]]:
@@ -80,6 +91,8 @@ def run(
         report_types (Union[str, List[str]]): Report types. If given, report files of given types will be generated. If `vcfreporter` is installed in your system, giving `vcf` will invoke the module.
         clean (bool): Cleans all output and intermediate files and then starts the pipeline.
         vcf2vcf (bool): If True, the pipeline will run in vcf2vcf mode, where input and output should be VCF format files and result database files will not be generated. This can increase the speed of the pipeline significantly.
+        bgzip (bool): If True, vcf2vcf output files will be written as bgzip-compressed VCF files. Gzip-compressed inputs always give bgzip-compressed outputs.
+        tabix (bool): If True, vcf2vcf output files will be bgzip-compressed and indexed with tabix. Outputs should be sorted by position for the index to be written.
         logtofile (bool): If True, .log and .err log files will be generated for normal and error logs.
         input_format (Optional[str]): Overrides automatic detection of input file format.
         postaggregators (List[str]): Postaggregator modules to run
@@ -117,6 +130,15 @@ def run(
         loglevel (str): loglevel
         uid (Optional[str]): uid
         skip_variant_deduplication (bool): Skip de-duplication of variants.
+        regions (Optional[List[str]]): Only the variants overlapping these regions will be analyzed. Regions can be given as `chr1` or `chr1:10000-20000` (1-based and inclusive), comma-separated lists of them, or paths to BED files. Only VCF and OakVar (cravat) format inputs are supported. An offset index of each input is built on the first use and cached as `<input>.ovidx` next to the input.
+        scatter (Optional[int]): If given, the input is split into this number of shards and a scatter manifest, `<run_name>.scatter.json`, is written to the output directory instead of running the pipeline. Each shard can then run on a separate node with `shard` and the shard results are put together with `gather`.
+        scatter_by (str): How to split the input with `scatter`. `chrom` keeps each chromosome in one shard. `size` also splits chromosomes to make shards of about the same number of variants and needs a sorted input, but a gene can span two shards, so size cannot be used with gene-level annotators or postaggregators or with modules which summarize by gene.
+        shard (Optional[List[str]]): A scatter manifest path and a shard number, starting from 1. The shard is run from conversion to post-aggregation with the arguments of the original run. `inputs` and `output_dir`, if given, override those in the manifest.
+        gather (Optional[str]): A scatter manifest path. The result databases of the shards are merged into `<run_name>.sqlite` with consistent uids, and the reports of the original run are made. `output_dir`, if given, is where the shard results are and the gathered results will be.
+        profile (Optional[str]): `cprofile` or `pyinstrument`. If given, the converter and each module are run under the profiler and the profiles are written to the output directory as `<run_name>.<module>.prof` for `cprofile` or `<run_name>.<module>.html` for `pyinstrument`, which falls back to `cprofile` if not installed. Wall and CPU times, peak memory and row counts of each stage and module are written to the `metrics` table of the result database and to `<run_name>.metrics.json` regardless.
+        resume (bool): If True, checkpoints of the stages and modules of the run are kept in `<run_name>.checkpoint.json` with the sizes and hashes of their output files and the versions and options of the modules which made them. When a run is started again with `resume`, the stages and modules whose outputs are unchanged and whose inputs, modules and options are the same are skipped, and only the invalidated work is done again.
+        annotation_cache (bool): If True, variant-level annotators look up their outputs in a shared on-disk cache keyed by the module version and options and the variant (chrom, pos, ref, alt), and only annotate the variants which are not in the cache. The cache is in `annotation_cache` under the root directory, or in `annotation_cache_dir` of the system configuration, and its oldest entries are evicted beyond `annotation_cache_max_entries` per module. Only modules with `annotation_cache: true` in their yml files which do not override `summarize_by_gene` or `postprocess` are cached.
+        add_annotators (List[str]): Annotators to add to the result databases (.sqlite) given as `inputs`. Variant and gene rows are read from the result databases, only these annotators, their secondary annotators and the postaggregators in the result databases which require them are run, and only their columns are merged into the result databases. The converter, preparers and mapper are not run.
         loop:
         outer:
 
@@ -129,6 +151,31 @@ def run(
     # nested asyncio
     # nest_asyncio.apply()
     # Custom system conf
+    if shard:
+        from ..lib.util.scatter import get_shard_run_kwargs
+
+        if isinstance(inputs, (str, Path)):
+            inputs = [inputs]
+        if isinstance(output_dir, str):
+            output_dir = [output_dir]
+        shard_kwargs = get_shard_run_kwargs(
+            str(shard[0]),
+            int(shard[1]),
+            inputs=[str(v) for v in inputs] if inputs else None,
+            output_dir=output_dir[0] if output_dir else None,
+        )
+        return run(**shard_kwargs, outer=outer, loop=loop)
+    if gather:
+        from ..lib.util.scatter import gather_shards
+
+        if isinstance(output_dir, str):
+            output_dir = [output_dir]
+        return gather_shards(
+            gather,
+            output_dir=output_dir[0] if output_dir else None,
+            parallel=mp or 1,
+            outer=outer,
+        )
     input_paths: List[str] = []
     if isinstance(inputs, str):
         input_paths = [inputs]
@@ -181,6 +228,8 @@ def run(
         mapper_name=mapper_name,
         postaggregators=postaggregators,
         vcf2vcf=vcf2vcf,
+        bgzip=bgzip,
+        tabix=tabix,
         logtofile=logtofile,
         loglevel=loglevel,
         combine_input=combine_input,
@@ -188,6 +237,13 @@ def run(
         input_encoding=input_encoding,
         ignore_sample=ignore_sample,
         skip_variant_deduplication=skip_variant_deduplication,
+        regions=regions,
+        scatter=scatter,
+        scatter_by=scatter_by,
+        profile=profile,
+        resume=resume,
+        annotation_cache=annotation_cache,
+        add_annotators=add_annotators,
         uid=uid,
         outer=outer,
     )
@@ -215,12 +215,17 @@ def install(
     skip_dependencies: bool = False,
     skip_data: bool = False,
     no_fetch: bool = False,
+    max_workers: Optional[int] = None,
+    max_downloads: Optional[int] = None,
+    max_download_bandwidth: Optional[int] = None,
     outer=None,
     stage_handler=None,
     system_worker_state=None,
 ) -> Optional[bool]:
     """Install modules.
 
+    Store modules and their dependencies are resolved once and installed concurrently.
+
     Args:
         module_names (List[str]): Module names
         urls (Optional[str]): URLs of module zip files. If given, `module_names` also should be given to specify the module name of each URL.
@@ -232,6 +237,9 @@ def install(
         modules_dir (Optional[Path]): custom OakVar modules directory
         skip_dependencies (bool): `True` will bypass installing dependencies.
         clean (bool): clean
+        max_workers (Optional[int]): Number of modules to install at the same time. Defaults to 4.
+        max_downloads (Optional[int]): Number of downloads at the same time across all modules
+        max_download_bandwidth (Optional[int]): Total download bandwidth limit in bytes per second
         stage_handler:
         system_worker_state:
         outer:
@@ -242,7 +250,7 @@ def install(
     import sys
     from .install_defs import get_modules_to_install
     from .install_defs import show_modules_to_install
-    from ...lib.module import install_module
+    from ...lib.module import install_modules
     from ...lib.module import install_module_from_url
     from ...lib.module import install_module_from_zip_path
     from ...lib.util.run import get_y_or_n
@@ -267,10 +275,14 @@ def install(
         if not get_y_or_n():
             return
     problem_modules = []
+    store_module_versions = {}
     for module_name, data in sorted(to_install.items()):
         module_version = data.get("version")
         install_type = data.get("type")
         url = data.get("url")
+        if install_type != "url" and not is_zip_path(module_name):
+            store_module_versions[module_name] = module_version
+            continue
         try:
             if install_type == "url":
                 if not install_module_from_url(
@@ -284,25 +296,11 @@ def install(
                     outer=outer,
                 ):
                     problem_modules.append(module_name)
-            elif is_zip_path(module_name):
+            else:
                 if not install_module_from_zip_path(
                     module_name, force_data=force_data, skip_data=skip_data, outer=outer
                 ):
                     problem_modules.append(module_name)
-            else:
-                ret = install_module(
-                    module_name,
-                    version=module_version,
-                    force_data=force_data,
-                    overwrite=overwrite,
-                    stage_handler=stage_handler,
-                    skip_data=skip_data,
-                    modules_dir=modules_dir,
-                    outer=outer,
-                    system_worker_state=system_worker_state,
-                )
-                if not ret:
-                    problem_modules.append(module_name)
         except Exception as e:
             if not isinstance(e, ModuleToSkipInstallation):
                 if module_name not in problem_modules:
@@ -311,6 +309,22 @@ def install(
                 outer.error(e)
             else:
                 sys.stderr.write(str(e) + "\n")
+    results = install_modules(
+        store_module_versions,
+        max_workers=max_workers,
+        max_downloads=max_downloads,
+        max_download_bandwidth=max_download_bandwidth,
+        stage_handler=stage_handler,
+        outer=outer,
+        force_data=force_data,
+        overwrite=overwrite,
+        skip_data=skip_data,
+        modules_dir=modules_dir,
+        system_worker_state=system_worker_state,
+    )
+    for module_name in sorted(results.keys()):
+        if not results[module_name]:
+            problem_modules.append(module_name)
     if problem_modules:
         if outer:
             outer.write("Following modules were not installed due to problems:")
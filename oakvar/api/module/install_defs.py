@@ -49,15 +49,26 @@ def get_modules_to_install(
                         )
                     continue
         module_install_data[module_name] = {"type": ty, "version": version, "url": url}
-    # dependency
+    # dependency closure
     deps_install = {}
     if not skip_dependencies:
-        for module_name, install_data in module_install_data.items():
-            if not is_url(module_name) and not is_zip_path(module_name):
-                deps, _ = get_install_deps(
-                    module_name=module_name, version=install_data.get("version")
-                )
-                deps_install.update(deps)
+        to_resolve = [
+            (module_name, install_data.get("version"))
+            for module_name, install_data in module_install_data.items()
+            if not is_url(module_name) and not is_zip_path(module_name)
+        ]
+        resolved = set()
+        while to_resolve:
+            module_name, version = to_resolve.pop()
+            if module_name in resolved:
+                continue
+            resolved.add(module_name)
+            deps, _ = get_install_deps(module_name=module_name, version=version)
+            for dep_name, dep_version in deps.items():
+                if dep_name in module_install_data or dep_name in deps_install:
+                    continue
+                deps_install[dep_name] = dep_version
+                to_resolve.append((dep_name, dep_version))
     to_install = module_install_data
     for module_name, version in deps_install.items():
         to_install[module_name] = {"type": "store", "version": version, "url": None}
@@ -1,3 +1,5 @@
+from typing import Any
+from typing import Dict
 from typing import Optional
 from typing import List
 
@@ -169,16 +171,91 @@ def sqliteinfo(dbpaths: List[str] = [], outer=None, fmt: str = "json"):
     return get_sqliteinfo(dbpaths=dbpaths, outer=outer, fmt=fmt)
 
 
-def mergesqlite(dbpaths: List[str] = [], outpath: str = ""):
+def bench(
+    sizes: List[int] = [10000],
+    benchmarks: Optional[List[str]] = None,
+    repeat: int = 3,
+    rundir: Optional[str] = None,
+    outpath: Optional[str] = None,
+    compare: Optional[str] = None,
+    threshold: float = 0.1,
+    keep: bool = False,
+    seed: int = 0,
+    outer=None,
+):
+    """bench.
+
+    Runs benchmarks of the annotation pipeline on synthetic runs. Synthetic
+    input, mapper and annotator files are made for each size, and file
+    reading and writing, aggregation, postaggregation, filtering, reporting,
+    merging of result databases and liftover from hg19 are timed. No
+    installed module is needed.
+
+    Args:
+        sizes (List[int]): Numbers of variants of synthetic runs
+        benchmarks (Optional[List[str]]): Benchmarks to run. All by default.
+        repeat (int): Number of times to run each benchmark. The fastest run is reported.
+        rundir (Optional[str]): Directory to make synthetic runs in. A temporary directory by default.
+        outpath (Optional[str]): Path to write the results as JSON
+        compare (Optional[str]): Path to the results JSON of a previous bench to compare with
+        threshold (float): Slowdown, as a fraction, over which a benchmark is reported as a regression
+        keep (bool): Keep the synthetic runs in the temporary directory
+        seed (int): Random seed of synthetic runs
+        outer:
+
+    Returns:
+        A dict of the results, with `comparison` if `compare` was given.
+    """
+    from json import dump
+    from json import load
+    from ..lib.util.bench import run_benchmarks
+    from ..lib.util.bench import compare_bench_results
+
+    results = run_benchmarks(
+        sizes=sizes,
+        benchmarks=benchmarks,
+        repeat=repeat,
+        rundir=rundir,
+        keep=keep,
+        seed=seed,
+        outer=outer,
+    )
+    if compare:
+        with open(compare) as f:
+            baseline = load(f)
+        results["comparison"] = compare_bench_results(
+            results, baseline, threshold=threshold
+        )
+        if outer:
+            for v in results["comparison"]:
+                mark = " REGRESSION" if v["regression"] else ""
+                outer.write(
+                    f"{v['benchmark']} n={v['size']}: {v['baseline']}s -> "
+                    + f"{v['current']}s (x{v['ratio']}){mark}"
+                )
+    if outpath:
+        with open(outpath, "w") as wf:
+            dump(results, wf, indent=2)
+        if outer:
+            outer.write(f"results written to {outpath}")
+    return results
+
+
+def mergesqlite(dbpaths: List[str] = [], outpath: str = "", parallel: int = 1):
     """mergesqlite.
 
+    Merges result databases into one. Variants are deduplicated by chromosome,
+    position, reference and alternate bases, and samples and mappings of each
+    database are remapped to the merged variant uids.
+
     Args:
         dbpaths (List[str]): dbpaths
         outpath (str): outpath
+        parallel (int): Number of processes for a tree merge. Groups of databases are merged in parallel and then merged together.
     """
     import sqlite3
-    from json import loads, dumps
-    from shutil import copy
+    from os import remove
+    from concurrent.futures import ProcessPoolExecutor
 
     if len(dbpaths) < 2:
         exit("Multiple sqlite file paths should be given")
@@ -202,114 +279,239 @@ def mergesqlite(dbpaths: List[str] = [], outpath: str = ""):
         c.execute("select col_name from gene_header")
         if g_cols != sorted([r[0] for r in c.fetchall()]):
             exit("Annotation columns mismatch (gene table)")
-    # Copies the first db.
+        c.close()
+        conn.close()
+    num_groups = min(max(parallel, 1), len(dbpaths) // 2)
+    if num_groups <= 1:
+        merge_sqlite_files(dbpaths, outpath)
+        return True
+    # Tree merge. Groups keep the order of dbpaths, so the uids of earlier
+    # databases take precedence as in a sequential merge.
+    group_size = -(-len(dbpaths) // num_groups)
+    groups = [dbpaths[i : i + group_size] for i in range(0, len(dbpaths), group_size)]
+    part_paths = [f"{outpath[:-7]}.part{i}.sqlite" for i in range(len(groups))]
+    with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+        futures = [
+            pool.submit(merge_sqlite_files, group, part_path)
+            for group, part_path in zip(groups, part_paths)
+            if len(group) > 1
+        ]
+        for future in futures:
+            future.result()
+    merge_paths = [
+        part_path if len(group) > 1 else group[0]
+        for group, part_path in zip(groups, part_paths)
+    ]
+    merge_sqlite_files(merge_paths, outpath)
+    for group, part_path in zip(groups, part_paths):
+        if len(group) > 1:
+            remove(part_path)
+    return True
+
+
+def get_table_columns(c, table: str, schema: str = "main") -> List[str]:
+    c.execute(f"pragma {schema}.table_info({table})")
+    return [r[1] for r in c.fetchall()]
+
+
+def get_merge_info_value(c, keys: List[str], schema: str = "main"):
+    for key in keys:
+        c.execute(f"select colval from {schema}.info where colkey=?", (key,))
+        r = c.fetchone()
+        if r:
+            return key, r[0]
+    return None, None
+
+
+def get_gathered_categories(c, schema: str = "main") -> Dict[str, Dict[str, Any]]:
+    """Returns the col_defs of the columns whose categories were gathered by
+    the aggregator, by header table and column name."""
+    from json import loads
+
+    coldefs = {}
+    for header in ["variant_header", "gene_header"]:
+        coldefs[header] = {}
+        c.execute(f"select col_name, col_def from {schema}.{header}")
+        for col_name, col_def in c.fetchall():
+            d = loads(col_def)
+            if d.get("categories_gathered"):
+                coldefs[header][col_name] = d
+    return coldefs
+
+
+def merge_gathered_categories(c):
+    """Adds the gathered categories of the `src` database to those in the
+    header tables of the main database."""
+    from json import dumps
+
+    main_coldefs = get_gathered_categories(c)
+    src_coldefs = get_gathered_categories(c, "src")
+    for header, coldefs in main_coldefs.items():
+        for col_name, d in coldefs.items():
+            src_d = src_coldefs[header].get(col_name)
+            if not src_d:
+                continue
+            cats = set(d.get("categories") or []) | set(src_d.get("categories") or [])
+            if len(cats) == len(d.get("categories") or []):
+                continue
+            d["categories"] = sorted(cats)
+            c.execute(
+                f"update main.{header} set col_def=? where col_name=?",
+                (dumps(d), col_name),
+            )
+
+
+def merge_sqlite_files(dbpaths: List[str], outpath: str):
+    """Merges result databases into `outpath` with ATTACH and set-based
+    inserts. The first database is copied and the others are merged into it
+    one by one."""
+    import sqlite3
+    from json import loads
+    from json import dumps
+    from shutil import copy
+
     print(f"Copying {dbpaths[0]} to {outpath}...")
     copy(dbpaths[0], outpath)
-    outconn = sqlite3.connect(outpath)
+    outconn = sqlite3.connect(outpath, isolation_level=None)
     outc = outconn.cursor()
-    # Gets key column numbers.
-    outc.execute("select col_name from variant_header order by rowid")
-    cols = [r[0] for r in outc.fetchall()]
-    v_chrom_colno = cols.index("base__chrom")
-    v_pos_colno = cols.index("base__pos")
-    v_ref_colno = cols.index("base__ref_base")
-    v_alt_colno = cols.index("base__alt_base")
-    outc.execute("select col_name from gene_header order by rowid")
-    cols = [r[0] for r in outc.fetchall()]
-    g_hugo_colno = cols.index("base__hugo")
-    outc.execute("select col_name from sample_header order by rowid")
-    cols = [r[0] for r in outc.fetchall()]
-    s_uid_colno = cols.index("base__uid")
-    outc.execute("select col_name from mapping_header order by rowid")
-    cols = [r[0] for r in outc.fetchall()]
-    m_uid_colno = cols.index("base__uid")
-    m_fileno_colno = cols.index("base__fileno")
-    outc.execute("select max(base__uid) from variant")
-    new_uid = outc.fetchone()[0] + 1
+    v_key = "base__chrom, base__pos, base__ref_base, base__alt_base"
+    v_key_match = " and ".join(
+        [
+            f"v.{col} = s.{col}"
+            for col in ["base__chrom", "base__pos", "base__ref_base", "base__alt_base"]
+        ]
+    )
+    try:
+        outc.execute(f"create unique index merge_variant_key on variant ({v_key})")
+    except sqlite3.IntegrityError:
+        outc.execute(f"create index merge_variant_key on variant ({v_key})")
+    outc.execute("create index if not exists merge_sample_key on sample (base__uid)")
+    v_cols = get_table_columns(outc, "variant")
+    g_cols = get_table_columns(outc, "gene")
+    s_cols = get_table_columns(outc, "sample")
+    m_cols = get_table_columns(outc, "mapping")
     # Input paths
-    outc.execute('select colkey, colval from info where colkey="_input_paths"')
-    input_paths = loads(outc.fetchone()[1].replace("'", '"'))
-    new_fileno = max([int(v) for v in input_paths.keys()]) + 1
+    input_paths_key, input_paths = get_merge_info_value(
+        outc, ["input_paths", "_input_paths"]
+    )
+    input_paths = loads(input_paths.replace("'", '"')) if input_paths else {}
+    new_fileno = max([int(v) for v in input_paths.keys()] + [0]) + 1
     rev_input_paths = {}
     for fileno, filepath in input_paths.items():
         rev_input_paths[filepath] = fileno
-    # Makes initial hugo and variant id lists.
-    outc.execute("select base__hugo from gene")
-    genes = {r[0] for r in outc.fetchall()}
-    outc.execute(
-        "select base__chrom, base__pos, base__ref_base, base__alt_base from variant"
-    )
-    variants = {variant_id(r[0], r[1], r[2], r[3]) for r in outc.fetchall()}
     for dbpath in dbpaths[1:]:
         print(f"Merging {dbpath}...")
-        conn = sqlite3.connect(dbpath)
-        c = conn.cursor()
+        outc.execute("attach database ? as src", (dbpath,))
+        outc.execute("begin")
         # Gene
-        c.execute("select * from gene order by rowid")
-        for r in c.fetchall():
-            hugo = r[g_hugo_colno]
-            if hugo in genes:
-                continue
-            q = f'insert into gene values ({",".join(["?" for _ in range(len(r))])})'
-            outc.execute(q, r)
-            genes.add(hugo)
-        # Variant
-        uid_dic = {}
-        c.execute("select * from variant order by rowid")
-        for r in c.fetchall():
-            vid = variant_id(
-                r[v_chrom_colno], r[v_pos_colno], r[v_ref_colno], r[v_alt_colno]
-            )
-            if vid in variants:
-                continue
-            old_uid = r[0]
-            r = list(r)
-            r[0] = new_uid
-            uid_dic[old_uid] = new_uid
-            new_uid += 1
-            q = f'insert into variant values ({",".join(["?" for _ in range(len(r))])})'
-            outc.execute(q, r)
-            variants.add(vid)
+        cols = ", ".join(g_cols)
+        outc.execute(
+            f"insert into main.gene ({cols}) select {cols} from src.gene as s "
+            + "where not exists (select 1 from main.gene as g "
+            + "where g.base__hugo = s.base__hugo) order by s.rowid"
+        )
+        # Variant. New variants get uids after the current maximum, in the
+        # order of their first uid in the source.
+        outc.execute("select coalesce(max(base__uid), 0) from main.variant")
+        max_uid = outc.fetchone()[0]
+        cols = ", ".join(v_cols)
+        sel_cols = ", ".join(
+            [
+                f"{max_uid} + row_number() over (order by s.base__uid)"
+                if col == "base__uid"
+                else f"s.{col}"
+                for col in v_cols
+            ]
+        )
+        outc.execute(
+            f"insert into main.variant ({cols}) select {sel_cols} "
+            + "from src.variant as s where s.base__uid in "
+            + f"(select min(base__uid) from src.variant group by {v_key}) "
+            + f"and not exists (select 1 from main.variant as v where {v_key_match})"
+        )
+        # Maps source uids to merged uids.
+        outc.execute("drop table if exists temp.uid_map")
+        outc.execute(
+            "create temp table uid_map (old_uid integer primary key, new_uid integer)"
+        )
+        outc.execute(
+            "insert or ignore into temp.uid_map select s.base__uid, v.base__uid "
+            + f"from src.variant as s join main.variant as v on {v_key_match}"
+        )
         # Sample
-        c.execute("select * from sample order by rowid")
-        for r in c.fetchall():
-            uid = r[s_uid_colno]
-            if uid in uid_dic:
-                new_uid = uid_dic[uid]
-                r = list(r)
-                r[s_uid_colno] = new_uid
-                q = f'insert into sample values ({",".join(["?" for _ in range(len(r))])})'
-                outc.execute(q, r)
+        cols = ", ".join(s_cols)
+        sel_cols = ", ".join(
+            ["m.new_uid" if col == "base__uid" else f"s.{col}" for col in s_cols]
+        )
+        outc.execute(
+            f"insert into main.sample ({cols}) select {sel_cols} from src.sample as s "
+            + "join temp.uid_map as m on m.old_uid = s.base__uid "
+            + "where not exists (select 1 from main.sample as t "
+            + "where t.base__uid = m.new_uid "
+            + "and t.base__sample_id is s.base__sample_id) "
+            + "order by s.rowid"
+        )
         # File numbers
-        c.execute('select colkey, colval from info where colkey="_input_paths"')
-        ips = loads(c.fetchone()[1].replace("'", '"'))
-        fileno_dic = {}
+        _, ips = get_merge_info_value(outc, ["input_paths", "_input_paths"], "src")
+        ips = loads(ips.replace("'", '"')) if ips else {}
+        outc.execute("drop table if exists temp.fileno_map")
+        outc.execute(
+            "create temp table fileno_map (old_fileno integer primary key, "
+            + "new_fileno integer)"
+        )
         for fileno, filepath in ips.items():
             if filepath not in rev_input_paths:
                 input_paths[str(new_fileno)] = filepath
                 rev_input_paths[filepath] = str(new_fileno)
-                fileno_dic[int(fileno)] = new_fileno
                 new_fileno += 1
+            outc.execute(
+                "insert into temp.fileno_map values (?, ?)",
+                (int(fileno), int(rev_input_paths[filepath])),
+            )
         # Mapping
-        c.execute("select * from mapping order by rowid")
-        for r in c.fetchall():
-            uid = r[m_uid_colno]
-            if uid in uid_dic:
-                new_uid = uid_dic[uid]
-                r = list(r)
-                r[m_uid_colno] = new_uid
-                r[m_fileno_colno] = fileno_dic[r[m_fileno_colno]]
-                q = f'insert into mapping values ({",".join(["?" for _ in range(len(r))])})'
-                outc.execute(q, r)
-    q = 'update info set colval=? where colkey="_input_paths"'
-    outc.execute(q, [dumps(input_paths)])
+        cols = ", ".join(m_cols)
+        sel_cols = ", ".join(
+            [
+                "m.new_uid"
+                if col == "base__uid"
+                else "coalesce(f.new_fileno, s.base__fileno)"
+                if col == "base__fileno"
+                else f"s.{col}"
+                for col in m_cols
+            ]
+        )
+        outc.execute(
+            f"insert into main.mapping ({cols}) select {sel_cols} "
+            + "from src.mapping as s "
+            + "join temp.uid_map as m on m.old_uid = s.base__uid "
+            + "left join temp.fileno_map as f on f.old_fileno = s.base__fileno "
+            + "where not exists (select 1 from main.mapping as t "
+            + "where t.base__uid = m.new_uid "
+            + "and t.base__fileno is coalesce(f.new_fileno, s.base__fileno) "
+            + "and t.base__original_line is s.base__original_line) "
+            + "order by s.rowid"
+        )
+        # Categories gathered by the aggregator of each database
+        merge_gathered_categories(outc)
+        outc.execute("commit")
+        outc.execute("detach database src")
+    outc.execute("drop index if exists merge_variant_key")
+    outc.execute("drop index if exists merge_sample_key")
+    if input_paths_key:
+        q = "update info set colval=? where colkey=?"
+        outc.execute(q, [dumps(input_paths), input_paths_key])
+    sorted_paths = [
+        input_paths[str(v)] for v in sorted(input_paths.keys(), key=lambda v: int(v))
+    ]
     q = 'update info set colval=? where colkey="Input file name"'
-    v = ";".join(
-        [input_paths[str(v)] for v in sorted(input_paths.keys(), key=lambda v: int(v))]
-    )
-    outc.execute(q, [v])
-    outconn.commit()
-    return True
+    outc.execute(q, [";".join(sorted_paths)])
+    q = 'update info set colval=? where colkey="inputs"'
+    outc.execute(q, [dumps(sorted_paths)])
+    outc.execute("select count(*) from variant")
+    q = 'update info set colval=? where colkey="num_variants"'
+    outc.execute(q, [str(outc.fetchone()[0])])
+    outc.close()
+    outconn.close()
 
 
 def filtersqlite(
@@ -319,9 +521,12 @@ def filtersqlite(
     filtersql: Optional[str] = None,
     includesample: List[str] = [],
     excludesample: List[str] = [],
+    max_workers: Optional[int] = None,
 ):
     """filtersqlite.
 
+    Writes a filtered copy of each result database, `<name>.<suffix>.sqlite`. Input databases are processed in parallel.
+
     Args:
         dbpaths (List[str]): dbpaths
         suffix (str): suffix
@@ -329,32 +534,215 @@ def filtersqlite(
         filtersql (Optional[str]): filtersql
         includesample (List[str]): includesample
         excludesample (List[str]): excludesample
+        max_workers (Optional[int]): Number of processes. Defaults to the number of CPUs.
     """
+    from multiprocessing import get_context
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = []
+    for dbpath in dbpaths:
+        if not dbpath.endswith(".sqlite"):
+            print(f"Skipping {dbpath}")
+            continue
+        jobs.append((dbpath, f"{dbpath[:-7]}.{suffix}.sqlite"))
+    kwargs = {
+        "filterpath": filterpath,
+        "filtersql": filtersql,
+        "includesample": includesample,
+        "excludesample": excludesample,
+    }
+    if len(jobs) <= 1 or max_workers == 1:
+        for dbpath, opath in jobs:
+            filter_sqlite_file(dbpath, opath, **kwargs)
+        return True
+    # Workers are spawned because a forked child would inherit the event loop
+    # and the database threads of this process.
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=get_context("spawn")
+    ) as pool:
+        futures = [
+            pool.submit(filter_sqlite_file, dbpath, opath, **kwargs)
+            for dbpath, opath in jobs
+        ]
+        for future in futures:
+            future.result()
+    return True
+
+
+def filter_sqlite_file(dbpath: str, opath: str, **kwargs):
     from ..lib.util.asyn import get_event_loop
 
     loop = get_event_loop()
-    return loop.run_until_complete(
-        filtersqlite_async(
-            dbpaths=dbpaths,
-            suffix=suffix,
-            filterpath=filterpath,
-            filtersql=filtersql,
-            includesample=includesample,
-            excludesample=excludesample,
-        )
+    return loop.run_until_complete(filter_sqlite_file_async(dbpath, opath, **kwargs))
+
+
+def get_qualified_create_sql(sql: str, schema: str) -> str:
+    """Returns a `create table` or `create index` statement of sqlite_master
+    with the created object placed in `schema`."""
+    import re
+
+    return re.sub(
+        r"^(\s*create\s+(?:unique\s+)?(?:table|index)\s+"
+        + r"(?:if\s+not\s+exists\s+)?)",
+        rf"\1{schema}.",
+        sql,
+        count=1,
+        flags=re.IGNORECASE,
     )
 
 
-def filtersqlite_async_drop_copy_table(c, table_name):
-    """filtersqlite_async_drop_copy_table.
+async def filter_sqlite_file_async(
+    dbpath: str,
+    opath: str,
+    filterpath: Optional[str] = None,
+    filtersql: Optional[str] = None,
+    includesample: List[str] = [],
+    excludesample: List[str] = [],
+):
+    """Writes the rows of `dbpath` passing the filter to `opath`.
 
-    Args:
-        c:
-        table_name:
-    """
-    print(f"- {table_name}")
-    c.execute(f"drop table if exists main.{table_name}")
-    c.execute(f"create table main.{table_name} as select * from old_db.{table_name}")
+    The filtered variant and gene tables are made by ReportFilter.make_ftables
+    and the result tables are copied with `insert ... select` from a
+    connection on the input database with the output attached. Indexes are
+    created after all rows are copied."""
+    import sqlite3
+    from json import dumps
+    from os import remove
+    from os.path import exists
+    from .. import ReportFilter
+    from ..lib.base.report_filter import REPORT_FILTER_DB_NAME
+    from ..lib.consts import RESULT_DB_BULK_COPY_CACHE_SIZE
+
+    print(f"{opath}")
+    if exists(opath):
+        remove(opath)
+    cf = await ReportFilter.create(
+        dbpath=dbpath,
+        filterpath=filterpath,
+        filtersql=filtersql,
+        includesample=includesample or None,
+        excludesample=excludesample or None,
+    )
+    if type(cf.filter) is not dict:
+        from ..lib.exceptions import FilterLoadingError
+
+        raise FilterLoadingError()
+    ret = await cf.make_ftables()
+    ftable_uid = ret["uid"] if ret else None
+    conn = sqlite3.connect(dbpath, isolation_level=None)
+    c = conn.cursor()
+    try:
+        c.execute("attach database ? as out", (opath,))
+        c.execute("pragma out.journal_mode=off")
+        c.execute("pragma out.synchronous=off")
+        c.execute(f"pragma cache_size=-{RESULT_DB_BULK_COPY_CACHE_SIZE}")
+        c.execute("pragma temp_store=memory")
+        # Filtered variant uids and genes
+        sample_to_filter = cf.get_sample_to_filter()
+        if not sample_to_filter and (cf.includesample or cf.excludesample):
+            sample_to_filter = [cf.includesample or [], cf.excludesample or []]
+        if ftable_uid is not None:
+            c.execute(
+                f"attach database ? as {REPORT_FILTER_DB_NAME}",
+                (str(cf.get_report_filter_db_path()),),
+            )
+            fvariant = cf.get_ftable_name(uid=ftable_uid, ftype="variant")
+            fgene = cf.get_ftable_name(uid=ftable_uid, ftype="gene")
+        elif not cf.should_bypass_filter():
+            fvariant = "temp.fvariant"
+            fgene = "temp.fgene"
+            q = "select distinct v.base__uid from main.variant as v"
+            if sample_to_filter:
+                [req, rej] = sample_to_filter
+                q += (
+                    " join (select distinct base__uid from main.sample where "
+                    + get_sample_cond(req, rej)
+                    + ") as sl on v.base__uid=sl.base__uid"
+                )
+            if cf.filtersql:
+                if "g." in cf.filtersql:
+                    q += " join main.gene as g on v.base__hugo=g.base__hugo"
+                if "s." in cf.filtersql:
+                    q += " join main.sample as s on v.base__uid=s.base__uid"
+                q += " where " + cf.filtersql
+            c.execute(f"create table {fvariant} (base__uid integer primary key)")
+            c.execute(f"insert into {fvariant} {q}")
+            c.execute(
+                f"create table {fgene} as select distinct v.base__hugo "
+                + f"from main.variant as v join {fvariant} as vf on "
+                + "vf.base__uid=v.base__uid where v.base__hugo is not null"
+            )
+        else:
+            fvariant = None
+            fgene = None
+        # Tables
+        c.execute(
+            "select name, sql from main.sqlite_master where type='table' "
+            + "and name not like 'sqlite_%' and sql is not null"
+        )
+        tables = [
+            (table_name, sql)
+            for table_name, sql in c.fetchall()
+            if table_name not in ["variant_filtered", "gene_filtered"]
+        ]
+        c.execute("begin")
+        for table_name, sql in tables:
+            print(f"- {table_name}")
+            c.execute(get_qualified_create_sql(sql, "out"))
+            q = f"insert into out.{table_name} select t.* from main.{table_name} as t"
+            if table_name in ["variant", "sample", "mapping"] and fvariant:
+                q += f" where t.base__uid in (select base__uid from {fvariant})"
+            elif table_name == "gene" and fgene:
+                q += f" where t.base__hugo in (select base__hugo from {fgene})"
+            if table_name == "sample" and sample_to_filter:
+                [req, rej] = sample_to_filter
+                q += (" and " if fvariant else " where ") + get_sample_cond(
+                    req, rej, prefix="t."
+                )
+            c.execute(q)
+        c.execute("commit")
+        # Indices
+        c.execute(
+            "select name, sql from main.sqlite_master "
+            + "where type='index' and sql is not null"
+        )
+        for index_name, sql in c.fetchall():
+            print(f"- {index_name}")
+            c.execute(get_qualified_create_sql(sql, "out"))
+        # Info
+        print("- info")
+        c.execute("select count(*) from out.variant")
+        n = c.fetchone()[0]
+        for colkey in ["num_variants", "Number of unique input variants"]:
+            c.execute("update out.info set colval=? where colkey=?", (str(n), colkey))
+        # Categories gathered from the unfiltered rows are cleared so that
+        # reporters gather them from the filtered tables.
+        for header, coldefs in get_gathered_categories(c, "out").items():
+            for col_name, d in coldefs.items():
+                d["categories"] = []
+                del d["categories_gathered"]
+                c.execute(
+                    f"update out.{header} set col_def=? where col_name=?",
+                    (dumps(d), col_name),
+                )
+        c.execute("detach database out")
+    finally:
+        c.close()
+        conn.close()
+    await cf.close_db()
+    print(f"-> {opath}")
+    return True
+
+
+def get_sample_cond(req: List[str], rej: List[str], prefix: str = "") -> str:
+    conds = []
+    if req:
+        req_s = ", ".join([f'"{sid}"' for sid in req])
+        conds.append(f"{prefix}base__sample_id in ({req_s})")
+    if rej:
+        rej_s = ", ".join([f'"{sid}"' for sid in rej])
+        conds.append(f"{prefix}base__sample_id not in ({rej_s})")
+    return " and ".join(conds)
 
 
 async def filtersqlite_async(
@@ -375,118 +763,15 @@ async def filtersqlite_async(
         includesample (List[str]): includesample
         excludesample (List[str]): excludesample
     """
-    import sqlite3
-    from os import remove
-    from os.path import exists
-    from .. import ReportFilter
-
     for dbpath in dbpaths:
         if not dbpath.endswith(".sqlite"):
-            print("  Skipping")
+            print(f"Skipping {dbpath}")
             continue
-        opath = f"{dbpath[:-7]}.{suffix}.sqlite"
-        print(f"{opath}")
-        if exists(opath):
-            remove(opath)
-        conn = sqlite3.connect(opath)
-        c = conn.cursor()
-        try:
-            c.execute("attach database '" + dbpath + "' as old_db")
-            cf = await ReportFilter.create(
-                dbpath=dbpath,
-                filterpath=filterpath,
-                filtersql=filtersql,
-                includesample=includesample,
-                excludesample=excludesample,
-            )
-            await cf.exec_db(cf.loadfilter)
-            if (
-                hasattr(cf, "filter") is False
-                or cf.filter is None
-                or type(cf.filter) is not dict
-            ):
-                from ..lib.exceptions import FilterLoadingError
-
-                raise FilterLoadingError()
-            for table_name in [
-                "info",
-                "viewersetup",
-                "variant_annotator",
-                "variant_header",
-                "variant_reportsub",
-                "gene_annotator",
-                "gene_header",
-                "gene_reportsub",
-                "sample_annotator",
-                "sample_header",
-                "mapping_annotator",
-                "mapping_header",
-            ]:
-                filtersqlite_async_drop_copy_table(c, table_name)
-            # Variant
-            print("- variant")
-            if hasattr(cf, "make_filtered_uid_table"):
-                await cf.exec_db(getattr(cf, "make_filtered_uid_table"))
-            c.execute(
-                "create table variant as select v.* from old_db.variant as v, old_db.variant_filtered as f where v.base__uid=f.base__uid"
-            )
-            # Gene
-            print("- gene")
-            await cf.exec_db(cf.make_filtered_hugo_table)
-            c.execute(
-                "create table gene as select g.* from old_db.gene as g, old_db.gene_filtered as f where g.base__hugo=f.base__hugo"
-            )
-            # Sample
-            print("- sample")
-            req = []
-            rej = []
-            if "sample" in cf.filter:
-                if "require" in cf.filter["sample"]:
-                    req = cf.filter["sample"]["require"]
-                if "reject" in cf.filter["sample"]:
-                    rej = cf.filter["sample"]["reject"]
-            if cf.includesample is not None:
-                req = cf.includesample
-            if cf.excludesample is not None:
-                rej = cf.excludesample
-            if len(req) > 0 or len(rej) > 0:
-                q = "create table sample as select s.* from old_db.sample as s, old_db.variant_filtered as v where s.base__uid=v.base__uid"
-                if req:
-                    q += " and s.base__sample_id in ({})".format(
-                        ", ".join(['"{}"'.format(sid) for sid in req])
-                    )
-                for s in rej:
-                    q += ' except select * from sample where base__sample_id="{}"'.format(
-                        s
-                    )
-            else:
-                q = "create table sample as select s.* from old_db.sample as s, old_db.variant_filtered as v where s.base__uid=v.base__uid"
-            c.execute(q)
-            # Mapping
-            c.execute(
-                "create table mapping as select m.* from old_db.mapping as m, old_db.variant_filtered as v where m.base__uid=v.base__uid"
-            )
-            # Indices
-            c.execute("select name, sql from old_db.sqlite_master where type='index'")
-            for r in c.fetchall():
-                index_name = r[0]
-                sql = r[1]
-                if sql is not None:
-                    print(f"- {index_name}")
-                    c.execute(sql)
-            # Info
-            print("- info")
-            c.execute("select count(*) from variant")
-            n = c.fetchone()[0]
-            c.execute(
-                f'update info set colval={n} where colkey="Number of unique input variants"'
-            )
-            conn.commit()
-            await cf.close_db()
-            c.close()
-            conn.close()
-            print(f"-> {opath}")
-        except Exception as e:
-            c.close()
-            conn.close()
-            raise e
+        await filter_sqlite_file_async(
+            dbpath,
+            f"{dbpath[:-7]}.{suffix}.sqlite",
+            filterpath=filterpath,
+            filtersql=filtersql,
+            includesample=includesample,
+            excludesample=excludesample,
+        )
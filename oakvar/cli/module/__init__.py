@@ -242,6 +242,24 @@ def add_parser_ov_module_install(subparsers):
         default=False,
         help="removes temporary installation directory",
     )
+    parser_ov_module_install.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        help="Number of modules to install at the same time",
+    )
+    parser_ov_module_install.add_argument(
+        "--max-downloads",
+        type=int,
+        default=None,
+        help="Number of downloads at the same time across all modules",
+    )
+    parser_ov_module_install.add_argument(
+        "--max-download-bandwidth",
+        type=int,
+        default=None,
+        help="Total download bandwidth limit in bytes per second",
+    )
     parser_ov_module_install.set_defaults(func=cli_module_install)
     parser_ov_module_install.r_return = "A boolean. TRUE if successful, FALSE if not"  # type: ignore
     parser_ov_module_install.r_examples = [  # type: ignore
@@ -258,6 +258,18 @@ def add_parser_ov_run(subparsers):
         default=False,
         help="analyze with the vcf to vcf workflow. It is faster than a normal run, but only if both input and output formats are VCF.",
     )
+    parser_ov_run.add_argument(
+        "--bgzip",
+        action="store_true",
+        default=False,
+        help="write vcf2vcf output as bgzip-compressed VCF. Gzip-compressed inputs always give bgzip-compressed outputs.",
+    )
+    parser_ov_run.add_argument(
+        "--tabix",
+        action="store_true",
+        default=False,
+        help="write vcf2vcf output as bgzip-compressed VCF with a tabix index. The input should be sorted by position.",
+    )
     parser_ov_run.add_argument("--uid", default=None, help="Optional UID of the job")
     parser_ov_run.add_argument(
         "--logtofile",
@@ -291,4 +303,64 @@ def add_parser_ov_run(subparsers):
         default=False,
         help="Skip de-duplication of variants"
     )
+    parser_ov_run.add_argument(
+        "--regions",
+        nargs="+",
+        default=None,
+        help="Analyze only the variants overlapping these regions. Regions can be given as chr1 or chr1:10000-20000 (1-based and inclusive), comma-separated lists of them, or BED files. Only VCF and OakVar (cravat) format inputs are supported. An offset index of each input is cached as <input>.ovidx.",
+    )
+    parser_ov_run.add_argument(
+        "--scatter",
+        type=int,
+        default=None,
+        help="Split the input into this number of shards and write a scatter manifest, <run_name>.scatter.json, instead of running the pipeline. Run each shard with --shard and put the results together with --gather.",
+    )
+    parser_ov_run.add_argument(
+        "--scatter-by",
+        dest="scatter_by",
+        choices=["chrom", "size"],
+        default="chrom",
+        help="How to split the input with --scatter. chrom keeps each chromosome in one shard. size also splits chromosomes to make shards of about the same number of variants and needs a sorted input, but a gene can span two shards, so size cannot be used with gene-level annotators or postaggregators or with modules which summarize by gene.",
+    )
+    parser_ov_run.add_argument(
+        "--shard",
+        nargs=2,
+        metavar=("MANIFEST", "SHARD_NO"),
+        default=None,
+        help="Run a shard of a scatter manifest, from conversion to post-aggregation, with the arguments of the original run. Inputs and -d, if given, override those in the manifest.",
+    )
+    parser_ov_run.add_argument(
+        "--gather",
+        metavar="MANIFEST",
+        default=None,
+        help="Merge the result databases of the shards of a scatter manifest into <run_name>.sqlite and make the reports of the original run. -d, if given, is where the shard results are.",
+    )
+    parser_ov_run.add_argument(
+        "--profile",
+        nargs="?",
+        const="cprofile",
+        choices=["cprofile", "pyinstrument"],
+        default=None,
+        help="Profile the converter and each module and write the profiles as <run_name>.<module>.prof (cprofile, the default) or <run_name>.<module>.html (pyinstrument, if installed) to the output directory. Per-stage and per-module metrics are always written to the metrics table of the result database and <run_name>.metrics.json.",
+    )
+    parser_ov_run.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="Keep checkpoints of stages and modules with the hashes of their outputs in <run_name>.checkpoint.json, and skip the stages and modules whose outputs are still valid when the run is started again with --resume.",
+    )
+    parser_ov_run.add_argument(
+        "--annotation-cache",
+        dest="annotation_cache",
+        action="store_true",
+        default=False,
+        help="Look up the outputs of variant-level annotators with annotation_cache: true in their yml in a shared on-disk cache by module version and variant, and annotate only the variants not in the cache. The cache is shared across runs and is size-bounded with least-recently-used eviction.",
+    )
+    parser_ov_run.add_argument(
+        "--add-annotators",
+        nargs="+",
+        dest="add_annotators",
+        default=[],
+        help="Annotators to add to the result databases (.sqlite) given as input. Only these annotators, their secondary annotators and the postaggregators in the result databases which require them are run, and only their columns are merged into the result databases.",
+    )
     parser_ov_run.set_defaults(func=cli_run)
@@ -14,6 +14,21 @@ def sqliteinfo(args, __name__="util sqliteinfo"):
     return get_sqliteinfo(**args)
 
 
+@cli_entry
+def cli_util_bench(args):
+    return bench(args)
+
+
+@cli_func
+def bench(args, __name__="util bench"):
+    from ..api.util import bench
+
+    ret = bench(**args)
+    if [v for v in ret.get("comparison", []) if v["regression"]]:
+        return False
+    return ret
+
+
 # @cli_entry
 # def cli_util_mergesqlite(args):
 # mergesqlite(args)
@@ -46,6 +61,7 @@ def sqliteinfo(args, __name__="util sqliteinfo"):
 
 def get_parser_fn_util():
     from argparse import ArgumentParser
+    from ..lib.util.bench import BENCHMARKS
 
     parser_fn_util = ArgumentParser()
     _subparsers = parser_fn_util.add_subparsers(title="Commands")
@@ -121,6 +137,68 @@ def get_parser_fn_util():
         '#roakvar::util.sqliteinfo(paths="example.sqlite")',
     ]
 
+    # Benchmark
+    parser_fn_util_bench = _subparsers.add_parser(
+        "bench", help="Benchmark the annotation pipeline with synthetic runs"
+    )
+    parser_fn_util_bench.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[10000],
+        help="Numbers of variants of synthetic runs",
+    )
+    parser_fn_util_bench.add_argument(
+        "-b",
+        "--benchmarks",
+        nargs="+",
+        default=None,
+        choices=list(BENCHMARKS),
+        help="Benchmarks to run. All by default.",
+    )
+    parser_fn_util_bench.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of times to run each benchmark. The fastest run is reported.",
+    )
+    parser_fn_util_bench.add_argument(
+        "-d",
+        dest="rundir",
+        default=None,
+        help="Directory to make synthetic runs in. A temporary directory by default.",
+    )
+    parser_fn_util_bench.add_argument(
+        "-o", dest="outpath", default=None, help="Path to write the results as JSON"
+    )
+    parser_fn_util_bench.add_argument(
+        "--compare",
+        default=None,
+        help="Results JSON of a previous bench to compare with. "
+        + "Exits with 1 if any benchmark regressed.",
+    )
+    parser_fn_util_bench.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Slowdown, as a fraction, over which a benchmark is a regression",
+    )
+    parser_fn_util_bench.add_argument(
+        "--keep",
+        action="store_true",
+        default=False,
+        help="Keep the synthetic runs in the temporary directory",
+    )
+    parser_fn_util_bench.add_argument(
+        "--seed", type=int, default=0, help="Random seed of synthetic runs"
+    )
+    parser_fn_util_bench.set_defaults(func=cli_util_bench)
+    parser_fn_util_bench.r_return = "A named list. Timings of benchmarks"  # type: ignore
+    parser_fn_util_bench.r_examples = [  # type: ignore
+        "# Benchmark the pipeline with 10k and 100k variant synthetic runs",
+        "#roakvar::util.bench(sizes=list(10000, 100000), outpath=\"bench.json\")",
+    ]
+
     # Filter SQLite
     # parser_fn_util_filtersqlite = _subparsers.add_parser(
     #    "filtersqlite",
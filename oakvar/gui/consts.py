@@ -23,6 +23,8 @@ SYSTEM_MESSAGE_DB_FNAME = "system_messages.sqlite"
 SYSTEM_MESSAGE_TABLE = "system_messages"
 SYSTEM_ERROR_TABLE = "system_errors"
 INSTALL_KILL_SIGNAL = "kill_signal"
+SYSTEM_WORKER_MAX_INSTALLS = 4
+SYSTEM_WORKER_WAKEUP_TIMEOUT = 10
 PORT_KEY = "port"
 SYSCONF_PORT_KEY = "gui_port"
 SYSCONF_SSL_PORT_KEY = "gui_port_ssl"
@@ -14,6 +14,7 @@ class WebServer(object):
         global system_setup_needed
         self.manager = None
         self.system_queue = None
+        self.system_queue_changed = None
         self.system_worker_state = None
         self.info_of_running_jobs = None
         self.report_generation_ps = None
@@ -130,6 +131,7 @@ class WebServer(object):
                 self.system_worker_state,
                 self.local_modules_changed,
                 self.manager,
+                self.system_queue_changed,
             ),
         )
         self.system_worker.start()
@@ -174,6 +176,7 @@ class WebServer(object):
         self.make_system_queue()
         self.make_system_worker_state()
         self.local_modules_changed = self.manager.Event()
+        self.system_queue_changed = self.manager.Event()
         self.make_job_queue_states()
         self.wss = {}
 
@@ -187,6 +190,7 @@ class WebServer(object):
             local_modules_changed=self.local_modules_changed,
             system_worker_state=self.system_worker_state,
             system_queue=self.system_queue,
+            system_queue_changed=self.system_queue_changed,
             logger=self.logger,
         )
 
@@ -215,6 +219,7 @@ class WebServer(object):
             mu=self.mu,
             logger=self.logger,
             system_queue=self.system_queue,
+            system_queue_changed=self.system_queue_changed,
             system_worker_state=self.system_worker_state,
         )
 
@@ -10,6 +10,7 @@ class StoreHandlers:
         local_modules_changed=None,
         system_worker_state=None,
         system_queue=None,
+        system_queue_changed=None,
         logger=None,
     ):
         self.servermode = servermode
@@ -19,6 +20,7 @@ class StoreHandlers:
         self.system_worker_state = system_worker_state
         self.manager = manager
         self.system_queue = system_queue
+        self.system_queue_changed = system_queue_changed
         self.logger = logger
         self.wss = {}
         self.add_routes()
@@ -183,6 +185,8 @@ class StoreHandlers:
         if self.system_queue is not None:
             self.system_queue.append(data)
         self.initialize_system_worker_state_for_install(module_name, module_version)
+        if self.system_queue_changed is not None:
+            self.system_queue_changed.set()
         return Response(status=200)
 
     async def add_local_module_info(self, request):
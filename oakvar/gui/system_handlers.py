@@ -8,12 +8,14 @@ class SystemHandlers:
         mu=None,
         logger=None,
         system_queue=None,
+        system_queue_changed=None,
         system_worker_state=None,
     ):
         self.servermode = servermode
         self.mu = mu
         self.logger = logger
         self.system_queue = system_queue
+        self.system_queue_changed = system_queue_changed
         self.system_worker_state = system_worker_state
         self.add_routes()
 
@@ -86,6 +88,8 @@ class SystemHandlers:
         data["work_type"] = SYSTEM_STATE_SETUP_KEY
         data["args"] = args
         self.system_queue.append(data)
+        if self.system_queue_changed is not None:
+            self.system_queue_changed.set()
         return Response(status=200)
 
     async def get_modules_dir(self, _):
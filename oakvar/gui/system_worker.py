@@ -1,7 +1,13 @@
 from typing import Optional
+from typing import Dict
+from typing import Set
+from typing import Tuple
+from concurrent.futures import Future
 from multiprocessing.managers import ListProxy
 from multiprocessing.managers import DictProxy
 from ..lib.module import InstallProgressHandler
+from .consts import SYSTEM_WORKER_MAX_INSTALLS
+from .consts import SYSTEM_WORKER_WAKEUP_TIMEOUT
 
 
 def system_queue_worker(
@@ -9,73 +15,196 @@ def system_queue_worker(
     system_worker_state: Optional[DictProxy],
     local_modules_changed,
     manager,
+    system_queue_changed=None,
+    max_installs: int = SYSTEM_WORKER_MAX_INSTALLS,
 ):
     from time import sleep
-    import traceback
-    from ..lib.module import install_module
     from ..lib.system import setup_system
-    from ..lib.exceptions import ModuleToSkipInstallation
+    from .util import GuiOuter
 
     # from .consts import SYSTEM_STATE_SETUP_KEY
     # from .consts import SYSTEM_MSG_KEY
-    from .util import GuiOuter
 
     setup_outer = GuiOuter(kind="setup")
-    install_outer = GuiOuter(kind="install")
+    installer = ConcurrentModuleInstaller(
+        system_queue,
+        system_worker_state,
+        local_modules_changed,
+        manager,
+        system_queue_changed=system_queue_changed,
+        max_installs=max_installs,
+    )
     while True:
         try:
-            sleep(1)
+            if system_queue_changed is not None:
+                system_queue_changed.wait(timeout=SYSTEM_WORKER_WAKEUP_TIMEOUT)
+                system_queue_changed.clear()
+            else:
+                sleep(1)
+            installer.collect_finished()
             if not system_queue:
                 continue
             data = system_queue[0]
             work_type = data.get("work_type")
-            system_queue.pop(0)
             if work_type == "setup":
+                # Setup changes the modules directory, so it waits until
+                # running installs finish.
+                if installer.running:
+                    continue
+                system_queue.pop(0)
                 args = data.get("args")
                 # args[SYSTEM_MSG_KEY] = SYSTEM_STATE_SETUP_KEY
                 try:
                     setup_system(outer=setup_outer, **args)
                 except Exception as e:
                     setup_outer.error(e)
-            elif work_type == "install_module":
-                module_name = data["module"]
-                module_version = data["version"]
-                stage_handler = InstallProgressMpDict(
-                    manager,
-                    module_name=module_name,
-                    module_version=module_version,
-                    system_worker_state=system_worker_state,
-                    outer=install_outer,
-                )
-                try:
-                    install_module(
-                        module_name,
-                        version=module_version,
-                        stage_handler=stage_handler,
-                        overwrite=True,
-                        fresh=True,
-                        outer=install_outer,
-                    )
-                    if system_worker_state:
-                        remove_module_from_system_worker(
-                            system_worker_state, module_name
-                        )
-                    # unqueue(module_name, system_queue)
-                    local_modules_changed.set()
-                    install_outer.write(f"finished:{module_name}::")
-                except ModuleToSkipInstallation:
-                    # unqueue(module_name, system_queue)
-                    stage_handler.stage_start("skip")
-                except Exception:
-                    # unqueue(module_name, system_queue)
-                    local_modules_changed.set()
-                    stage_handler.stage_start("error")
-                    exc_str = traceback.format_exc()
-                    install_outer.error(exc_str)
+                if system_queue_changed is not None:
+                    system_queue_changed.set()
+            else:
+                installer.start_ready()
         except KeyboardInterrupt:
+            installer.shutdown()
             break
 
 
+class ConcurrentModuleInstaller:
+    """Installs queued modules in a bounded thread pool.
+
+    Install requests stay in the system queue until they start, so that they
+    can still be unqueued. A module starts only after the modules it requires
+    that are queued or being installed have finished.
+    """
+
+    def __init__(
+        self,
+        system_queue: ListProxy,
+        system_worker_state: Optional[DictProxy],
+        local_modules_changed,
+        manager,
+        system_queue_changed=None,
+        max_installs: int = SYSTEM_WORKER_MAX_INSTALLS,
+    ):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.system_queue = system_queue
+        self.system_worker_state = system_worker_state
+        self.local_modules_changed = local_modules_changed
+        self.manager = manager
+        self.system_queue_changed = system_queue_changed
+        self.max_installs = max(1, max_installs)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_installs)
+        self.running: Dict[str, Future] = {}
+        self.deps: Dict[Tuple[str, Optional[str]], Set[str]] = {}
+
+    def get_deps(self, module_name: str, module_version: Optional[str]) -> Set[str]:
+        from ..lib.module.remote import get_install_deps
+
+        key = (module_name, module_version)
+        if key not in self.deps:
+            try:
+                deps, _ = get_install_deps(
+                    module_name=module_name, version=module_version
+                )
+                self.deps[key] = set(deps.keys())
+            except Exception:
+                self.deps[key] = set()
+        return self.deps[key]
+
+    def collect_finished(self):
+        for module_name in [k for k, v in self.running.items() if v.done()]:
+            del self.running[module_name]
+
+    def start_ready(self):
+        queue = list(self.system_queue)
+        queued_names = set(
+            [
+                data.get("module")
+                for data in queue
+                if data.get("work_type") == "install_module"
+            ]
+        )
+        to_start = []
+        for data in queue:
+            if len(self.running) + len(to_start) >= self.max_installs:
+                break
+            if data.get("work_type") != "install_module":
+                # Keeps the queue order around setup requests.
+                break
+            module_name = data["module"]
+            if module_name in self.running:
+                continue
+            deps = self.get_deps(module_name, data.get("version"))
+            waiting_for = [
+                dep
+                for dep in deps
+                if dep != module_name and (dep in self.running or dep in queued_names)
+            ]
+            if waiting_for:
+                continue
+            to_start.append(data)
+        if not to_start and not self.running and queue:
+            # Circular requirements. Breaks the tie by queue order.
+            if queue[0].get("work_type") == "install_module":
+                to_start.append(queue[0])
+        for data in to_start:
+            try:
+                self.system_queue.remove(data)
+            except ValueError:  # unqueued in the meantime
+                continue
+            self.start(data)
+
+    def start(self, data: dict):
+        module_name = data["module"]
+        future = self.executor.submit(self.install, data)
+        self.running[module_name] = future
+        future.add_done_callback(self.notify)
+
+    def notify(self, _):
+        if self.system_queue_changed is not None:
+            self.system_queue_changed.set()
+
+    def install(self, data: dict):
+        import traceback
+        from ..lib.module import install_module
+        from ..lib.exceptions import ModuleToSkipInstallation
+        from .util import GuiOuter
+
+        # sqlite connections cannot be shared across threads.
+        install_outer = GuiOuter(kind="install")
+        module_name = data["module"]
+        module_version = data["version"]
+        stage_handler = InstallProgressMpDict(
+            self.manager,
+            module_name=module_name,
+            module_version=module_version,
+            system_worker_state=self.system_worker_state,
+            outer=install_outer,
+        )
+        try:
+            install_module(
+                module_name,
+                version=module_version,
+                stage_handler=stage_handler,
+                overwrite=True,
+                fresh=True,
+                outer=install_outer,
+            )
+            if self.system_worker_state:
+                remove_module_from_system_worker(self.system_worker_state, module_name)
+            self.local_modules_changed.set()
+            install_outer.write(f"finished:{module_name}::")
+        except ModuleToSkipInstallation:
+            stage_handler.stage_start("skip")
+        except Exception:
+            self.local_modules_changed.set()
+            stage_handler.stage_start("error")
+            exc_str = traceback.format_exc()
+            install_outer.error(exc_str)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
 def unqueue(module_name: Optional[str], system_queue):
     if not system_queue or not module_name:
         return
@@ -1,8 +1,9 @@
 from oakvar import BaseReporter
+from oakvar.lib.base.reporter import STREAM_CHUNK_SIZE
 
 
 class Reporter(BaseReporter):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, data_stream=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.no_log = True
         self.levels_to_write = None
@@ -10,20 +11,46 @@ class Reporter(BaseReporter):
         self.keep_json_all_mapping = True
         self.data = {}
         self.dictrow = True
+        self.columnar = True
+        self.data_stream = data_stream
+        self.num_rows = 0
 
     def write_preface(self, level):
         self.data[level] = []
         self.level = level
+        self.num_rows = 0
 
     def write_table_row(self, row):
         self.data[self.level].append(
             [row[col] for col in self.colnames_to_display[self.level]]
         )
+        if self.data_stream is None:
+            self.num_rows += 1
+
+    async def write_table_rows(self, rows):
+        if self.data_stream is None:
+            self.data[self.level].extend(rows)
+            self.num_rows += len(rows)
+        else:
+            await self.stream_rows(rows)
+
+    async def stream_rows(self, rows):
+        """Writes rows to data_stream as the elements of a JSON array."""
+        from json import dumps
+
+        if not self.data_stream:
+            return
+        for i in range(0, len(rows), STREAM_CHUNK_SIZE):
+            chunk = rows[i : i + STREAM_CHUNK_SIZE]
+            s = dumps(chunk)[1:-1]
+            if self.num_rows:
+                s = "," + s
+            await self.data_stream.write(s.encode())
+            self.num_rows += len(chunk)
 
     def end(self):
         info = {}
-        norows = len(self.data[self.level])
-        info["norows"] = norows
+        info["norows"] = self.num_rows
         self.data["info"] = info
         self.data["colinfo"] = self.colinfo
         self.data["warning_msgs"] = self.warning_msgs
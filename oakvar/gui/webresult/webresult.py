@@ -7,12 +7,73 @@ from typing import Optional
 from ... import ReportFilter
 from aiohttp import web
 import time
+from collections import OrderedDict
 
 wu = None
 logger = None
 default_gui_result_pagesize = 100000
 gui_result_pagesize_key = "gui_result_pagesize"
 servermode = False
+widget_response_cache_size = 256
+widget_modules = {}
+widget_responses = OrderedDict()
+
+
+def load_widget_module(name: str, module_dir: str, module_name: str = ""):
+    """Imports a widget (or jsonreporter) module once and re-imports it only
+    when its file has changed."""
+    f, fn, d = imp.find_module(name, [module_dir])
+    if f:
+        f.close()
+    mtime = os.path.getmtime(fn)
+    cached = widget_modules.get(fn)
+    # Modules of the same name share one module object, so the cached module
+    # is valid only if it was not re-executed for another file.
+    if cached and cached[0] == mtime and cached[1].__file__ == fn:
+        return cached[1]
+    f, fn, d = imp.find_module(name, [module_dir])
+    try:
+        m = imp.load_module(module_name or name, f, fn, d)  # type: ignore
+    finally:
+        if f:
+            f.close()
+    widget_modules[fn] = (mtime, m)
+    return m
+
+
+def get_widget_response_key(
+    m, dbpath: Optional[str], queries: dict
+) -> Optional[tuple]:
+    if not dbpath or not os.path.exists(dbpath):
+        return None
+    try:
+        params = json.dumps(queries, sort_keys=True)
+    except TypeError:
+        return None
+    return (
+        m.__file__,
+        os.path.getmtime(m.__file__),
+        dbpath,
+        os.path.getmtime(dbpath),
+        queries.get("ftable_uid"),
+        params,
+    )
+
+
+async def get_widget_data(m, dbpath: Optional[str], queries: dict):
+    """Runs a widget's get_data, caching the response by widget, result
+    database, filter table uid and query parameters. A change of the widget
+    file or the result database invalidates its cached responses."""
+    key = get_widget_response_key(m, dbpath, queries)
+    if key is not None and key in widget_responses:
+        widget_responses.move_to_end(key)
+        return widget_responses[key]
+    content = await m.get_data(queries)
+    if key is not None:
+        widget_responses[key] = content
+        while len(widget_responses) > widget_response_cache_size:
+            widget_responses.popitem(last=False)
+    return content
 
 
 async def get_nowg_annot_modules(_):
@@ -320,7 +381,39 @@ async def get_count(request):
     return web.json_response(content)
 
 
+class ResultStream:
+    """Response of get_result whose rows are streamed into its "data" array.
+
+    The response is prepared on the first write, so that errors raised while
+    the reporter is set up reach the client as a normal error response
+    instead of a truncated 200 response."""
+
+    def __init__(self, request):
+        self.request = request
+        self.response = web.StreamResponse(
+            headers={"Content-Type": "application/json"}
+        )
+        self.prepared = False
+
+    async def prepare(self):
+        if self.prepared:
+            return
+        await self.response.prepare(self.request)
+        await self.response.write(b'{"data": [')
+        self.prepared = True
+
+    async def write(self, data: bytes):
+        await self.prepare()
+        await self.response.write(data)
+
+    async def close(self, content: dict):
+        await self.prepare()
+        await self.response.write(("], " + json.dumps(content)[1:]).encode())
+        await self.response.write_eof()
+
+
 async def get_result(request):
+    from traceback import format_exc
     from ...lib.exceptions import DatabaseConnectionError
 
     global logger
@@ -349,15 +442,7 @@ async def get_result(request):
     else:
         confpath = None
     reporter_name = "jsonreporter"
-    f, fn, d = imp.find_module(
-        reporter_name,
-        [
-            os.path.join(
-                os.path.dirname(__file__),
-            )
-        ],
-    )
-    m = imp.load_module(reporter_name, f, fn, d)  # type: ignore
+    m = load_widget_module(reporter_name, os.path.dirname(__file__))
     if "separatesample" in queries:
         separatesample = queries["separatesample"]
         if separatesample == "true":
@@ -368,6 +453,9 @@ async def get_result(request):
         separatesample = False
     no_summary = queries.get("no_summary")
     add_summary = not no_summary
+    # Rows are streamed into the "data" array of the response as they are
+    # produced and the rest of the content follows them.
+    stream = ResultStream(request)
     reporter = m.Reporter(
         dbpath=dbpath,
         module_name=reporter_name,
@@ -376,15 +464,28 @@ async def get_result(request):
         filterstring=filterstring,
         separatesample=separatesample,
         report_types=["text"],
-        no_summary=no_summary
-    )
-    data = await reporter.run(
-        tab=tab,
-        pagesize=pagesize,
-        page=page,
-        add_summary=add_summary,
-        make_filtered_table=make_filtered_table,
+        no_summary=no_summary,
+        data_stream=stream,
     )
+    try:
+        data = await reporter.run(
+            tab=tab,
+            pagesize=pagesize,
+            page=page,
+            add_summary=add_summary,
+            make_filtered_table=make_filtered_table,
+        )
+        if data.get(tab):
+            await reporter.stream_rows(get_datamodel(data[tab]))
+            data["info"]["norows"] = reporter.num_rows
+    except Exception as e:
+        if not stream.prepared:
+            raise
+        # Rows were already sent. The JSON is closed with the error.
+        if logger is not None:
+            logger.exception(e)
+        await stream.close({"status": "error", "msg": format_exc()})
+        return stream.response
     data["modules_info"] = await get_modules_info(request)
     content = {}
     content["stat"] = {
@@ -395,16 +496,16 @@ async def get_result(request):
         "norows": data["info"]["norows"],
     }
     content["columns"] = get_colmodel(tab, data["colinfo"])
-    content["data"] = get_datamodel(data[tab])
     content["status"] = "normal"
     content["modules_info"] = data["modules_info"]
     content["warning_msgs"] = data["warning_msgs"]
     content["total_norows"] = data["total_norows"]
     content["ftable_uid"] = reporter.ftable_uid
+    await stream.close(content)
     t = round(time.time() - start_time, 3)
     if logger is not None:
         logger.info("Done getting result of [{}][{}] in {}s".format(dbname, tab, t))
-    return web.json_response(content)
+    return stream.response
 
 
 async def get_pagesize(request, valueonly=False):
@@ -636,15 +737,7 @@ def get_colmodel(tab, colinfo):
 
 async def get_colinfo(dbpath, confpath=None, filterstring=None, add_summary=True):
     reporter_name = "jsonreporter"
-    f, fn, d = imp.find_module(
-        reporter_name,
-        [
-            os.path.join(
-                os.path.dirname(__file__),
-            )
-        ],
-    )
-    m = imp.load_module(reporter_name, f, fn, d)  # type: ignore
+    m = load_widget_module(reporter_name, os.path.dirname(__file__))
     reporter = m.Reporter(
         dbpath,
         module_name=reporter_name,
@@ -719,17 +812,15 @@ async def serve_runwidget(request):
             if key != "dbpath":
                 new_queries[key] = queries[key]
         queries = new_queries
-    f, fn, d = imp.find_module(
-        path, [os.path.join(modules_dir, "webviewerwidgets", path)]
-    )
-    m = imp.load_module(path, f, fn, d)  # type: ignore
+    widget_dir = os.path.join(modules_dir, "webviewerwidgets", path)
+    m = load_widget_module(path, widget_dir)
     cf = await ReportFilter.create(dbpath=dbpath, mode="sub")
     filterstring = await cf.exec_db(
         cf.get_report_filter_string, uid=queries.get("ftable_uid")
     )
     queries_dict = queries.copy()
     queries_dict["filterstring"] = filterstring
-    content = await m.get_data(queries_dict)
+    content = await get_widget_data(m, dbpath, queries_dict)
     return web.json_response(content)
 
 
@@ -747,15 +838,10 @@ async def serve_webapp_runwidget(request):
     for key in queries:
         tmp_queries[key] = queries[key]
     queries = tmp_queries
-    f, fn, d = imp.find_module(
-        "wg" + widget_name,
-        [
-            os.path.join(
-                modules_dir, "webapps", module_name, "widgets", "wg" + widget_name
-            )
-        ],
+    widget_dir = os.path.join(
+        modules_dir, "webapps", module_name, "widgets", "wg" + widget_name
     )
-    m = imp.load_module(widget_name, f, fn, d)  # type: ignore
+    m = load_widget_module("wg" + widget_name, widget_dir, module_name=widget_name)
     content = await m.get_data(queries)
     return web.json_response(content)
 
@@ -793,11 +879,9 @@ async def serve_runwidget_post(request):
             if key != "dbpath":
                 new_queries[key] = queries[key]
         queries = new_queries
-    f, fn, d = imp.find_module(
-        path, [os.path.join(modules_dir, "webviewerwidgets", path)]
-    )
-    m = imp.load_module(path, f, fn, d)  # type: ignore
-    content = await m.get_data(queries)
+    widget_dir = os.path.join(modules_dir, "webviewerwidgets", path)
+    m = load_widget_module(path, widget_dir)
+    content = await get_widget_data(m, queries.get("dbpath"), queries)
     return web.json_response(content)
 
 
@@ -1,5 +1,7 @@
 from typing import Optional
 from typing import List
+from typing import Dict
+from typing import Set
 
 
 class Aggregator(object):
@@ -16,14 +18,23 @@ class Aggregator(object):
         delete: bool = False,
         append: bool = False,
         serveradmindb=None,
+        secondary_indexes: Optional[List[List[str]]] = None,
+        add_annotators: Optional[List[str]] = None,
     ):
+        """Aggregator.
+
+        Args:
+            add_annotators (Optional[List[str]]): If given, only the columns of these annotators are added to the existing table of a result database. Base columns and the columns of other modules are left as they are.
+        """
         self.input_dir = input_dir
         self.level = level
         self.run_name = run_name
         self.output_dir = output_dir
         self.delete = delete
-        self.append = append
+        self.append = append or add_annotators is not None
+        self.add_annotators = add_annotators
         self.serveradmindb = serveradmindb
+        self.secondary_indexes = secondary_indexes
         self.annotators = []
         self.ipaths = {}
         self.readers = {}
@@ -36,6 +47,7 @@ class Aggregator(object):
         self.error_logger = None
         self.unique_excs = []
         self.base_reader = None
+        self.num_rows = 0
         self.reportsub = None
         self.cursor = None
         self.db_path = None
@@ -44,6 +56,8 @@ class Aggregator(object):
         self.header_table_name = None
         self.reportsub_table_name = None
         self.base_prefix = "base"
+        self.category_values: Dict[str, Set] = {}
+        self.gathered_category_cols: Set[str] = set()
         self.setup_directories()
         self._setup_logger()
 
@@ -97,11 +111,14 @@ class Aggregator(object):
             q = f"insert into {self.table_name} ({columns}) values ({placeholders});"
             batch_size = 1_000_000
             value_batch = []
+            category_cols = self.get_category_cols(col_names)
             for lnum, line, rd in self.base_reader.loop_data():
                 try:
                     n += 1
                     vals = [rd.get(c) for c in col_names]
                     value_batch.append(vals)
+                    if category_cols:
+                        self.collect_categories(rd, category_cols)
                     if len(value_batch) == batch_size:
                         self.cursor.executemany(q, value_batch)
                         self.dbconn.commit()
@@ -116,6 +133,10 @@ class Aggregator(object):
             if value_batch:
                 self.cursor.executemany(q, value_batch)
                 self.dbconn.commit()
+            self.num_rows = n
+            # Built after loading, before annotator updates which look up rows
+            # by the key.
+            self.create_indexes(self.get_primary_index_columns())
         for annot_name in self.annotators:
             reader = self.readers[annot_name]
             n = 0
@@ -124,19 +145,25 @@ class Aggregator(object):
             ]
             if len(ordered_cnames) == 0:
                 continue
+            category_cols = self.get_category_cols(ordered_cnames)
             update_template = "update {} set {} where {}=?".format(
                 self.table_name,
                 ", ".join([f"{cname}=?" for cname in ordered_cnames]),
                 self.base_prefix + "__" + self.key_name,
             )
+            update_batch = []
             for lnum, line, rd in reader.loop_data():
                 try:
                     n += 1
                     key_val = rd[self.key_name]
                     ins_vals = [rd.get(cname) for cname in ordered_cnames]
                     ins_vals.append(key_val)
-                    self.cursor.execute(update_template, ins_vals)
-                    if n % self.commit_threshold == 0:
+                    update_batch.append(ins_vals)
+                    if category_cols:
+                        self.collect_categories(rd, category_cols)
+                    if len(update_batch) == self.commit_threshold:
+                        batch, update_batch = update_batch, []
+                        self.cursor.executemany(update_template, batch)
                         self.dbconn.commit()
                     if lnum % 10000 == 0:
                         status = f"Running Aggregator ({self.level}:{annot_name}): line {lnum}"
@@ -145,8 +172,11 @@ class Aggregator(object):
                         )
                 except Exception as e:
                     self._log_runtime_error(lnum, line, e, fn=reader.path)
+            if update_batch:
+                self.cursor.executemany(update_template, update_batch)
             self.dbconn.commit()
         self.fill_categories()
+        self.create_indexes(self.get_secondary_index_columns())
         # self.cursor.execute("pragma synchronous=2;")
         # self.cursor.execute("pragma journal_mode=delete;")
         end_time = time()
@@ -204,24 +234,122 @@ class Aggregator(object):
             col_cats = coldef.categories
             if coldef.category in ["single", "multi"]:
                 name: str = coldef.name or ""
+                # Only the added columns change when annotators are added.
+                if (
+                    self.add_annotators is not None
+                    and name.split("__")[0] not in self.annotators
+                ):
+                    continue
                 if col_cats is not None and len(col_cats) == 0:
-                    q = f"select distinct {name} from {self.level}"
-                    self.cursor.execute(q)
-                    col_set = set([])
-                    for r in self.cursor:
-                        if r[0] is None:
-                            continue
-                        col_set.update(r[0].split(";"))
+                    if name in self.gathered_category_cols:
+                        col_set = self.category_values.get(name, set())
+                    else:
+                        # Columns not loaded in this run, such as base
+                        # columns in append mode.
+                        q = f"select distinct {name} from {self.level}"
+                        self.cursor.execute(q)
+                        col_set = set([])
+                        for r in self.cursor:
+                            if r[0] is None:
+                                continue
+                            col_set.update(str(r[0]).split(";"))
                     col_cats = list(col_set)
                     col_cats = self.do_reportsub_col_cats(name, col_cats)
+                    coldef.d["categories_gathered"] = True
                 else:
                     col_cats = self.do_reportsub_col_cats(name, col_cats)
                 if col_cats is not None:
                     col_cats.sort()
                 coldef.categories = col_cats
+                coldef.d["categories"] = col_cats
                 self.update_col_def(coldef)
         self.dbconn.commit()
 
+    def get_primary_index_columns(self) -> List[List[str]]:
+        if self.base_reader is None:
+            return []
+        return self.base_reader.get_index_columns() or []
+
+    def get_secondary_index_columns(self) -> List[List[str]]:
+        from ..consts import aggregator_secondary_idx
+
+        if self.secondary_indexes is not None:
+            index_columnss = self.secondary_indexes
+        else:
+            index_columnss = aggregator_secondary_idx.get(self.level, [])
+        primary_index_columnss = self.get_primary_index_columns()
+        return [
+            index_columns
+            for index_columns in index_columnss
+            if index_columns not in primary_index_columnss
+        ]
+
+    def get_index_name(self, index_columns: List[str]) -> str:
+        primary_index_columnss = self.get_primary_index_columns()
+        if index_columns in primary_index_columnss:
+            index_n = primary_index_columnss.index(index_columns)
+            return f"{self.table_name}_idx_{index_n}"
+        return f"{self.table_name}_idx_{'_'.join(index_columns)}"
+
+    def get_db_size(self) -> int:
+        if self.cursor is None:
+            return 0
+        self.cursor.execute("pragma page_count")
+        page_count = self.cursor.fetchone()[0]
+        self.cursor.execute("pragma page_size")
+        page_size = self.cursor.fetchone()[0]
+        return page_count * page_size
+
+    def create_indexes(self, index_columnss: List[List[str]]):
+        """Creates indexes on base columns. Each index is created after its
+        table has been loaded, and its build time and size are logged."""
+        from time import time
+
+        if self.dbconn is None or self.cursor is None:
+            return
+        q = f"pragma table_info({self.table_name})"
+        self.cursor.execute(q)
+        table_cols = set([row[1] for row in self.cursor.fetchall()])
+        # index_columns is a list of columns to include in this index
+        for index_columns in index_columnss:
+            cols = [f"{self.base_prefix}__{x}" for x in index_columns]
+            missing_cols = [col for col in cols if col not in table_cols]
+            if missing_cols:
+                if self.logger:
+                    self.logger.info(
+                        f"index on {', '.join(cols)} skipped. Missing: "
+                        + f"{', '.join(missing_cols)}"
+                    )
+                continue
+            index_name = self.get_index_name(index_columns)
+            start_time = time()
+            start_size = self.get_db_size()
+            q = (
+                f"create index if not exists {index_name} on {self.table_name} "
+                + f"({', '.join(cols)})"
+            )
+            self.cursor.execute(q)
+            self.dbconn.commit()
+            runtime = time() - start_time
+            size = self.get_db_size() - start_size
+            if self.logger:
+                self.logger.info(
+                    f"index {index_name} ({', '.join(cols)}): "
+                    + f"{runtime:.3f}s, {size} bytes"
+                )
+
+    def get_category_cols(self, col_names: List[str]) -> List[str]:
+        category_cols = [name for name in col_names if name in self.category_values]
+        self.gathered_category_cols.update(category_cols)
+        return category_cols
+
+    def collect_categories(self, rd: dict, category_cols: List[str]):
+        for name in category_cols:
+            val = rd.get(name)
+            if val is None:
+                continue
+            self.category_values[name].update(str(val).split(";"))
+
     def update_col_def(self, col_def):
         if self.cursor is None:
             return
@@ -303,6 +431,10 @@ class Aggregator(object):
                     if "." not in annot_name:
                         self.annotators.append(annot_name)
                         self.ipaths[annot_name] = join(self.input_dir, fname)
+        if self.add_annotators is not None:
+            self.annotators = [
+                v for v in self.annotators if v in self.add_annotators
+            ]
         self.base_fpath = join(self.input_dir, self.input_base_fname)
         self._setup_io()
         self.annotators.sort()
@@ -337,11 +469,13 @@ class Aggregator(object):
                 + '"Variant Annotation", "")'
             )
             self.cursor.execute(q)
-        for _, col_def in self.base_reader.get_all_col_defs().items():
-            col_name = self.base_prefix + "__" + col_def.name
-            col_def.change_name(col_name)
-            columns.append(col_def)
-            unique_names.add(col_name)
+        # Base columns are already in the table when annotators are added.
+        if self.add_annotators is None:
+            for _, col_def in self.base_reader.get_all_col_defs().items():
+                col_name = self.base_prefix + "__" + col_def.name
+                col_def.change_name(col_name)
+                columns.append(col_def)
+                unique_names.add(col_name)
         for annot_name in self.annotators:
             reader = self.readers[annot_name]
             annotator_name = reader.get_annotator_name()
@@ -371,6 +505,13 @@ class Aggregator(object):
                 else:
                     columns.append(col_def)
                     unique_names.add(col_def.name)
+        # Categories of categorical columns without declared categories are
+        # collected while rows are loaded, for fill_categories.
+        self.category_values = {
+            col_def.name: set()
+            for col_def in columns
+            if col_def.category in ["single", "multi"] and not col_def.categories
+        }
         # data table
         col_def_strings = []
         for col_def in columns:
@@ -386,19 +527,6 @@ class Aggregator(object):
                 ", ".join(col_def_strings),
             )
             self.cursor.execute(q)
-            # index tables
-            index_n = 0
-            # index_columns is a list of columns to include in this index
-            for index_columns in self.base_reader.get_index_columns():
-                cols = ["base__{0}".format(x) for x in index_columns]
-                q = "create index {}_idx_{} on {} ({});".format(
-                    self.table_name,
-                    index_n,
-                    self.table_name,
-                    ", ".join(cols),
-                )
-                self.cursor.execute(q)
-                index_n += 1
         else:
             q = f"pragma table_info({self.table_name})"
             self.cursor.execute(q)
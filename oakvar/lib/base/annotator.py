@@ -44,6 +44,7 @@ class BaseAnnotator(object):
         output_columns: List[Dict[str, Any]] = [],
         module_conf: Dict[str, Any] = {},
         code_version: Optional[str] = None,
+        annotation_cache: bool = False,
     ):
         """__init__.
 
@@ -64,6 +65,7 @@ class BaseAnnotator(object):
             output_columns (List[Dict]): output_columns
             module_conf (dict): module_conf
             code_version (Optional[str]): code_version
+            annotation_cache (bool): Use the shared annotation cache of outputs by variant
         """
         import os
         import sys
@@ -113,6 +115,10 @@ class BaseAnnotator(object):
         self.log_path = None
         self.unique_excs = []
         self.log_handler = None
+        self.num_input_rows = 0
+        self.num_output_rows = 0
+        self.use_annotation_cache = annotation_cache
+        self.annotation_cache = None
         self.parse_cmd_args()
         self.serveradmindb = serveradmindb
         self.supported_chroms = set(cannonical_chroms)
@@ -204,7 +210,9 @@ class BaseAnnotator(object):
                 self.code_version: str = self.conf["version"]
             else:
                 self.code_version: str = ""
-        self.cache = ModuleDataCache(self.module_name, module_type=self.module_type)
+        self.cache = ModuleDataCache(
+            self.module_name, module_type=self.module_type, logger=self.logger
+        )
 
     def set_output_columns(self, output_columns: List[Dict[str, Any]]):
         if not self.level:
@@ -517,7 +525,11 @@ class BaseAnnotator(object):
         """process_file.
         """
         assert self._id_col_name, "_id_col_name should not be None."
+        if self.can_use_annotation_cache():
+            self.process_file_with_annotation_cache()
+            return
         for lnum, line, input_data, secondary_data in self._get_input():
+            self.num_input_rows += 1
             try:
                 self.log_progress(lnum)
                 # * allele and undefined non-canonical chroms are skipped.
@@ -537,14 +549,7 @@ class BaseAnnotator(object):
                     continue
                 # Handles empty table-format column data.
                 output_dict = self.handle_jsondata(output_dict)
-                # Preserves the first column
-                if output_dict:
-                    output_dict[self._id_col_name] = input_data[self._id_col_name]
-                # Fill absent columns with empty strings
-                output_dict = self.fill_empty_output(output_dict)
-                # Writes output.
-                if self.output_writer:
-                    self.output_writer.write_data(output_dict)
+                self.write_output_dict(input_data, output_dict)
             except Exception as e:
                 self._log_runtime_exception(
                     lnum,
@@ -556,6 +561,135 @@ class BaseAnnotator(object):
                     else "?",
                 )
 
+    def write_output_dict(self, input_data, output_dict):
+        """write_output_dict.
+
+        Args:
+            input_data:
+            output_dict:
+        """
+        # Preserves the first column
+        if output_dict:
+            output_dict[self._id_col_name] = input_data[self._id_col_name]
+        # Fill absent columns with empty strings
+        output_dict = self.fill_empty_output(output_dict)
+        # Writes output.
+        if self.output_writer:
+            self.output_writer.write_data(output_dict)
+            self.num_output_rows += 1
+
+    def can_use_annotation_cache(self) -> bool:
+        """Outputs are cached by variant only for variant-level annotators which
+        opt in with `annotation_cache: true` in their yml, read the converter
+        output and have no secondary input. `annotate` is not called on cache
+        hits, so modules which override `summarize_by_gene` or `postprocess`,
+        which may rely on state built up in `annotate`, are not cached.
+        """
+        from ..consts import INPUT_LEVEL_KEY
+
+        if not self.use_annotation_cache or not self.conf:
+            return False
+        if self.conf.get("annotation_cache") is not True:
+            return False
+        if (
+            type(self).summarize_by_gene is not BaseAnnotator.summarize_by_gene
+            or type(self).postprocess is not BaseAnnotator.postprocess
+        ):
+            if self.logger:
+                self.logger.warning(
+                    f"annotation cache is not used for {self.module_name} "
+                    + "because it overrides summarize_by_gene or postprocess."
+                )
+            return False
+        return (
+            self.conf.get("level") == "variant"
+            and self.input_format == INPUT_LEVEL_KEY
+            and not self.conf.get("secondary_inputs")
+        )
+
+    def get_annotation_cache_version(self) -> str:
+        """Module version under which outputs are cached. Module options change
+        outputs, so they are a part of it.
+        """
+        from json import dumps
+        from hashlib import blake2b
+
+        version = self.code_version or ""
+        if self.module_options:
+            options = dumps(self.module_options, sort_keys=True, default=str)
+            version += "+" + blake2b(options.encode(), digest_size=8).hexdigest()
+        return version
+
+    def process_file_with_annotation_cache(self):
+        """process_file with the shared annotation cache. Input rows are looked
+        up in the cache in batches, and only the variants which are not in the
+        cache are annotated and then added to the cache.
+        """
+        from ..module.data_cache import AnnotationCache
+        from ..module.data_cache import ANNOTATION_CACHE_BATCH_SIZE
+
+        self.annotation_cache = AnnotationCache(
+            self.module_name, self.get_annotation_cache_version(), logger=self.logger
+        )
+        batch = []
+        for row in self._get_input():
+            batch.append(row)
+            if len(batch) >= ANNOTATION_CACHE_BATCH_SIZE:
+                self.process_batch_with_annotation_cache(batch)
+                batch = []
+        if batch:
+            self.process_batch_with_annotation_cache(batch)
+
+    def process_batch_with_annotation_cache(self, batch):
+        """process_batch_with_annotation_cache.
+
+        Args:
+            batch: List of (lnum, line, input_data, secondary_data)
+        """
+        if not self.annotation_cache:
+            return
+        keys = [
+            (
+                input_data["chrom"],
+                input_data["pos"],
+                input_data["ref_base"],
+                input_data["alt_base"],
+            )
+            for _, _, input_data, _ in batch
+        ]
+        cached = self.annotation_cache.get_many(keys)
+        misses = {}
+        for (lnum, line, input_data, _), key in zip(batch, keys):
+            self.num_input_rows += 1
+            try:
+                self.log_progress(lnum)
+                if self.is_star_allele(input_data) or self.should_skip_chrom(
+                    input_data
+                ):
+                    continue
+                if key in cached:
+                    output_dict = cached[key]
+                else:
+                    output_dict = self.annotate(input_data)
+                    if output_dict is not None:
+                        output_dict = self.handle_jsondata(output_dict)
+                    cached[key] = output_dict
+                    misses[key] = output_dict
+                if output_dict is None:
+                    continue
+                self.write_output_dict(input_data, dict(output_dict))
+            except Exception as e:
+                self._log_runtime_exception(
+                    lnum,
+                    line,
+                    input_data,
+                    e,
+                    fn=self.primary_input_reader.path
+                    if self.primary_input_reader
+                    else "?",
+                )
+        self.annotation_cache.put_many(misses.items())
+
     def postprocess(self):
         """postprocess.
         """
@@ -790,6 +924,12 @@ class BaseAnnotator(object):
         """
         if self.output_writer:
             self.output_writer.close()
+        for fetcher in self.secondary_readers.values():
+            fetcher.close()
+        if self.cache:
+            self.cache.close()
+        if self.annotation_cache:
+            self.annotation_cache.close()
         # self.invalid_file.close()
         if self.dbconn is not None:
             self.close_db_connection()
@@ -812,7 +952,7 @@ class BaseAnnotator(object):
     def _get_input(self):
         """_get_input.
         """
-        from ..util.inout import AllMappingsParser
+        from ..util.inout import get_all_mappings_parser
         from ..consts import all_mappings_col_name
         from ..consts import mapping_parser_name
         from ..exceptions import SetupError
@@ -825,7 +965,7 @@ class BaseAnnotator(object):
                 for col_name in self.conf["input_columns"]:
                     input_data[col_name] = reader_data[col_name]
                 if all_mappings_col_name in input_data:
-                    input_data[mapping_parser_name] = AllMappingsParser(
+                    input_data[mapping_parser_name] = get_all_mappings_parser(
                         input_data[all_mappings_col_name]
                     )
                 secondary_data = {}
@@ -908,6 +1048,12 @@ class BaseAnnotator(object):
 
 class SecondaryInputFetcher:
     """SecondaryInputFetcher.
+
+    Streams a secondary input in lockstep with the primary input when the
+    key column is uid, since annotators write their outputs in uid order.
+    The order is checked while streaming. The first time the secondary input
+    or the requested keys go out of order, falls back to an on-disk sqlite
+    index of the secondary input so that memory use stays constant.
     """
 
     def __init__(self, input_path, key_col, fetch_cols=[]):
@@ -942,21 +1088,124 @@ class SecondaryInputFetcher:
             self.fetch_cols = fetch_cols
         else:
             self.fetch_cols = valid_cols
-        self.data = {}
+        self.data_iter = None
+        self.next_row = None
+        self.last_key = None
+        self.last_ret = None
+        self.index_conn = None
+        self.index_path = None
         self.load_input()
 
     def load_input(self):
         """load_input.
         """
+        if self.key_col == "uid":
+            self.data_iter = self.input_reader.loop_data()
+            self.next_row = self._read_next_row()
+        else:
+            self.build_index()
+
+    def _read_next_row(self):
+        """_read_next_row.
+        """
+        if self.data_iter is None:
+            return None
+        for _, _, all_col_data in self.data_iter:
+            return all_col_data
+        self.data_iter = None
+        return None
+
+    def _get_fetch_col_data(self, all_col_data):
+        """_get_fetch_col_data.
+
+        Args:
+            all_col_data:
+        """
+        return {col: all_col_data.get(col) for col in self.fetch_cols}
+
+    def build_index(self):
+        """build_index.
+        """
+        import sqlite3
+        from json import dumps
+        from tempfile import mkstemp
+        from os import close
+        from pathlib import Path
+
+        self.data_iter = None
+        self.next_row = None
+        self.last_key = None
+        self.last_ret = None
+        fd, index_path = mkstemp(
+            prefix=Path(self.input_path).name + ".",
+            suffix=".secondary.sqlite",
+            dir=str(Path(self.input_path).parent),
+        )
+        close(fd)
+        self.index_path = index_path
+        conn = sqlite3.connect(index_path)
+        conn.execute("pragma journal_mode=off")
+        conn.execute("pragma synchronous=off")
+        conn.execute("create table data (key, val text)")
+        batch = []
         for _, _, all_col_data in self.input_reader.loop_data():
-            key_data = all_col_data.get(self.key_col)
-            if key_data not in self.data:
-                self.data[key_data] = []
-            fetch_col_data = {}
-            for col in self.fetch_cols:
-                val = all_col_data.get(col)
-                fetch_col_data[col] = val
-            self.data[key_data].append(fetch_col_data)
+            batch.append(
+                (
+                    all_col_data.get(self.key_col),
+                    dumps(self._get_fetch_col_data(all_col_data)),
+                )
+            )
+            if len(batch) >= 10000:
+                conn.executemany("insert into data values (?, ?)", batch)
+                batch = []
+        if batch:
+            conn.executemany("insert into data values (?, ?)", batch)
+        conn.execute("create index data_idx on data (key)")
+        conn.commit()
+        self.index_conn = conn
+
+    def _get_from_index(self, key_data):
+        """_get_from_index.
+
+        Args:
+            key_data:
+        """
+        from json import loads
+
+        if self.index_conn is None:
+            return None
+        rows = self.index_conn.execute(
+            "select val from data where key=? order by rowid", (key_data,)
+        ).fetchall()
+        if not rows:
+            return None
+        return [loads(row[0]) for row in rows]
+
+    def _get_from_stream(self, key_data):
+        """_get_from_stream.
+
+        Args:
+            key_data:
+
+        Returns:
+            Rows of `key_data`, or `None` if the secondary input is found to
+            be out of order.
+        """
+        ret = []
+        while self.next_row is not None:
+            row_key = self.next_row.get(self.key_col)
+            if row_key is None:
+                return None
+            if row_key > key_data:
+                break
+            if row_key == key_data:
+                ret.append(self._get_fetch_col_data(self.next_row))
+            self.next_row = self._read_next_row()
+            if self.next_row is not None:
+                next_row_key = self.next_row.get(self.key_col)
+                if next_row_key is None or next_row_key < row_key:
+                    return None
+        return ret
 
     def get(self, key_data):
         """get.
@@ -964,7 +1213,36 @@ class SecondaryInputFetcher:
         Args:
             key_data:
         """
-        if key_data in self.data:
-            return self.data[key_data]
-        else:
+        if key_data is None:
             return None
+        if self.index_conn is None:
+            if self.last_key is not None and key_data == self.last_key:
+                return self.last_ret
+            try:
+                if self.last_key is not None and key_data < self.last_key:
+                    ret = None
+                else:
+                    ret = self._get_from_stream(key_data)
+            except TypeError:
+                ret = None
+            if ret is not None:
+                self.last_key = key_data
+                self.last_ret = ret or None
+                return self.last_ret
+            self.build_index()
+        return self._get_from_index(key_data)
+
+    def close(self):
+        """close.
+        """
+        from os import remove
+        from os.path import exists
+
+        self.data_iter = None
+        self.next_row = None
+        if self.index_conn is not None:
+            self.index_conn.close()
+            self.index_conn = None
+        if self.index_path and exists(self.index_path):
+            remove(self.index_path)
+        self.index_path = None
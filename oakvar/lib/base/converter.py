@@ -3,6 +3,7 @@ from typing import Any
 from typing import List
 from typing import Dict
 from typing import Tuple
+from typing import Iterator
 
 
 class BaseConverter(object):
@@ -28,6 +29,9 @@ class BaseConverter(object):
         self.ignore_sample: bool = ignore_sample
         self.header_num_line: int = 0
         self.line_no: int = 0
+        self.compressed_readers: Dict[str, List[Any]] = {}
+        self.input_encodings: Dict[str, str] = {}
+        self.region_lines: Optional[Iterator[Tuple[int, str]]] = None
         if name:
             self.module_name = name
         self.title = title
@@ -60,21 +64,29 @@ class BaseConverter(object):
         self, input_path: str, mp: int, start_line_no: int, batch_size: int
     ) -> Tuple[Dict[int, List[Tuple[int, Any]]], bool]:
         import linecache
+        from oakvar.lib.util.bgzf import is_gzip
 
+        compressed = is_gzip(input_path)
         immature_exit: bool = False
         line_no: int = start_line_no
-        end_line_no = line_no + mp * batch_size - 1
         lines: Dict[int, List[Tuple[int, Any]]] = {i: [] for i in range(mp)}
         chunk_no: int = 0
         chunk_size: int = 0
+        num_lines: int = 0
         while True:
-            line = linecache.getline(input_path, line_no)
+            if self.region_lines is not None:
+                line_no, line = next(self.region_lines, (line_no, ""))
+            elif compressed:
+                line = self.get_compressed_line(input_path, line_no)
+            else:
+                line = linecache.getline(input_path, line_no)
             if not line:
                 break
             line = line[:-1]
             lines[chunk_no].append((line_no, line))
             chunk_size += 1
-            if line_no >= end_line_no:
+            num_lines += 1
+            if num_lines >= mp * batch_size:
                 immature_exit = True
                 break
             line_no += 1
@@ -83,6 +95,28 @@ class BaseConverter(object):
                 chunk_size = 0
         return lines, immature_exit
 
+    def get_compressed_line(self, input_path: str, line_no: int) -> str:
+        """linecache.getline for gzip and bgzip inputs. Lines are read in
+        order from a reader which is kept open between batches."""
+        from gzip import open as gzipopen
+
+        reader = self.compressed_readers.get(input_path)
+        if reader is None or reader[0] > line_no:
+            if reader is not None:
+                reader[1].close()
+            encoding = self.input_encodings.get(input_path) or "utf-8"
+            reader = [1, gzipopen(input_path, "rt", encoding=encoding)]
+            self.compressed_readers[input_path] = reader
+        f = reader[1]
+        while reader[0] < line_no:
+            if not f.readline():
+                return ""
+            reader[0] += 1
+        line = f.readline()
+        if line:
+            reader[0] += 1
+        return line
+
     def prepare_for_mp(self):
         pass
 
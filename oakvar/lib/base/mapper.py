@@ -184,13 +184,13 @@ class BaseMapper(object):
                 self.add_crx_to_gene_info(crx_data)
 
     def add_crx_to_gene_info(self, crx_data):
-        from ..util.inout import AllMappingsParser
+        from ..util.inout import get_all_mappings_parser
 
         tmap_json = crx_data["all_mappings"]
         # Return if no tmap
         if tmap_json == "":
             return
-        tmap_parser = AllMappingsParser(tmap_json)
+        tmap_parser = get_all_mappings_parser(tmap_json)
         for hugo in tmap_parser.get_genes():
             self.gene_info[hugo] = True
 
@@ -32,7 +32,7 @@ def flush_err_holder(err_holder: list, error_logger, force: bool=False):
         err_holder.clear()
 
 def _log_conversion_error(logger, error_logger, input_path: str, line_no: int, e, unique_excs: dict, err_holder: list):
-    from traceback import format_exc
+    from traceback import format_exception
     from oakvar.lib.exceptions import ExpectedException
     from oakvar.lib.exceptions import NoAlternateAllele
 
@@ -41,7 +41,7 @@ def _log_conversion_error(logger, error_logger, input_path: str, line_no: int, e
     if isinstance(e, ExpectedException):
         err_str = str(e)
     else:
-        err_str = format_exc().rstrip()
+        err_str = "".join(format_exception(type(e), e, e.__traceback__)).rstrip()
     if err_str not in unique_excs:
         err_no = len(unique_excs)
         unique_excs[err_str] = err_no
@@ -92,6 +92,53 @@ def perform_liftover_if_needed(variant, do_liftover: bool, do_liftover_chrM: boo
         crl_data = None
     return crl_data
 
+def perform_liftover_many(variants: List[Dict[str, Any]], do_liftover: bool, do_liftover_chrM: bool, lifter, wgs_reader) -> List[Optional[Exception]]:
+    from copy import copy
+    from oakvar.lib.util.seq import get_liftover_many_errors
+    from oakvar.lib.util.seq import liftover_one_pos_many
+
+    errors: List[Optional[Exception]] = [None] * len(variants)
+    to_lift: List[int] = []
+    for i, variant in enumerate(variants):
+        if (do_liftover_chrM if is_chrM(variant) else do_liftover):
+            to_lift.append(i)
+        else:
+            variant["crl"] = None
+    if not to_lift:
+        return errors
+    lift_variants = [variants[i] for i in to_lift]
+    lifteds, lift_errors = get_liftover_many_errors(
+        [v["chrom"] for v in lift_variants],
+        [int(v["pos"]) for v in lift_variants],
+        refs=[v["ref_base"] for v in lift_variants],
+        alts=[v["alt_base"] for v in lift_variants],
+        lifter=lifter,
+        wgs_reader=wgs_reader,
+    )
+    lifted_end_chroms: List[str] = []
+    lifted_end_poss: List[int] = []
+    for i, variant, lifted, lift_error in zip(to_lift, lift_variants, lifteds, lift_errors):
+        if lift_error is not None or lifted is None:
+            errors[i] = lift_error
+            continue
+        variant["crl"] = copy(variant)
+        (
+            variant["chrom"],
+            variant["pos"],
+            variant["ref_base"],
+            variant["alt_base"],
+        ) = lifted
+        lifted_end_chroms.append(variant["chrom"])
+        lifted_end_poss.append(variant["pos_end"])
+    converted_ends = liftover_one_pos_many(lifted_end_chroms, lifted_end_poss, lifter=lifter)
+    converted_ends_iter = iter(converted_ends)
+    for i, variant in zip(to_lift, lift_variants):
+        if errors[i] is not None:
+            continue
+        converted_end = next(converted_ends_iter)
+        variant["pos_end"] = "" if converted_end is None else converted_end[1]
+    return errors
+
 def add_end_pos_if_absent(variant: dict):
     col_name = "pos_end"
     if col_name not in variant:
@@ -119,6 +166,34 @@ def normalize_variant(variant):
     variant["ref_base"] = new_ref
     variant["alt_base"] = new_alt
 
+def normalize_variants(variants: List[Dict[str, Any]]):
+    from oakvar.lib.util.seq import normalize_variants_left
+
+    new_poss, new_refs, new_alts = normalize_variants_left(
+        "+",
+        [int(v["pos"]) for v in variants],
+        [v["ref_base"] for v in variants],
+        [v["alt_base"] for v in variants],
+    )
+    for variant, new_pos, new_ref, new_alt in zip(variants, new_poss, new_refs, new_alts):
+        variant["pos"] = new_pos
+        variant["ref_base"] = new_ref
+        variant["alt_base"] = new_alt
+
+def check_invalid_bases_many(variants: List[Dict[str, Any]]) -> List[Optional[Exception]]:
+    from oakvar.lib.util.seq import fullmatch_many
+    from oakvar.lib.exceptions import IgnoredVariant
+
+    valid_refs = fullmatch_many(base_re.pattern, [v["ref_base"] for v in variants])
+    valid_alts = fullmatch_many(base_re.pattern, [v["alt_base"] for v in variants])
+    errors: List[Optional[Exception]] = [None] * len(variants)
+    for i, variant in enumerate(variants):
+        if not valid_refs[i]:
+            errors[i] = IgnoredVariant(f"Invalid reference base {variant['ref_base']}")
+        elif not valid_alts[i]:
+            errors[i] = IgnoredVariant(f"Invalid alternate base {variant['alt_base']}")
+    return errors
+
 def check_invalid_base(variant: dict):
     from oakvar.lib.exceptions import IgnoredVariant
 
@@ -162,27 +237,45 @@ def handle_chrom(variant):
         variant.get("chrom"), variant.get("chrom")
     )
 
-def handle_variant(
-        variant: dict, do_liftover: bool, do_liftover_chrM: bool, lifter, wgs_reader, line_no: int
-):
+def handle_variant_pre_liftover(variant: dict):
     from oakvar.lib.exceptions import NoVariantError
 
     if variant["ref_base"] == variant["alt_base"]:
         raise NoVariantError()
-    tags = variant.get("tags")
     handle_chrom(variant)
+
+def handle_variant_post_liftover(variant: dict, line_no: int):
+    handle_genotype(variant)
+    variant["original_line"] = line_no
+
+def handle_variant(
+        variant: dict, do_liftover: bool, do_liftover_chrM: bool, lifter, wgs_reader, line_no: int
+):
+    tags = variant.get("tags")
+    handle_variant_pre_liftover(variant)
     handle_ref_base(variant, wgs_reader)
     check_invalid_base(variant)
     normalize_variant(variant)
     add_end_pos_if_absent(variant)
-    crl_data = perform_liftover_if_needed(variant, do_liftover, do_liftover_chrM, lifter, wgs_reader)
-    handle_genotype(variant)
-    variant["original_line"] = line_no
+    variant["crl"] = perform_liftover_if_needed(variant, do_liftover, do_liftover_chrM, lifter, wgs_reader)
+    handle_variant_post_liftover(variant, line_no)
     variant["tags"] = tags
-    variant["crl"] = crl_data
+
+def prepare_variant_for_liftover(variant: dict, wgs_reader):
+    handle_variant_pre_liftover(variant)
+    handle_ref_base(variant, wgs_reader)
+
+def prepare_variants_for_liftover(variants: List[Dict[str, Any]]) -> List[Optional[Exception]]:
+    """Checks and normalizes the bases of a batch of variants at once."""
+    errors = check_invalid_bases_many(variants)
+    valid_variants = [v for v, e in zip(variants, errors) if e is None]
+    normalize_variants(valid_variants)
+    for variant in valid_variants:
+        add_end_pos_if_absent(variant)
+    return errors
 
 def handle_converted_variants(
-        variants: List[Dict[str, Any]], do_liftover: bool, do_liftover_chrM: bool, lifter, wgs_reader, logger, error_logger, input_path: str, unique_excs: dict, err_holder: list, line_no: int
+        variants: List[Dict[str, Any]], do_liftover: bool, do_liftover_chrM: bool, lifter, wgs_reader, logger, error_logger, input_path: str, unique_excs: dict, err_holder: list, line_no: int, batch_liftover: bool=False
 ) -> Tuple[List[Dict[str, Any]], bool]:
     from oakvar.lib.exceptions import IgnoredVariant
 
@@ -194,7 +287,10 @@ def handle_converted_variants(
     error_occurred: bool = False
     for variant in variants:
         try:
-            handle_variant(variant, do_liftover, do_liftover_chrM, lifter, wgs_reader, line_no)
+            if batch_liftover:
+                prepare_variant_for_liftover(variant, wgs_reader)
+            else:
+                handle_variant(variant, do_liftover, do_liftover_chrM, lifter, wgs_reader, line_no)
             variant_l.append(variant)
         except Exception as e:
             _log_conversion_error(logger, error_logger, input_path, line_no, e, unique_excs, err_holder)
@@ -219,22 +315,41 @@ def gather_variantss(
 ) -> List[List[Dict[str, Any]]]:
     variants_l: List[List[Dict[str, Any]]] = []
     line_data = lines_data[core_num]
+    converted_lines: List[Tuple[int, List[Dict[str, Any]], bool]] = []
     for (line_no, line) in line_data:
         try:
             variants = converter.convert_line(line)
-            variants_datas, error_occurred = handle_converted_variants(variants, do_liftover, do_liftover_chrM, lifter, wgs_reader, logger, error_logger, input_path, unique_excs, err_holder, line_no)
-            if error_occurred:
-                num_valid_error_lines["error"] += 1
-            else:
-                num_valid_error_lines["valid"] += 1
-            if not variants_datas:
-                continue
-            variants_l.append(variants_datas)
+            variants_datas, error_occurred = handle_converted_variants(variants, do_liftover, do_liftover_chrM, lifter, wgs_reader, logger, error_logger, input_path, unique_excs, err_holder, line_no, batch_liftover=True)
+            converted_lines.append((line_no, variants_datas, error_occurred))
         except KeyboardInterrupt:
             raise
         except Exception as e:
             _log_conversion_error(logger, error_logger, input_path, line_no, e, unique_excs, err_holder)
             num_valid_error_lines["error"] += 1
+    all_variants = [variant for _, variants_datas, _ in converted_lines for variant in variants_datas]
+    errors = prepare_variants_for_liftover(all_variants)
+    liftover_errors = perform_liftover_many([v for v, e in zip(all_variants, errors) if e is None], do_liftover, do_liftover_chrM, lifter, wgs_reader)
+    liftover_errors_iter = iter(liftover_errors)
+    errors_iter = iter(errors)
+    for line_no, variants_datas, error_occurred in converted_lines:
+        valid_variants: List[Dict[str, Any]] = []
+        for variant in variants_datas:
+            e = next(errors_iter)
+            if e is None:
+                e = next(liftover_errors_iter)
+            if e is not None:
+                _log_conversion_error(logger, error_logger, input_path, line_no, e, unique_excs, err_holder)
+                error_occurred = True
+                continue
+            handle_variant_post_liftover(variant, line_no)
+            valid_variants.append(variant)
+        if error_occurred:
+            num_valid_error_lines["error"] += 1
+        else:
+            num_valid_error_lines["valid"] += 1
+        if not valid_variants:
+            continue
+        variants_l.append(valid_variants)
     return variants_l
 
 def gather_variantss_wrapper(args):
@@ -255,10 +370,12 @@ class MasterConverter(object):
         ignore_sample: bool=False,
         skip_variant_deduplication: bool=False,
         mp: int=1,
+        regions: Optional[List[str]] = None,
         outer=None,
     ):
         from re import compile
-        from oakvar import get_wgs_reader
+        from oakvar.lib.util.seq import get_cached_wgs_reader
+        from oakvar.lib.util.regions import parse_regions
         from oakvar.lib.exceptions import ExpectedException
 
         self.logger = None
@@ -330,9 +447,10 @@ class MasterConverter(object):
         self.input_encoding = input_encoding
         self.outer = outer
         self.setup_logger()
-        self.wgs_reader = get_wgs_reader(assembly="hg38")
+        self.wgs_reader = get_cached_wgs_reader(assembly="hg38")
         self.time_error_written: float = 0
         self.mp = mp
+        self.regions = parse_regions(regions) if regions else None
 
     def get_genome_assembly(self, converter) -> str:
         from oakvar.lib.system.consts import default_assembly_key
@@ -664,6 +782,7 @@ class MasterConverter(object):
         self.error_logger = getLogger("err." + converter.module_name)
         converter.input_path = input_path
         converter.input_paths = self.input_paths
+        converter.input_encodings[input_path] = encoding
         converter.setup(input_path, encoding=encoding)
         genome_assembly = self.get_genome_assembly(converter)
         self.genome_assemblies.append(genome_assembly)
@@ -673,6 +792,22 @@ class MasterConverter(object):
             self.setup_lifter(genome_assembly)
         return converter
 
+    def set_region_lines(self, converter: BaseConverter, input_path: str):
+        from oakvar.lib.util.regions import RegionIndex
+        from oakvar.lib.util.regions import REGION_INPUT_FORMATS
+        from oakvar.lib.exceptions import ArgumentError
+
+        if not self.regions:
+            return
+        if converter.format_name not in REGION_INPUT_FORMATS:
+            raise ArgumentError(
+                msg=f"--regions is supported only for {REGION_INPUT_FORMATS} inputs. "
+                + f"{input_path} is {converter.format_name}."
+            )
+        index = RegionIndex(input_path, logger=self.logger)
+        encoding = self.input_file_handles.get(input_path) or "utf-8"
+        converter.region_lines = index.iter_lines(self.regions, encoding=encoding)
+
     def handle_chrom(self, variant):
         from oakvar.lib.exceptions import IgnoredVariant
 
@@ -786,6 +921,8 @@ class MasterConverter(object):
             self.input_fname = Path(input_path).name
             fileno = self.input_path_dict2[input_path]
             converter = self.setup_file(input_path)
+            if self.regions:
+                self.set_region_lines(converter, input_path)
             self.file_num_unique_variants = 0
             self.file_num_dup_variants: int = 0
             self.file_error_lines = 0
@@ -4,10 +4,42 @@ def init_worker():
     signal.signal(signal.SIGINT, signal.SIG_IGN)
 
 
+vcf2vcf_worker = None
+
+
+def init_vcf2vcf_worker(kwargs):
+    from .vcf2vcf import VCF2VCF
+
+    global vcf2vcf_worker
+    init_worker()
+    vcf2vcf_worker = VCF2VCF(**kwargs)
+    vcf2vcf_worker.load_run_modules()
+
+
+def vcf2vcf_chunk_runner(path, start, end, start_lnum, prev_coffset=None, bgzf=False):
+    from ..exceptions import SetupError
+
+    if vcf2vcf_worker is None:
+        raise SetupError(msg="vcf2vcf worker was not initialized")
+    return vcf2vcf_worker.process_chunk(
+        path, start, end, start_lnum, prev_coffset=prev_coffset, bgzf=bgzf
+    )
+
+
 def annot_from_queue(
-    start_queue, end_queue, queue_populated, serveradmindb, logtofile, log_path
+    start_queue,
+    end_queue,
+    queue_populated,
+    serveradmindb,
+    logtofile,
+    log_path,
+    profiler=None,
+    profile_prefix=None,
 ):
+    from os import getpid
     from ..util.util import load_class
+    from ..util.metrics import measure
+    from ..util.metrics import run_with_profiler
     from logging import getLogger, StreamHandler, FileHandler, Formatter
     from queue import Empty
     from ..exceptions import ModuleLoadingError
@@ -44,8 +76,14 @@ def annot_from_queue(
                 annotator_class = load_class(module.script_path, "CravatAnnotator")
             if annotator_class:
                 annotator = annotator_class(**kwargs)
-                annotator.run()
-                end_queue.put(module.name)
+                worker = str(getpid())
+                with measure("annotator", module=module.name, worker=worker) as record:
+                    run_with_profiler(
+                        annotator.run, profiler, f"{profile_prefix}.{module.name}"
+                    )
+                record["rows_in"] = getattr(annotator, "num_input_rows", None)
+                record["rows_out"] = getattr(annotator, "num_output_rows", None)
+                end_queue.put((module.name, record))
             else:
                 raise ModuleLoadingError(msg=f"Annotator of {module.name} could not be loaded.")
         except Exception:
@@ -90,3 +128,20 @@ def mapper_runner(
         else:
             raise ModuleLoadingError(msg=f"Mapper of {module_name} could not be loaded.")
     return output
+
+
+def mapper_chunk_runner(args, profiler=None, profile_prefix=None):
+    """Runs mapper_runner on a chunk and returns the metrics of the chunk."""
+    from os import getpid
+    from ..util.metrics import measure
+    from ..util.metrics import run_with_profiler
+
+    chunksize = args[2]
+    module_name = args[5]
+    pos_no = args[6]
+    worker = f"chunk{pos_no}:{getpid()}"
+    profile_path = f"{profile_prefix}.{module_name}.chunk{pos_no}"
+    with measure("mapper", module=module_name, worker=worker) as record:
+        run_with_profiler(mapper_runner, profiler, profile_path, *args)
+    record["rows_in"] = chunksize
+    return record
@@ -28,6 +28,8 @@ class BasePostAggregator(object):
         self.logger = None
         self.error_logger = None
         self.unique_excs = []
+        self.num_input_rows = 0
+        self.num_output_rows = 0
         self.module_name = module_name
         if not self.output_dir:
             raise ArgumentError(msg="Output directory was not given.")
@@ -301,12 +303,14 @@ class BasePostAggregator(object):
         lnum = 0
         self.cursor_w.execute("begin")
         for input_data in self._get_input():
+            self.num_input_rows += 1
             try:
                 output_dict = self.annotate(input_data)
                 if not output_dict:
                     continue
                 output_dict = self.handle_legacy_data(output_dict)
                 self.write_output(output_dict, input_data=input_data)
+                self.num_output_rows += 1
                 lnum += 1
                 if lnum % 10000 == 0:
                     status = (
@@ -232,15 +232,17 @@ class ReportFilter:
         conn_read, conn_write = await self.get_db_conns()
         if not conn_read or not conn_write:
             return None
-        cursor_read = await conn_read.cursor()
-        cursor_write = await conn_write.cursor()
-        ret = await func(
-            *args, cursor_read=cursor_read, cursor_write=cursor_write, **kwargs
-        )
-        await cursor_read.close()
-        await cursor_write.close()
-        await conn_read.close()
-        await conn_write.close()
+        try:
+            cursor_read = await conn_read.cursor()
+            cursor_write = await conn_write.cursor()
+            ret = await func(
+                *args, cursor_read=cursor_read, cursor_write=cursor_write, **kwargs
+            )
+            await cursor_read.close()
+            await cursor_write.close()
+        finally:
+            await conn_read.close()
+            await conn_write.close()
         return ret
 
     async def second_init(self):
@@ -387,12 +389,21 @@ class ReportFilter:
         if not self.dbpath:
             return None, None
         conn_read = await connect(self.dbpath)
-        conn_read.row_factory = Row
-        await conn_read.execute("pragma journal_mode=wal")
-        await self.create_and_attach_filter_database(conn_read)
-        conn_write = await connect(self.dbpath)
-        await conn_write.execute("pragma journal_mode=wal")
-        await self.create_and_attach_filter_database(conn_write)
+        conn_write = None
+        try:
+            conn_read.row_factory = Row
+            await conn_read.execute("pragma journal_mode=wal")
+            await self.create_and_attach_filter_database(conn_read)
+            conn_write = await connect(self.dbpath)
+            await conn_write.execute("pragma journal_mode=wal")
+            await self.create_and_attach_filter_database(conn_write)
+        except Exception:
+            # Closes the connections, whose threads would otherwise keep the
+            # interpreter from exiting.
+            await conn_read.close()
+            if conn_write:
+                await conn_write.close()
+            raise
         return conn_read, conn_write
 
     async def connect_dbs(self, dbpath=None):
@@ -5,6 +5,8 @@ from typing import Dict
 from typing import List
 from pathlib import Path
 
+STREAM_CHUNK_SIZE = 1000
+
 
 class BaseReporter:
     def __init__(
@@ -83,6 +85,8 @@ class BaseReporter:
         self.extracted_col_names: Dict[str, List[str]] = {}
         self.extracted_col_nos: Dict[str, List[int]] = {}
         self.retrieved_col_names: Dict[str, List[str]] = {}
+        self.column_sub_plans: Dict[str, List[Any]] = {}
+        self.columnar: bool = False
         self.conn = None
         self.levels_to_write = None
         self.conf = conf
@@ -252,50 +256,67 @@ class BaseReporter:
         elif self.logger:
             self.logger.exception(e)
 
-    def substitute_val(self, level, row):
-        from json import loads
-        from json import dumps
-
-        idx: int = -1
+    def make_column_sub_plan(self, level):
+        """Resolves the column substitutions of `level` against the retrieved
+        columns once, as (column name, column index, substitution) tuples."""
+        plan = []
+        retrieved_col_names = self.retrieved_col_names.get(level, [])
         for sub in self.column_subs.get(level, []):
             col_name = f"{sub.module}__{sub.col}"
-            if self.dictrow:
-                value = row[col_name]
-            else:
-                if col_name not in self.retrieved_col_names[level]:
-                    continue
-                idx = self.retrieved_col_names[level].index(col_name)
-                value = row[idx]
-            if value is None or value == "" or value == "{}":
+            if col_name not in retrieved_col_names:
                 continue
-            if (
-                level == "variant"
-                and sub.module == "base"
-                and sub.col == "all_mappings"
-            ):
-                mappings = loads(value)
-                for gene in mappings:
-                    for i in range(len(mappings[gene])):
-                        sos = mappings[gene][i][2].split(",")
-                        sos = [sub.subs.get(so, so) for so in sos]
-                        mappings[gene][i][2] = ",".join(sos)
-                value = dumps(mappings)
-            elif level == "gene" and sub.module == "base" and sub.col == "all_so":
-                vals = []
-                for i, so_count in enumerate(value.split(",")):
-                    so = so_count[:3]
-                    so = sub.subs.get(so, so)
-                    so_count = so + so_count[3:]
-                    vals.append(so_count)
-                value = ",".join(vals)
-            else:
-                value = sub.subs.get(value, value)
+            plan.append((col_name, retrieved_col_names.index(col_name), sub))
+        self.column_sub_plans[level] = plan
+        return plan
+
+    def get_substituted_value(self, level, sub, value):
+        from ..util.inout import get_all_mappings_parser
+
+        if value is None or value == "" or value == "{}":
+            return value
+        if level == "variant" and sub.module == "base" and sub.col == "all_mappings":
+            return get_all_mappings_parser(value).substitute_sos(sub.subs).to_json()
+        elif level == "gene" and sub.module == "base" and sub.col == "all_so":
+            vals = []
+            for so_count in value.split(","):
+                so = so_count[:3]
+                so = sub.subs.get(so, so)
+                vals.append(so + so_count[3:])
+            return ",".join(vals)
+        else:
+            return sub.subs.get(value, value)
+
+    def substitute_val(self, level, row):
+        plan = self.column_sub_plans.get(level)
+        if plan is None:
+            plan = self.make_column_sub_plan(level)
+        for col_name, idx, sub in plan:
             if self.dictrow:
-                row[col_name] = value
+                row[col_name] = self.get_substituted_value(level, sub, row[col_name])
             else:
-                row[idx] = value
+                row[idx] = self.get_substituted_value(level, sub, row[idx])
         return row
 
+    def substitute_columns(self, level, columns: Dict[str, List[Any]]):
+        """Column-wise substitute_val. Plain substitutions are dictionary
+        lookups over the whole column."""
+        plan = self.column_sub_plans.get(level)
+        if plan is None:
+            plan = self.make_column_sub_plan(level)
+        for col_name, _, sub in plan:
+            values = columns[col_name]
+            if (level == "variant" and col_name == "base__all_mappings") or (
+                level == "gene" and col_name == "base__all_so"
+            ):
+                columns[col_name] = [
+                    self.get_substituted_value(level, sub, v) for v in values
+                ]
+            else:
+                subs = {k: v for k, v in sub.subs.items() if k not in ("", "{}")}
+                get = subs.get
+                columns[col_name] = [get(v, v) if v is not None else v for v in values]
+        return columns
+
     def get_extracted_header_columns(self, level):
         cols = []
         for col in self.colinfo[level]["columns"]:
@@ -504,6 +525,13 @@ class BaseReporter:
         self.num_retrieved_cols = len(self.retrieved_col_names[level])
         self.colnos_to_display[level] = [self.retrieved_col_names[level].index(c) for c in self.colnames_to_display[level]]
         self.extracted_colnos_in_retrieved = [self.retrieved_col_names[level].index(c) for c in self.extracted_col_names[level]]
+        self.make_column_sub_plan(level)
+        if self.columnar and not (level == "gene" and add_summary):
+            await self.write_data_columns(level, cursor_read, pagesize=pagesize)
+            await cursor_read.close()
+            await conn_read.close()
+            await conn_write.close()
+            return
         async for datarow in cursor_read:
             if self.dictrow:
                 datarow = dict(datarow)
@@ -529,6 +557,84 @@ class BaseReporter:
         await conn_read.close()
         await conn_write.close()
 
+    async def write_data_columns(self, level: str, cursor_read, pagesize=None):
+        """Columnar write_data. Rows are fetched in chunks of
+        STREAM_CHUNK_SIZE, substitutions and escaping are done per column of
+        a chunk, and the displayed columns of each chunk are handed to
+        write_table_rows as a list of rows."""
+        row_count = 0
+        while not pagesize or row_count < pagesize:
+            size = STREAM_CHUNK_SIZE
+            if pagesize:
+                size = min(size, pagesize - row_count)
+            rows = await cursor_read.fetchmany(size)
+            if not rows:
+                break
+            row_count += len(rows)
+            await self.write_table_rows(self.get_display_rows(level, rows))
+
+    def get_display_rows(self, level: str, rows) -> List[List[Any]]:
+        col_names = self.retrieved_col_names[level]
+        columns = {k: list(v) for k, v in zip(col_names, zip(*rows))}
+        self.substitute_columns(level, columns)
+        if not hasattr(self, "keep_json_all_mapping") and level == "variant":
+            self.stringify_all_mapping_column(columns)
+        display_col_names = self.colnames_to_display[level]
+        for col_name in display_col_names:
+            self.escape_column(columns, col_name)
+        display_cols = [columns[col_name] for col_name in display_col_names]
+        if level == "variant" and self.separatesample:
+            col_name = (
+                "base__samples" if self.legacy_samples_col else "tagsampler__samples"
+            )
+            if col_name in columns:
+                display_cols = self.separate_sample_column(
+                    display_cols,
+                    columns[col_name],
+                    display_col_names.index(col_name)
+                    if col_name in display_col_names
+                    else None,
+                )
+        return [list(row) for row in zip(*display_cols)]
+
+    def separate_sample_column(
+        self, display_cols: List[List[Any]], samples: List[Any], idx: Optional[int]
+    ):
+        num_samples = [len(v.split(";")) if v else 1 for v in samples]
+        if all([n == 1 for n in num_samples]):
+            return display_cols
+        new_cols = []
+        for i, col in enumerate(display_cols):
+            if i == idx:
+                new_col = []
+                for v in samples:
+                    new_col.extend(v.split(";") if v else [v])
+            else:
+                new_col = [v for v, n in zip(col, num_samples) for _ in range(n)]
+            new_cols.append(new_col)
+        return new_cols
+
+    def escape_column(self, columns: Dict[str, List[Any]], col_name: str):
+        values = columns[col_name]
+        if any([isinstance(v, str) and "\n" in v for v in values]):
+            columns[col_name] = [
+                v.replace("\n", "%0A") if isinstance(v, str) else v for v in values
+            ]
+
+    def stringify_all_mapping_column(self, columns: Dict[str, List[Any]]):
+        from ..util.inout import get_all_mappings_parser
+
+        col_name = "base__all_mappings"
+        if col_name not in columns:
+            return
+        columns[col_name] = [
+            get_all_mappings_parser(v).get_report_string() for v in columns[col_name]
+        ]
+
+    async def write_table_rows(self, rows: List[List[Any]]):
+        for row in rows:
+            self.write_table_row(row)
+
     def write_row_with_samples_separate_or_not(self, datarow):
         if self.legacy_samples_col:
             col_name = "base__samples"
@@ -559,41 +665,20 @@ class BaseReporter:
                     datarow[col_no] = v.replace("\n", "%0A")
 
     def stringify_all_mapping(self, level, datarow):
-        from json import loads
+        from ..util.inout import get_all_mappings_parser
 
         if hasattr(self, "keep_json_all_mapping") is True or level != "variant":
             return
         col_name = "base__all_mappings"
         idx: Optional[int] = None
         if self.dictrow:
-            all_map = loads(datarow[col_name])
+            value = datarow[col_name]
         else:
             if col_name not in self.retrieved_col_names[level]:
                 return
             idx = self.retrieved_col_names[level].index(col_name)
-            all_map = loads(datarow[idx])
-        newvals = []
-        for hugo in all_map:
-            for maprow in all_map[hugo]:
-                if len(maprow) == 5:
-                    # TODO: remove this after a while. Now is 10/22/2022.
-                    [protid, protchange, so, transcript, rnachange] = maprow
-                    exonno = ""
-                else:
-                    [protid, protchange, so, transcript, rnachange, exonno] = maprow
-                if protid is None:
-                    protid = "(na)"
-                if protchange is None:
-                    protchange = "(na)"
-                if rnachange is None:
-                    rnachange = "(na)"
-                newval = (
-                    f"{transcript}:{hugo}:{protid}:{so}:{protchange}"
-                    + f":{rnachange}:{exonno}"
-                )
-                newvals.append(newval)
-        newvals.sort()
-        newcell = "; ".join(newvals)
+            value = datarow[idx]
+        newcell = get_all_mappings_parser(value).get_report_string()
         if self.dictrow:
             datarow[col_name] = newcell
         elif idx is not None:
@@ -763,9 +848,12 @@ class BaseReporter:
         return coldefs
 
     async def gather_col_categories(self, level, coldef, conn):
-        cursor = await conn.cursor()
         if coldef.category not in ["single", "multi"] or len(coldef.categories) > 0:
             return coldef
+        # Already gathered by the aggregator.
+        if coldef.d.get("categories_gathered"):
+            return coldef
+        cursor = await conn.cursor()
         sql = f"select distinct {coldef.name} from {level}"
         await cursor.execute(sql)
         rs = await cursor.fetchall()
@@ -78,6 +78,14 @@ class Runner(object):
         self.report_response = None
         self.outer = None
         self.error = None
+        self.metrics = None
+        self.profile_prefix = None
+        self.checkpoint = None
+        self.checkpoint_keys: Dict[str, str] = {}
+        self.resumed_crv: Optional[str] = None
+        self.resumed_db: Optional[str] = None
+        self.db_checkpoint_name: Optional[str] = None
+        self.db_changed = False
 
     def check_valid_modules(self, module_names):
         from ..exceptions import ModuleNotExist
@@ -278,6 +286,8 @@ class Runner(object):
 
     async def main(self) -> Optional[Dict[str, Any]]:
         from time import time, asctime, localtime
+        from pathlib import Path
+        from ..util.metrics import PipelineMetrics
         from ..util.run import update_status
         from ..consts import JOB_STATUS_FINISHED
         from ..consts import JOB_STATUS_ERROR
@@ -286,9 +296,15 @@ class Runner(object):
         if not self.args or not self.run_name:
             raise
         self.sanity_check_run_name_output_dir()
+        if self.args.scatter:
+            return self.write_scatter_manifests()
         await self.setup_manager()
         for run_no in range(len(self.run_name)):
             try:
+                self.metrics = PipelineMetrics()
+                self.profile_prefix = str(
+                    Path(self.output_dir[run_no]) / self.run_name[run_no]
+                )
                 self.start_log(run_no)
                 await self.process_clean(run_no)
                 self.connect_admindb_if_needed(run_no)
@@ -301,11 +317,14 @@ class Runner(object):
                 self.write_initial_info_json(run_no)
                 self.log_input(run_no)
                 self.set_and_check_input_files(run_no)
+                self.set_checkpoint(run_no)
                 self.log_versions()
                 if self.args and self.args.vcf2vcf:
-                    await self.run_vcf2vcf(run_no)
+                    with self.metrics.measure("vcf2vcf"):
+                        await self.run_vcf2vcf(run_no)
                 else:
                     await self.process_file(run_no)
+                self.write_metrics(run_no)
                 end_time = time()
                 runtime = end_time - self.start_time
                 display_time = asctime(localtime(end_time))
@@ -342,6 +361,252 @@ class Runner(object):
                     raise self.exception
         return self.report_response
 
+    def write_metrics(self, run_no: int):
+        from pathlib import Path
+        from ..util.metrics import METRICS_FILE_SUFFIX
+
+        if not self.metrics or not self.run_name or not self.output_dir:
+            return
+        output_dir = Path(self.output_dir[run_no])
+        run_name = self.run_name[run_no]
+        self.metrics.write_json(output_dir / (run_name + METRICS_FILE_SUFFIX))
+        dbpath = output_dir / (run_name + ".sqlite")
+        if dbpath.exists():
+            self.metrics.write_table(dbpath)
+        self.metrics.log(self.logger)
+        if self.checkpoint and self.db_checkpoint_name:
+            self.checkpoint.refresh(self.db_checkpoint_name)
+
+    def set_checkpoint(self, run_no: int):
+        """With --resume, loads the checkpoints of a previous run and finds
+        which work is still valid. The latest valid state of the input file
+        (after the converter or the preparers) and of the result database
+        (after the aggregator or a postaggregator) is where the run resumes."""
+        from ..util.checkpoint import RunCheckpoint
+
+        self.checkpoint = None
+        self.checkpoint_keys = {}
+        self.resumed_crv = None
+        self.resumed_db = None
+        self.db_checkpoint_name = None
+        self.db_changed = False
+        if not self.args or not self.args.resume or not self.run_name:
+            return
+        if not self.output_dir:
+            return
+        if self.append_mode[run_no]:
+            if self.logger:
+                self.logger.info("--resume is ignored when appending to a database.")
+            return
+        self.checkpoint = RunCheckpoint(
+            self.output_dir[run_no], self.run_name[run_no], logger=self.logger
+        )
+        self.populate_secondary_annotators(run_no)
+        self.make_checkpoint_keys(run_no)
+        self.resumed_db = self.get_resume_point(self.get_db_checkpoint_names())
+        self.db_checkpoint_name = self.resumed_db
+        if not self.resumed_db:
+            self.resumed_crv = self.get_resume_point(self.get_crv_checkpoint_names())
+
+    def make_checkpoint_keys(self, run_no: int):
+        """Keys of the stages and modules of a run. A key covers the key of
+        the work it depends on, so a change invalidates all work after it."""
+        from pathlib import Path
+        from ..util.checkpoint import get_key
+        from ..util.checkpoint import get_file_entry
+        from ..util.checkpoint import get_module_fingerprint
+
+        if not self.args or not self.inputs:
+            raise
+        if self.args.combine_input:
+            input_files = self.inputs
+        else:
+            input_files = [self.inputs[run_no]]
+        keys = self.checkpoint_keys
+        keys["converter"] = get_key(
+            "converter",
+            self.pkg_ver,
+            [get_file_entry(v) if Path(v).is_file() else str(v) for v in input_files],
+            self.args.genome,
+            self.args.input_format,
+            self.ignore_sample,
+            self.args.skip_variant_deduplication,
+            self.args.regions,
+            {k: v for k, v in self.run_conf.items() if k.endswith("converter")},
+        )
+        keys["preparer"] = get_key(
+            keys["converter"],
+            [
+                [get_module_fingerprint(module), self.run_conf.get(name)]
+                for name, module in self.preparers.items()
+            ],
+        )
+        keys["mapper"] = get_key(
+            keys["preparer"],
+            get_module_fingerprint(self.mapper),
+            self.args.primary_transcript,
+            self.run_conf.get(self.mapper_name),
+        )
+        for module in self.annotators.values():
+            self.get_annotator_checkpoint_key(module)
+        keys["aggregator"] = get_key(
+            keys["mapper"],
+            sorted([keys[f"annotator:{name}"] for name in self.annotators]),
+        )
+        prev_key = keys["aggregator"]
+        for name, module in self.postaggregators.items():
+            prev_key = get_key(
+                prev_key, get_module_fingerprint(module), self.run_conf.get(name)
+            )
+            keys[f"postaggregator:{name}"] = prev_key
+        for name, module in self.reporters.items():
+            keys[f"reporter:{name}"] = get_key(
+                prev_key, get_module_fingerprint(module), self.run_conf.get(name)
+            )
+
+    def get_annotator_checkpoint_key(self, module) -> str:
+        from ..util.checkpoint import get_key
+        from ..util.checkpoint import get_module_fingerprint
+
+        name = f"annotator:{module.name}"
+        if name not in self.checkpoint_keys:
+            secondary_keys = [
+                self.get_annotator_checkpoint_key(v)
+                for v in self.get_secondary_modules(module)
+                if v is not None
+            ]
+            self.checkpoint_keys[name] = get_key(
+                self.checkpoint_keys["mapper"],
+                get_module_fingerprint(module),
+                self.run_conf.get(module.name),
+                secondary_keys,
+            )
+        return self.checkpoint_keys[name]
+
+    def get_crv_checkpoint_names(self) -> List[str]:
+        return ["converter"] + (["preparer"] if self.preparers else [])
+
+    def get_db_checkpoint_names(self) -> List[str]:
+        return ["aggregator"] + [f"postaggregator:{v}" for v in self.postaggregators]
+
+    def get_resume_point(self, names: List[str]) -> Optional[str]:
+        """The last of `names` whose work is done. Each of them changes the
+        same file, so at most one of them matches the file."""
+        if not self.checkpoint:
+            return None
+        for name in reversed(names):
+            if self.checkpoint.is_done(name, self.checkpoint_keys[name]):
+                return name
+        return None
+
+    def is_resumed(self, name: str) -> bool:
+        """Whether the work of a stage or a module can be skipped with
+        --resume."""
+        if not self.checkpoint:
+            return False
+        db_names = self.get_db_checkpoint_names()
+        crv_names = self.get_crv_checkpoint_names()
+        if name.startswith("reporter:"):
+            if self.db_changed:
+                return False
+        elif self.resumed_db:
+            if name not in db_names:
+                return True
+            return db_names.index(name) <= db_names.index(self.resumed_db)
+        elif name in db_names:
+            return False
+        if name in crv_names:
+            if not self.resumed_crv:
+                return False
+            return crv_names.index(name) <= crv_names.index(self.resumed_crv)
+        return self.checkpoint.is_done(name, self.checkpoint_keys[name])
+
+    def record_checkpoint(
+        self, name: str, outputs: List[Any], state: Optional[Dict[str, Any]] = None
+    ):
+        if not self.checkpoint:
+            return
+        self.checkpoint.record(
+            name, self.checkpoint_keys[name], [str(v) for v in outputs], state=state
+        )
+
+    def get_converter_output_paths(self, run_no: int) -> List[str]:
+        from pathlib import Path
+        from ..consts import SAMPLE_FILE_SUFFIX
+        from ..consts import MAPPING_FILE_SUFFIX
+
+        run_name, output_dir = self.get_run_name_output_dir_by_run_no(run_no)
+        return [
+            str(self.crvinput),
+            str(Path(output_dir) / (run_name + SAMPLE_FILE_SUFFIX)),
+            str(Path(output_dir) / (run_name + MAPPING_FILE_SUFFIX)),
+        ]
+
+    def get_converter_state(self, run_no: int) -> Dict[str, Any]:
+        return {
+            "num_unique_variants": self.total_num_unique_variants,
+            "converter_format": self.converter_format,
+            "genome_assemblies": self.genome_assemblies[run_no],
+        }
+
+    def restore_converter_state(self, run_no: int):
+        if not self.checkpoint:
+            return
+        state = self.checkpoint.get_state(self.resumed_crv or "converter")
+        if not state:
+            return
+        self.total_num_unique_variants = state.get("num_unique_variants", 0)
+        self.converter_format = state.get("converter_format") or []
+        self.genome_assemblies[run_no] = state.get("genome_assemblies") or []
+
+    def write_scatter_manifests(self) -> Dict[str, Any]:
+        from ..util.scatter import write_scatter_manifest
+        from ..exceptions import ArgumentError
+
+        if not self.args or not self.inputs or not self.run_name or not self.output_dir:
+            raise
+        if self.args.vcf2vcf:
+            raise ArgumentError(msg="--scatter cannot be used with --vcf2vcf.")
+        if self.args.combine_input and len(self.inputs) > 1:
+            raise ArgumentError(
+                msg="--scatter cannot be used with --combine-input of multiple inputs."
+            )
+        if self.args.scatter_by == "size":
+            self.check_scatter_by_size_modules()
+        manifest_paths = []
+        for run_no in range(len(self.run_name)):
+            manifest_path = write_scatter_manifest(
+                self.inputs[run_no],
+                self.run_name[run_no],
+                self.output_dir[run_no],
+                self.args.scatter,
+                by=self.args.scatter_by,
+                run_kwargs=self.inkwargs,
+                logger=self.logger,
+            )
+            if self.outer:
+                self.outer.write(f"scatter manifest written: {manifest_path}")
+            manifest_paths.append(manifest_path)
+        return {"manifests": manifest_paths}
+
+    def check_scatter_by_size_modules(self):
+        """Shards of --scatter-by size can split a gene, and gather keeps the
+        gene rows of only one shard, so modules with gene-level output are not
+        allowed."""
+        from ..exceptions import ArgumentError
+
+        modules = list(self.annotators.values()) + list(self.postaggregators.values())
+        module_names = [
+            module.name
+            for module in modules
+            if module.level == "gene" or "can_summarize_by_gene" in module.conf
+        ]
+        if module_names:
+            raise ArgumentError(
+                msg="--scatter-by size cannot be used with gene-level modules "
+                + f"({', '.join(module_names)}). Use --scatter-by chrom instead."
+            )
+
     async def process_arguments(self, args):
         from ..exceptions import SetupError
 
@@ -397,6 +662,9 @@ class Runner(object):
             if self.outer:
                 self.outer.write("--vcf2vcf is used. --combine-input is disabled.")
             self.args.combine_input = False
+        if self.args.vcf2vcf and self.args.regions:
+            if self.outer:
+                self.outer.write("--vcf2vcf is used. --regions is not applied.")
         self.process_module_options()
 
     def connect_admindb_if_needed(self, run_no: int):
@@ -500,6 +768,12 @@ class Runner(object):
         crv_def = get_crv_def()
         crx_def = get_crx_def()
         crg_def = get_crg_def()
+        # Only the inputs of the annotators being added are needed.
+        if self.args and self.args.add_annotators:
+            input_paths = self.get_annotator_input_paths()
+            self.crv_present = self.crv_present or self.crvinput not in input_paths
+            self.crx_present = self.crx_present or self.crxinput not in input_paths
+            self.crg_present = self.crg_present or self.crginput not in input_paths
         # Variant
         if not self.crv_present:
             crv = FileWriter(self.crvinput, columns=crv_def)
@@ -544,9 +818,90 @@ class Runner(object):
         c.close()
         db.close()
 
+    def get_annotator_input_paths(self) -> List[str]:
+        """Paths of the input files which the annotators of the run and their
+        secondary annotators read."""
+        from ..consts import INPUT_LEVEL_KEY
+
+        modules = dict(self.annotators)
+        for module in list(self.annotators.values()):
+            self._find_secondary_annotators(module, modules)
+        input_paths = []
+        for module in modules.values():
+            if module.level == "gene":
+                input_paths.append(self.crginput)
+            elif module.conf.get("input_format") == INPUT_LEVEL_KEY:
+                input_paths.append(self.crvinput)
+            else:
+                input_paths.append(self.crxinput)
+        return input_paths
+
+    def get_db_module_names(self, run_no: int) -> List[str]:
+        """Names of the annotators and postaggregators in a result database."""
+        import sqlite3
+
+        conn = sqlite3.connect(self.get_dbpath(run_no))
+        cursor = conn.cursor()
+        module_names = []
+        for level in ["variant", "gene"]:
+            try:
+                cursor.execute(f"select name from {level}_annotator")
+            except sqlite3.OperationalError:
+                continue
+            module_names.extend([r[0] for r in cursor.fetchall()])
+        cursor.close()
+        conn.close()
+        return module_names
+
+    def get_annotators_to_add(self, run_no: int, level: str) -> List[str]:
+        """Annotators whose columns are added to the result database with
+        --add-annotators. Secondary annotators already in the result database
+        are run only for their outputs and are not added again."""
+        db_module_names = self.get_db_module_names(run_no)
+        return [
+            module_name
+            for module_name, module in self.annotators.items()
+            if module.level == level
+            and (
+                module_name in self.args.add_annotators
+                or module_name not in db_module_names
+            )
+        ]
+
+    def get_postaggregators_to_add(self, run_no: int) -> Dict[str, Any]:
+        """Postaggregators to run with --add-annotators. These are the ones
+        given with -p and the ones in the result database which require the
+        annotators being added or the postaggregators to run."""
+        from ..module.local import get_local_module_info
+        from ..module.local import get_local_module_infos_by_names
+
+        required_names = set(self.get_annotators_to_add(run_no, "variant"))
+        required_names.update(self.get_annotators_to_add(run_no, "gene"))
+        postaggregator_names = list(self.postaggregators.keys())
+        required_names.update(postaggregator_names)
+        db_module_names = self.get_db_module_names(run_no)
+        found = True
+        while found:
+            found = False
+            for module_name in db_module_names:
+                if module_name in postaggregator_names:
+                    continue
+                module = get_local_module_info(module_name)
+                if not module or module.type != "postaggregator":
+                    continue
+                if required_names.intersection(module.conf.get("requires") or []):
+                    postaggregator_names.append(module_name)
+                    required_names.add(module_name)
+                    found = True
+        postaggregator_names = self.sort_module_names(
+            postaggregator_names, "postaggregator"
+        )
+        return get_local_module_infos_by_names(postaggregator_names)
+
     def set_append_mode(self):
         import shutil
         from pathlib import Path
+        from ..exceptions import ArgumentError
 
         if not self.inputs:
             raise
@@ -558,6 +913,11 @@ class Runner(object):
             run_name = self.run_name[run_no]
             output_dir = self.output_dir[run_no]
             if not inp.suffix == ".sqlite":
+                if self.args.add_annotators:
+                    raise ArgumentError(
+                        msg="--add-annotators needs result databases (.sqlite) "
+                        + f"as input. {inp} is not."
+                    )
                 continue
             self.append_mode[run_no] = True
             if run_name.endswith(".sqlite"):
@@ -566,9 +926,12 @@ class Runner(object):
                 self.args.skip.append("converter")
             if "mapper" not in self.args.skip:
                 self.args.skip.append("mapper")
-            target_name = run_name + ".sqlite"
+            if self.args.add_annotators and "preparer" not in self.args.skip:
+                self.args.skip.append("preparer")
+            target_name = self.run_name[run_no] + ".sqlite"
             target_path = Path(output_dir) / target_name
-            shutil.copyfile(inp, target_path)
+            if target_path.resolve() != Path(inp).resolve():
+                shutil.copyfile(inp, target_path)
             self.inputs[run_no] = target_path
 
     def set_genome_assemblies(self):
@@ -890,7 +1253,9 @@ class Runner(object):
         annotator_names_from_package = (
             self.get_package_argument_run_value("annotators") or []
         )
-        if len(self.args.annotators) > 0:
+        if self.args.add_annotators:
+            self.annotator_names = list(self.args.add_annotators)
+        elif len(self.args.annotators) > 0:
             if self.args.annotators == ["all"]:
                 self.annotator_names = sorted(
                     list(get_local_module_infos_of_type("annotator").keys())
@@ -942,6 +1307,15 @@ class Runner(object):
         if "postaggregator" in self.args.skip:
             self.postaggregators = {}
             return
+        # Postaggregators which need the added annotators are found in the
+        # result database later.
+        if self.args.add_annotators:
+            self.postaggregator_names = list(self.args.postaggregators)
+            self.check_valid_modules(self.postaggregator_names)
+            self.postaggregators = get_local_module_infos_by_names(
+                self.postaggregator_names
+            )
+            return
         self.postaggregator_names = sorted(
             list(
                 set(self.postaggregator_names).union(set(default_postaggregator_names))
@@ -1239,7 +1613,7 @@ class Runner(object):
     async def write_info_row(self, key: str, value: Any, cursor):
         import json
 
-        q = "insert into info values (?, ?)"
+        q = "insert or replace into info values (?, ?)"
         if isinstance(value, list) or isinstance(value, dict):
             value = json.dumps(value)
         await cursor.execute(q, (key, value))
@@ -1511,6 +1885,7 @@ class Runner(object):
         from types import SimpleNamespace
         from ..util.admin_util import get_packagedir
         from ..util.run import announce_module
+        from ..util.metrics import run_with_profiler
 
         if (
             self.conf is None
@@ -1547,10 +1922,19 @@ class Runner(object):
             module_options=self.run_conf,
             skip_variant_deduplication=self.args.skip_variant_deduplication,
             mp=self.args.mp,
+            regions=self.args.regions,
             outer=self.outer,
         )
-        ret = converter.run()
+        ret = run_with_profiler(
+            converter.run, self.args.profile, f"{self.profile_prefix}.converter"
+        )
         self.total_num_unique_variants = ret.get("num_unique_variants", 0)
+        if self.metrics:
+            self.metrics.update(
+                "converter",
+                rows_in=ret.get("num_valid_lines", 0) + ret.get("num_error_lines", 0),
+                rows_out=self.total_num_unique_variants,
+            )
         self.converter_format = ret.get("input_formats") or []
         genome_assembly: List[str] = ret.get("assemblies") or []
         self.genome_assemblies[run_no] = genome_assembly
@@ -1575,11 +1959,13 @@ class Runner(object):
             }
             module_cls = load_class(module.script_path, "Preparer")
             module_ins = module_cls(kwargs)
-            await self.log_time_of_func(module_ins.run, work=module_name)
+            await self.log_time_of_func(
+                module_ins.run, work=module_name, stage="preparer", module=module_name
+            )
 
     async def run_mapper(self, run_no: int):
         import multiprocessing as mp
-        from ..base.mp_runners import init_worker, mapper_runner
+        from ..base.mp_runners import init_worker, mapper_chunk_runner
         from ..util.inout import FileReader
 
         if not self.args or not self.run_name or not self.output_dir:
@@ -1596,6 +1982,7 @@ class Runner(object):
                 f"input line chunksize={chunksize} total number of "
                 + f"input lines={num_lines} number of chunks={len_poss}"
             )
+        total_num_lines = num_lines
         pool = mp.Pool(num_workers, init_worker)
         pos_no = 0
         while pos_no < len_poss:
@@ -1606,39 +1993,52 @@ class Runner(object):
                 (seekpos, num_lines) = poss[pos_no]
                 if pos_no == len_poss - 1:
                     job = pool.apply_async(
-                        mapper_runner,
+                        mapper_chunk_runner,
                         (
-                            self.crvinput,
-                            seekpos,
-                            max_num_lines - num_lines,
-                            run_name,
-                            output_dir,
-                            self.mapper_name,
-                            pos_no,
-                            ";".join(self.args.primary_transcript),
-                            self.serveradmindb,
+                            (
+                                self.crvinput,
+                                seekpos,
+                                max_num_lines - num_lines,
+                                run_name,
+                                output_dir,
+                                self.mapper_name,
+                                pos_no,
+                                ";".join(self.args.primary_transcript),
+                                self.serveradmindb,
+                            ),
+                            self.args.profile,
+                            self.profile_prefix,
                         ),
                     )
                 else:
                     job = pool.apply_async(
-                        mapper_runner,
+                        mapper_chunk_runner,
                         (
-                            self.crvinput,
-                            seekpos,
-                            chunksize,
-                            run_name,
-                            output_dir,
-                            self.mapper_name,
-                            pos_no,
-                            ";".join(self.args.primary_transcript),
-                            self.serveradmindb,
+                            (
+                                self.crvinput,
+                                seekpos,
+                                chunksize,
+                                run_name,
+                                output_dir,
+                                self.mapper_name,
+                                pos_no,
+                                ";".join(self.args.primary_transcript),
+                                self.serveradmindb,
+                            ),
+                            self.args.profile,
+                            self.profile_prefix,
                         ),
                     )
                 jobs.append(job)
                 pos_no += 1
             for job in jobs:
-                job.get()
+                record = job.get()
+                if self.metrics:
+                    self.metrics.add(record)
         pool.close()
+        pool.join()
+        if self.metrics:
+            self.metrics.update("mapper", rows_in=total_num_lines)
         self.collect_crxs(run_no)
         self.collect_crgs(run_no)
 
@@ -1715,6 +2115,7 @@ class Runner(object):
             }
             kwargs["run_name"] = run_name
             kwargs["output_dir"] = output_dir
+            kwargs["annotation_cache"] = self.args.annotation_cache
             run_args[module.name] = (module, kwargs)
         start_queue = self.manager.Queue()
         end_queue = self.manager.Queue()
@@ -1729,7 +2130,9 @@ class Runner(object):
                 queue_populated,
                 self.serveradmindb,
                 self.args.logtofile,
-                self.log_path
+                self.log_path,
+                self.args.profile,
+                self.profile_prefix,
             ]
         ] * num_workers
         with Pool(num_workers, init_worker) as pool:
@@ -1749,8 +2152,11 @@ class Runner(object):
             while (
                 assigned_mnames != all_mnames
             ):  # TODO not handling case where parent module errors out
-                finished_module = end_queue.get()
+                finished_module, record = end_queue.get()
                 done_mnames.add(finished_module)
+                if self.metrics:
+                    self.metrics.add(record)
+                self.record_annotator_checkpoint(finished_module, run_no)
                 for mname, module in self.annotators_to_run.items():
                     if (
                         mname not in assigned_mnames
@@ -1760,9 +2166,22 @@ class Runner(object):
                         assigned_mnames.add(mname)
             queue_populated = True
             pool.join()
+            while not end_queue.empty():
+                finished_module, record = end_queue.get()
+                if self.metrics:
+                    self.metrics.add(record)
+                self.record_annotator_checkpoint(finished_module, run_no)
         if len(self.annotators_to_run) > 0:
             self.annotator_ran = True
 
+    def record_annotator_checkpoint(self, module_name: str, run_no: int):
+        module = self.annotators.get(module_name)
+        if not self.checkpoint or not module:
+            return
+        path = self.get_module_output_path(module, run_no)
+        if path:
+            self.record_checkpoint(f"annotator:{module_name}", [path])
+
     async def run_aggregator(self, run_no: int):
         db_path = await self.run_aggregator_level("variant", run_no)
         await self.run_aggregator_level("gene", run_no)
@@ -1777,6 +2196,11 @@ class Runner(object):
 
         if self.append_mode[run_no] and level not in ["variant", "gene"]:
             return
+        add_annotators = None
+        if self.args and self.args.add_annotators:
+            add_annotators = self.get_annotators_to_add(run_no, level)
+            if not add_annotators:
+                return
         if not self.run_name or not self.output_dir:
             raise
         run_name = self.run_name[run_no]
@@ -1798,8 +2222,20 @@ class Runner(object):
             arg_dict["delete"] = True
         if self.append_mode[run_no]:
             arg_dict["append"] = True
+        if add_annotators is not None:
+            arg_dict["add_annotators"] = add_annotators
+        index_conf = (self.run_conf.get("aggregator") or {}).get("indexes") or {}
+        if level in index_conf:
+            arg_dict["secondary_indexes"] = index_conf[level]
         v_aggregator = Aggregator(**arg_dict)
-        v_aggregator.run()
+        if self.metrics:
+            with self.metrics.measure("aggregator", module=level):
+                v_aggregator.run()
+            self.metrics.update(
+                "aggregator", module=level, rows_out=v_aggregator.num_rows
+            )
+        else:
+            v_aggregator.run()
         rtime = time() - stime
         update_status(
             f"Aggregator {level} finished in {rtime:.3f}s",
@@ -1816,16 +2252,26 @@ class Runner(object):
         from ..util.run import update_status
         from ..system.consts import default_postaggregator_names
         from ..consts import MODULE_OPTIONS_KEY
+        from ..util.metrics import PipelineMetrics
+        from ..util.metrics import run_with_profiler
 
         if self.conf is None:
             raise SetupError()
+        if not self.metrics:
+            self.metrics = PipelineMetrics()
         if not self.run_name or not self.output_dir:
             raise
         run_name = self.run_name[run_no]
         output_dir = self.output_dir[run_no]
-        for module_name, module in self.postaggregators.items():
+        if self.args and self.args.add_annotators:
+            postaggregators = self.get_postaggregators_to_add(run_no)
+        else:
+            postaggregators = self.postaggregators
+        for module_name, module in postaggregators.items():
             if self.append_mode[run_no] and module_name in default_postaggregator_names:
                 continue
+            if self.is_resumed(f"postaggregator:{module_name}"):
+                continue
             arg_dict = {
                 "module_name": module_name,
                 "run_name": run_name,
@@ -1841,13 +2287,27 @@ class Runner(object):
             post_agg = post_agg_cls(**arg_dict)
             announce_module(module, serveradmindb=self.serveradmindb)
             stime = time()
-            post_agg.run()
+            with self.metrics.measure("postaggregator", module=module_name):
+                run_with_profiler(
+                    post_agg.run,
+                    self.args.profile if self.args else None,
+                    f"{self.profile_prefix}.{module_name}",
+                )
+            self.metrics.update(
+                "postaggregator",
+                module=module_name,
+                rows_in=getattr(post_agg, "num_input_rows", None),
+                rows_out=getattr(post_agg, "num_output_rows", None),
+            )
             rtime = time() - stime
             update_status(
                 f"{module_name} finished in {rtime:.3f}s",
                 logger=self.logger,
                 serveradmindb=self.serveradmindb,
             )
+            self.db_changed = True
+            self.db_checkpoint_name = f"postaggregator:{module_name}"
+            self.record_checkpoint(self.db_checkpoint_name, [self.get_dbpath(run_no)])
 
     async def run_vcf2vcf(self, run_no: int):
         from time import time
@@ -1880,6 +2340,7 @@ class Runner(object):
         arg_dict["mapper_name"] = self.mapper_name
         arg_dict["annotator_names"] = self.annotator_names
         arg_dict["run_name"] = self.run_name[run_no]
+        arg_dict["num_workers"] = self.get_num_workers()
         Module = load_class(module.script_path, "VCF2VCF")
         m = Module(**arg_dict)
         stime = time()
@@ -1935,6 +2396,10 @@ class Runner(object):
         response = {}
         for report_type, module_name in zip(report_types, module_names):
             reporter = None
+            if self.checkpoint and self.is_resumed(f"reporter:{module_name}"):
+                state = self.checkpoint.get_state(f"reporter:{module_name}")
+                response[report_type] = state.get("response")
+                continue
             module = get_local_module_info(module_name)
             announce_module(module, serveradmindb=self.serveradmindb)
             if module is None:
@@ -1948,7 +2413,9 @@ class Runner(object):
             arg_dict[MODULE_OPTIONS_KEY] = self.run_conf.get(module_name, {})
             Reporter: Type[BaseReporter] = load_class(module.script_path, "Reporter")
             reporter = Reporter(**arg_dict)
-            response_t = await self.log_time_of_func(reporter.run, work=module_name)
+            response_t = await self.log_time_of_func(
+                reporter.run, work=module_name, stage="reporter", module=module_name
+            )
             output_fns = None
             response_type = type(response_t)
             if response_type == list:
@@ -1962,6 +2429,20 @@ class Runner(object):
                     serveradmindb=self.serveradmindb,
                 )
             response[report_type] = response_t
+            if isinstance(response_t, str):
+                output_paths = [response_t]
+            elif isinstance(response_t, list):
+                output_paths = [v for v in response_t if isinstance(v, str)]
+            else:
+                output_paths = []
+            if output_paths:
+                self.record_checkpoint(
+                    f"reporter:{module_name}",
+                    output_paths,
+                    state={"response": response_t},
+                )
+            if self.checkpoint and self.db_checkpoint_name:
+                self.checkpoint.refresh(self.db_checkpoint_name)
         return response
 
     def should_run_step(self, step: str):
@@ -1979,7 +2460,17 @@ class Runner(object):
         step = "converter"
         if not self.should_run_step("converter"):
             return
-        await self.log_time_of_func(self.run_converter, run_no, work=f"{step} step")
+        if self.is_resumed(step):
+            self.restore_converter_state(run_no)
+            return
+        await self.log_time_of_func(
+            self.run_converter, run_no, work=f"{step} step", stage=step
+        )
+        self.record_checkpoint(
+            step,
+            self.get_converter_output_paths(run_no),
+            state=self.get_converter_state(run_no),
+        )
         if self.total_num_unique_variants == 0:
             msg = "No variant found in input"
             update_status(msg, logger=self.logger, serveradmindb=self.serveradmindb)
@@ -1988,16 +2479,27 @@ class Runner(object):
 
     async def do_step_preparer(self, run_no: int):
         step = "preparer"
-        if not self.should_run_step(step):
+        if not self.should_run_step(step) or self.is_resumed(step):
             return
-        await self.log_time_of_func(self.run_preparers, run_no, work=f"{step} step")
+        await self.log_time_of_func(
+            self.run_preparers, run_no, work=f"{step} step", stage=step
+        )
+        if self.preparers:
+            self.record_checkpoint(
+                step,
+                self.get_converter_output_paths(run_no),
+                state=self.get_converter_state(run_no),
+            )
 
     async def do_step_mapper(self, run_no: int):
         step = "mapper"
         self.mapper_ran = False
-        if self.should_run_step("mapper"):
-            await self.log_time_of_func(self.run_mapper, run_no, work=f"{step} step")
+        if self.should_run_step("mapper") and not self.is_resumed(step):
+            await self.log_time_of_func(
+                self.run_mapper, run_no, work=f"{step} step", stage=step
+            )
             self.mapper_ran = True
+            self.record_checkpoint(step, [self.crxinput, self.crginput])
 
     async def do_step_annotator(self, run_no: int):
         step = "annotator"
@@ -2005,7 +2507,10 @@ class Runner(object):
         self.done_annotators = {}
         self.populate_secondary_annotators(run_no)
         for mname, module in self.annotators.items():
-            if self.check_module_output(module, run_no) is not None:
+            if self.checkpoint:
+                if self.is_resumed(f"annotator:{mname}"):
+                    self.done_annotators[mname] = module
+            elif self.check_module_output(module, run_no) is not None:
                 self.done_annotators[mname] = module
         self.annotators_to_run = {
             aname: self.annotators[aname]
@@ -2015,7 +2520,7 @@ class Runner(object):
             self.mapper_ran or len(self.annotators_to_run) > 0
         ):
             await self.log_time_of_func(
-                self.run_annotators, run_no, work=f"{step} step"
+                self.run_annotators, run_no, work=f"{step} step", stage=step
             )
             self.annotator_ran = True
 
@@ -2026,30 +2531,43 @@ class Runner(object):
             self.mapper_ran
             or self.annotator_ran
             or self.startlevel == self.runlevels["aggregator"]
+            or (self.checkpoint and not self.is_resumed(step))
+            or (self.args and self.args.add_annotators)
         ):
             self.result_path = await self.log_time_of_func(
-                self.run_aggregator, run_no, work=f"{step} step"
+                self.run_aggregator, run_no, work=f"{step} step", stage=step
             )
             await self.write_info_table(run_no)
             self.aggregator_ran = True
+            self.resumed_db = None
+            self.db_changed = True
+            self.db_checkpoint_name = step
+            self.record_checkpoint(step, [self.get_dbpath(run_no)])
 
     async def do_step_postaggregator(self, run_no: int):
         step = "postaggregator"
         if self.should_run_step(step):
             await self.log_time_of_func(
-                self.run_postaggregators, run_no, work=f"{step} step"
+                self.run_postaggregators, run_no, work=f"{step} step", stage=step
             )
 
     async def do_step_reporter(self, run_no: int):
         step = "reporter"
         if self.should_run_step(step) and self.reporters:
             self.report_response = await self.log_time_of_func(
-                self.run_reporter, run_no, work=f"{step} step"
+                self.run_reporter, run_no, work=f"{step} step", stage=step
             )
 
-    async def log_time_of_func(self, func, *args, work="", **kwargs):
+    async def log_time_of_func(
+        self, func, *args, work="", stage="", module="", **kwargs
+    ):
+        """Runs `func` and logs its run time. If `stage` is given, the metrics
+        of the run are recorded under `stage` and `module`, and with --profile,
+        a module is run under the profiler."""
         from time import time
+        from contextlib import nullcontext
         from ..util.run import update_status
+        from ..util.metrics import run_with_profiler_async
 
         stime = time()
         update_status(
@@ -2057,7 +2575,15 @@ class Runner(object):
             logger=self.logger,
             serveradmindb=self.serveradmindb,
         )
-        ret = await func(*args, **kwargs)
+        if stage and self.metrics:
+            measure = self.metrics.measure(stage, module=module)
+        else:
+            measure = nullcontext()
+        profiler = self.args.profile if self.args and module else None
+        with measure:
+            ret = await run_with_profiler_async(
+                func, profiler, f"{self.profile_prefix}.{module}", *args, **kwargs
+            )
         rtime = time() - stime
         update_status(
             f"{work} finished in {rtime:.3f}s",
@@ -15,6 +15,9 @@ class VCF2VCF:
         annotator_names: List[str] = [],
         genome: Optional[str] = None,
         mapper_name: Optional[str] = None,
+        num_workers: int = 1,
+        bgzip: bool = False,
+        tabix: bool = False,
         serveradmindb=None,
         outer=None,
         **kwargs,
@@ -50,6 +53,24 @@ class VCF2VCF:
         self.annotator_names = annotator_names
         self.mapper_name = mapper_name
         self.run_name = run_name
+        self.batch_size: int = 10000
+        self.chunk_size: int = 8 * 1024 * 1024
+        self.num_workers: int = num_workers or 1
+        self.bgzip: bool = bgzip or tabix
+        self.tabix: bool = tabix
+        self.worker_kwargs = {
+            "inputs": [str(v) for v in self.inputs],
+            "run_name": run_name,
+            "output_dir": str(self.output_dir),
+            "module_options": module_options,
+            "annotator_names": annotator_names,
+            "genome": genome,
+            "mapper_name": mapper_name,
+        }
+        self.base_re = None
+        self.modules = None
+        self.mapper = None
+        self.all_col_names = None
         self.setup_logger()
         self.setup_liftover()
         self.serveradmindb = serveradmindb
@@ -59,7 +80,7 @@ class VCF2VCF:
 
     def setup_liftover(self):
         from oakvar.lib.util.seq import get_lifter
-        from oakvar.lib.util.seq import get_wgs_reader
+        from oakvar.lib.util.seq import get_cached_wgs_reader
 
         if self.genome:
             self.lifter = get_lifter(source_assembly=self.genome)
@@ -67,7 +88,7 @@ class VCF2VCF:
         else:
             self.lifter = None
             self.do_liftover = False
-        self.wgsreader = get_wgs_reader(assembly="hg38")
+        self.wgsreader = get_cached_wgs_reader(assembly="hg38")
 
     def load_col_infos(self, module_names: list, mapper: str):
         col_infos = {}
@@ -141,19 +162,40 @@ class VCF2VCF:
             return pos, ref, alt
         if len(ref) == 1 and len(alt) == 1:
             return pos, ref, alt
-        ref = list(ref)
-        alt = list(alt)
+        minlen = min(len(ref), len(alt))
         adj = 0
-        while ref and alt and ref[0] == alt[0]:
+        while adj < minlen and ref[adj] == alt[adj]:
             adj += 1
-            ref.pop(0)
-            alt.pop(0)
-        while ref and alt and ref[-1] == alt[-1]:
-            ref.pop()
-            alt.pop()
-        ref = "".join(ref) if ref else "-"
-        alt = "".join(alt) if alt else "-"
-        return pos + adj, ref, alt
+        ref = ref[adj:]
+        alt = alt[adj:]
+        minlen -= adj
+        end = 0
+        while end < minlen and ref[-end - 1] == alt[-end - 1]:
+            end += 1
+        if end:
+            ref = ref[:-end]
+            alt = alt[:-end]
+        return pos + adj, ref or "-", alt or "-"
+
+    def trim_parsed_lines(self, parsed_lines):
+        from oakvar.lib.util.seq import trim_variants_many
+
+        poss = []
+        refs = []
+        alts = []
+        for parsed_line in parsed_lines:
+            if parsed_line is None:
+                continue
+            for pos, ref, alt in parsed_line[2]:
+                poss.append(pos)
+                refs.append(ref)
+                alts.append(alt)
+        trimmed_iter = iter(zip(*trim_variants_many(poss, refs, alts)))
+        for i, parsed_line in enumerate(parsed_lines):
+            if parsed_line is None:
+                continue
+            vcf_toks, chrom, line_alts = parsed_line
+            parsed_lines[i] = (vcf_toks, chrom, [next(trimmed_iter) for _ in line_alts])
 
     def _log_exception(self, e, halt=True):
         if self.logger:
@@ -177,176 +219,538 @@ class VCF2VCF:
             update_status(status, logger=self.logger, serveradmindb=self.serveradmindb)
             self.last_status_update_time = cur_time
 
-    def run(self):
-        from re import compile
+    def is_bgzip_output(self, p) -> bool:
+        from oakvar.lib.util.bgzf import is_gzip
+
+        return self.bgzip or is_gzip(p)
+
+    def get_output_path(self, p):
+        output_suffix = ".vcf"
+        if self.is_bgzip_output(p):
+            output_suffix += ".gz"
+        if self.run_name:
+            if len(self.inputs) == 1:
+                outpath = self.output_dir / (self.run_name + output_suffix)
+            else:
+                outpath = self.output_dir / (
+                    p.name + "." + self.run_name + output_suffix
+                )
+        else:
+            outpath = p.with_name(p.name + output_suffix)
+        return outpath
+
+    def open_input(self, p):
+        from gzip import open as gzipopen
+        from oakvar.lib.util.bgzf import is_gzip
+
+        if is_gzip(p):
+            return gzipopen(p, "rt")
+        return open(p)
+
+    def open_output(self, p, outpath):
+        from oakvar.lib.util.bgzf import BgzfWriter
+
+        if self.is_bgzip_output(p):
+            return BgzfWriter(outpath)
+        return open(outpath, "w", 1024 * 128)
+
+    def write_index(self, outpath):
+        from oakvar.lib.util.bgzf import write_tabix_index
+        from oakvar.lib.exceptions import BadFormatError
+
+        try:
+            index_path = write_tabix_index(outpath)
+        except BadFormatError as e:
+            if self.logger:
+                self.logger.warning(f"tabix index of {outpath} was not written: {e}")
+            return
+        if self.logger:
+            self.logger.info(f"tabix index written to {index_path}")
+
+    def write_header(self, f, wf, col_infos):
+        f.seek(0)
+        for line in f:
+            if line.startswith("##"):
+                wf.write(line)
+            else:
+                break
+        for module_name in [self.mapper_name] + self.annotator_names:
+            prefix = "base" if module_name == self.mapper_name else module_name
+            col_info = col_infos[module_name]
+            for col in col_info:
+                wf.write(
+                    f"##INFO=<ID={self.OV_PREFIX}{prefix}__{col['name']},Number=A,Type={col['type'].capitalize()},Description=\"{col['title']}\">\n"
+                )
+        f.seek(0)
+        for line in f:
+            if line.startswith("#CHROM"):
+                wf.write(line)
+                break
+
+    def parse_line(self, line: str, trim: bool = True):
+        vcf_toks = line[:-1].split("\t")
+        chrom = vcf_toks[0]
+        if not chrom.startswith("chr"):
+            chrom = "chr" + chrom
+        pos = int(vcf_toks[1])
+        ref = vcf_toks[3]
+        alts = []
+        for alt in vcf_toks[4].split(","):
+            if "<" in alt:
+                continue
+            if trim:
+                alts.append(self.trim_variant(pos, ref, alt))
+            else:
+                alts.append((pos, ref, alt))
+        return vcf_toks, chrom, alts
+
+    def liftover_parsed_lines(self, parsed_lines):
+        from oakvar.lib.util.seq import get_liftover_many_errors
+
+        chroms = []
+        poss = []
+        refs = []
+        alts = []
+        for parsed_line in parsed_lines:
+            if parsed_line is None:
+                continue
+            _, chrom, line_alts = parsed_line
+            for pos, ref, alt in line_alts:
+                chroms.append(chrom)
+                poss.append(pos)
+                refs.append(ref)
+                alts.append(alt)
+        lifteds, errors = get_liftover_many_errors(
+            chroms,
+            poss,
+            refs=refs,
+            alts=alts,
+            lifter=self.lifter,
+            wgs_reader=self.wgsreader,
+        )
+        lifted_iter = iter(zip(lifteds, errors))
+        line_errors = []
+        for i, parsed_line in enumerate(parsed_lines):
+            if parsed_line is None:
+                line_errors.append(None)
+                continue
+            vcf_toks, chrom, line_alts = parsed_line
+            new_alts = []
+            line_error = None
+            for _ in line_alts:
+                lifted, e = next(lifted_iter)
+                if e is not None or lifted is None:
+                    line_error = line_error or e
+                    continue
+                _, pos, ref, alt = lifted
+                new_alts.append((pos, ref, alt))
+            parsed_lines[i] = (vcf_toks, chrom, new_alts)
+            line_errors.append(line_error)
+        return line_errors
+
+    def annotate_parsed_line(self, parsed_line, uid, mapper, modules, read_lnum, line):
         from oakvar.lib.util.seq import normalize_variant_dict_left
-        from oakvar.lib.util.seq import liftover
-        from oakvar.lib.module.local import load_modules
         from oakvar.lib.util.run import log_variant_exception
         from oakvar.lib.exceptions import IgnoredVariant
 
-        if not self.mapper_name or not self.inputs:
-            return False
-        base_re = compile("^[*]|[ATGC]+|[-]+$")
-        modules = load_modules(annotators=self.annotator_names, mapper=self.mapper_name)
-        col_infos = self.load_col_infos(self.annotator_names, self.mapper_name)
-        all_col_names = self.get_all_col_names(col_infos, self.mapper_name)
-        mapper = modules[self.mapper_name]
-        output_suffix = ".vcf"
-        for p in self.inputs:
-            if self.logger:
-                self.logger.info(f"processing {p}")
-            if self.run_name:
-                if len(self.inputs) == 1:
-                    outpath = self.output_dir / (self.run_name + output_suffix)
-                else:
-                    outpath = self.output_dir / (
-                        p.name + "." + self.run_name + output_suffix
-                    )
+        _, chrom, line_alts = parsed_line
+        variants = []
+        for pos, ref, alt in line_alts:
+            uid += 1
+            variant = {"uid": uid}
+            if ref == alt:
+                pass
+            elif alt == "*":
+                pass
             else:
-                outpath = p.with_name(p.name + output_suffix)
-            f = open(p)
-            wf = open(outpath, "w", 1024 * 128)
-            f.seek(0)
-            for line in f:
-                if line.startswith("##"):
-                    wf.write(line)
-                else:
-                    break
-            for module_name in [self.mapper_name] + self.annotator_names:
-                prefix = "base" if module_name == self.mapper_name else module_name
-                col_info = col_infos[module_name]
-                for col in col_info:
-                    wf.write(
-                        f"##INFO=<ID={self.OV_PREFIX}{prefix}__{col['name']},Number=A,Type={col['type'].capitalize()},Description=\"{col['title']}\">\n"
-                    )
-            f.seek(0)
-            for line in f:
-                if line.startswith("#CHROM"):
-                    wf.write(line)
-                    break
-            read_lnum = 0
-            uid = 0
-            for line in f:
-                try:
-                    read_lnum += 1
-                    vcf_toks = line[:-1].split("\t")
-                    chrom = vcf_toks[0]
-                    if not chrom.startswith("chr"):
-                        chrom = "chr" + chrom
-                    pos = int(vcf_toks[1])
-                    ref = vcf_toks[3]
-                    alts = vcf_toks[4].split(",")
-                    if read_lnum % 10000 == 0:
-                        if self.logger:
-                            self.logger.info(
-                                f"{read_lnum}: {chrom} {pos} {ref} {vcf_toks[4]}"
-                            )
-                    variants = []
-                    for alt in alts:
-                        if "<" in alt:
-                            continue
-                        pos, ref, alt = self.trim_variant(pos, ref, alt)
-                        if self.do_liftover:
-                            _, pos, ref, alt = liftover(
-                                chrom, pos, ref, alt, lifter=self.lifter
-                            )
-                        uid += 1
-                        variant = {"uid": uid}
-                        if ref == alt:
-                            pass
-                        elif alt == "*":
-                            pass
-                        else:
-                            if not base_re.fullmatch(alt):
-                                log_variant_exception(
-                                    lnum=read_lnum,
-                                    line=line,
-                                    unique_excs=self.unique_excs,
-                                    logger=self.logger,
-                                    error_logger=self.error_logger,
-                                    e=IgnoredVariant("Invalid alternate base"),
-                                )
-                            else:
-                                variant = {
-                                    "uid": uid,
-                                    "chrom": chrom,
-                                    "pos": pos,
-                                    "strand": "+",
-                                    "ref_base": ref,
-                                    "alt_base": alt,
-                                }
-                                variant = normalize_variant_dict_left(variant)
-                                res = mapper.map(variant)
-                                res = mapper.live_report_substitute(res)
-                                if res:
-                                    variant.update(res)
-                                for module_name in self.annotator_names:
-                                    res = modules[module_name].annotate(variant)
-                                    if res:
-                                        variant.update(
-                                            {
-                                                module_name + "__" + k: v
-                                                for k, v in res.items()
-                                            }
-                                        )
-                        variants.append(variant)
-                    wf.write("\t".join(vcf_toks[:7]))
-                    if vcf_toks[7] == ".":
-                        wf.write("\t")
-                    else:
-                        wf.write("\t")
-                        wf.write(vcf_toks[7])
-                        wf.write(";")
-                    for col_name in all_col_names:
-                        if col_name in [
-                            "chrom",
-                            "pos",
-                            "strand",
-                            "ref_base",
-                            "alt_base",
-                            "sample_id",
-                        ]:
-                            continue
-                        values = []
-                        has_value: bool = False
-                        for variant in variants:
-                            value = variant.get(col_name)
-                            if value is None:
-                                value = ""
-                            else:
-                                vt = type(value)
-                                if vt == int or vt == float:
-                                    value = str(value)
-                                else:
-                                    if vt != str:
-                                        value = str(value)
-                                    value = self.escape_vcf_value(value)
-                            values.append(value)
-                            if value and value != "{}":
-                                has_value = True
-                        if not has_value:
-                            continue
-                        if "__" not in col_name:
-                            col_name = "base__" + col_name
-                        wf.write(self.OV_PREFIX + col_name + "=" + ",".join(values))
-                        if col_name != all_col_names[-1]:
-                            wf.write(";")
-                    wf.write("\t" + "\t".join(vcf_toks[8:]) + "\n")
-                except Exception as e:
-                    print(e)
+                if not self.base_re.fullmatch(alt):
                     log_variant_exception(
                         lnum=read_lnum,
                         line=line,
                         unique_excs=self.unique_excs,
                         logger=self.logger,
                         error_logger=self.error_logger,
-                        e=e,
+                        e=IgnoredVariant("Invalid alternate base"),
+                    )
+                else:
+                    variant = {
+                        "uid": uid,
+                        "chrom": chrom,
+                        "pos": pos,
+                        "strand": "+",
+                        "ref_base": ref,
+                        "alt_base": alt,
+                    }
+                    variant = normalize_variant_dict_left(variant)
+                    res = mapper.map(variant)
+                    res = mapper.live_report_substitute(res)
+                    if res:
+                        variant.update(res)
+                    for module_name in self.annotator_names:
+                        res = modules[module_name].annotate(variant)
+                        if res:
+                            variant.update(
+                                {module_name + "__" + k: v for k, v in res.items()}
+                            )
+            variants.append(variant)
+        return variants, uid
+
+    def get_output_line(self, vcf_toks, variants, all_col_names) -> str:
+        out = ["\t".join(vcf_toks[:7])]
+        if vcf_toks[7] == ".":
+            out.append("\t")
+        else:
+            out.append("\t")
+            out.append(vcf_toks[7])
+            out.append(";")
+        for col_name in all_col_names:
+            if col_name in [
+                "chrom",
+                "pos",
+                "strand",
+                "ref_base",
+                "alt_base",
+                "sample_id",
+            ]:
+                continue
+            values = []
+            has_value: bool = False
+            for variant in variants:
+                value = variant.get(col_name)
+                if value is None:
+                    value = ""
+                else:
+                    vt = type(value)
+                    if vt == int or vt == float:
+                        value = str(value)
+                    else:
+                        if vt != str:
+                            value = str(value)
+                        value = self.escape_vcf_value(value)
+                values.append(value)
+                if value and value != "{}":
+                    has_value = True
+            if not has_value:
+                continue
+            if "__" not in col_name:
+                col_name = "base__" + col_name
+            out.append(self.OV_PREFIX + col_name + "=" + ",".join(values))
+            if col_name != all_col_names[-1]:
+                out.append(";")
+        out.append("\t" + "\t".join(vcf_toks[8:]) + "\n")
+        return "".join(out)
+
+    def process_lines(self, lines, start_lnum: int, uid: int, mapper, modules, all_col_names):
+        from oakvar.lib.util.run import log_variant_exception
+
+        parsed_lines = []
+        line_errors = []
+        for lnum, line in enumerate(lines, start=start_lnum):
+            try:
+                parsed_lines.append(self.parse_line(line, trim=False))
+                line_errors.append(None)
+            except Exception as e:
+                parsed_lines.append(None)
+                line_errors.append(e)
+        self.trim_parsed_lines(parsed_lines)
+        if self.do_liftover:
+            liftover_errors = self.liftover_parsed_lines(parsed_lines)
+            line_errors = [
+                e if e is not None else le for e, le in zip(line_errors, liftover_errors)
+            ]
+        out_lines = []
+        halt = False
+        for lnum, line, parsed_line, e in zip(
+            range(start_lnum, start_lnum + len(lines)), lines, parsed_lines, line_errors
+        ):
+            try:
+                if e is not None:
+                    raise e
+                if lnum % 10000 == 0 and self.logger:
+                    vcf_toks, chrom, _ = parsed_line
+                    self.logger.info(
+                        f"{lnum}: {chrom} {vcf_toks[1]} {vcf_toks[3]} {vcf_toks[4]}"
                     )
-                    if hasattr(e, "halt") and getattr(e, "halt"):
+                variants, uid = self.annotate_parsed_line(
+                    parsed_line, uid, mapper, modules, lnum, line
+                )
+                out_lines.append(
+                    self.get_output_line(parsed_line[0], variants, all_col_names)
+                )
+            except Exception as e:
+                log_variant_exception(
+                    lnum=lnum,
+                    line=line,
+                    unique_excs=self.unique_excs,
+                    logger=self.logger,
+                    error_logger=self.error_logger,
+                    e=e,
+                )
+                if hasattr(e, "halt") and getattr(e, "halt"):
+                    halt = True
+                    break
+        return out_lines, uid, halt
+
+    def load_run_modules(self):
+        from re import compile
+        from oakvar.lib.module.local import load_modules
+
+        if self.modules is not None:
+            return
+        self.base_re = compile("^[*]|[ATGC]+|[-]+$")
+        self.modules = load_modules(
+            annotators=self.annotator_names, mapper=self.mapper_name
+        )
+        col_infos = self.load_col_infos(self.annotator_names, self.mapper_name)
+        self.all_col_names = self.get_all_col_names(col_infos, self.mapper_name)
+        self.mapper = self.modules[self.mapper_name]
+
+    def run(self):
+        if not self.mapper_name or not self.inputs:
+            return False
+        col_infos = self.load_col_infos(self.annotator_names, self.mapper_name)
+        for p in self.inputs:
+            if self.logger:
+                self.logger.info(f"processing {p}")
+            outpath = self.get_output_path(p)
+            f = self.open_input(p)
+            wf = self.open_output(p, outpath)
+            self.write_header(f, wf, col_infos)
+            if self.num_workers > 1 and self.run_file_parallel(p, wf):
+                f.close()
+                wf.close()
+                if self.tabix:
+                    self.write_index(outpath)
+                continue
+            self.load_run_modules()
+            read_lnum = 0
+            uid = 0
+            halt = False
+            while not halt:
+                lines = []
+                for line in f:
+                    lines.append(line)
+                    if len(lines) >= self.batch_size:
                         break
+                if not lines:
+                    break
+                out_lines, uid, halt = self.process_lines(
+                    lines,
+                    read_lnum + 1,
+                    uid,
+                    self.mapper,
+                    self.modules,
+                    self.all_col_names,
+                )
+                read_lnum += len(lines)
+                wf.write("".join(out_lines))
             f.close()
             wf.close()
+            if self.tabix:
+                self.write_index(outpath)
+
+    def get_data_start(self, bf) -> Optional[int]:
+        bf.seek(0)
+        while True:
+            line = bf.readline()
+            if not line:
+                return None
+            if line.startswith(b"#CHROM"):
+                return bf.tell()
+
+    def get_chunk_ranges(self, bf, start: int):
+        """Splits the data lines from `start` into byte ranges of about
+        chunk_size which end at line boundaries, with the line number of the
+        first line of each range."""
+        ranges = []
+        lnum = 1
+        bf.seek(start)
+        while True:
+            data = bf.read(self.chunk_size)
+            if not data:
+                break
+            if not data.endswith(b"\n"):
+                data += bf.readline()
+            end = start + len(data)
+            ranges.append((start, end, lnum))
+            lnum += data.count(b"\n") + (0 if data.endswith(b"\n") else 1)
+            start = end
+        return ranges
+
+    def get_bgzf_chunk_ranges(self, p, start: int):
+        """Splits the BGZF blocks of `p` from the virtual offset `start` into
+        ranges of about chunk_size compressed bytes. Each range is (virtual
+        offset of its start, compressed offset of its end, compressed offset
+        of the block before it). Only block headers are read. A range never
+        starts right after an empty block so that a worker can tell from the
+        previous block if its first line belongs to the previous range."""
+        from os.path import getsize
+        from oakvar.lib.util.bgzf import iter_block_offsets
+        from oakvar.lib.util.bgzf import make_virtual_offset
+        from oakvar.lib.util.bgzf import split_virtual_offset
+
+        ranges = []
+        first_coffset, _ = split_virtual_offset(start)
+        range_prev_coffset = None
+        prev_block = None
+        size = 0
+        for coffset, bsize, isize in iter_block_offsets(p):
+            if coffset > first_coffset:
+                if size >= self.chunk_size and prev_block and prev_block[1] > 0:
+                    ranges.append((start, coffset, range_prev_coffset))
+                    start = make_virtual_offset(coffset, 0)
+                    range_prev_coffset = prev_block[0]
+                    size = 0
+            if coffset >= first_coffset:
+                size += bsize
+            prev_block = (coffset, isize)
+        ranges.append((start, getsize(p), range_prev_coffset))
+        return ranges
+
+    def read_bgzf_chunk(
+        self, path: str, start: int, end: int, prev_coffset: Optional[int]
+    ) -> bytes:
+        """Reads the lines of a BGZF file which start at or after the virtual
+        offset `start` and before the block at `end`. A line which started in
+        the previous block is left to the previous range."""
+        from oakvar.lib.util.bgzf import BgzfReader
+        from oakvar.lib.util.bgzf import split_virtual_offset
+
+        lines = []
+        with BgzfReader(path) as f:
+            at_line_start = True
+            if prev_coffset is not None:
+                f.load_block(prev_coffset)
+                at_line_start = f.data.endswith(b"\n")
+            f.seek(start)
+            if not at_line_start:
+                f.readline()
+            while split_virtual_offset(f.tell())[0] < end:
+                line = f.readline()
+                if not line:
+                    break
+                lines.append(line)
+        return b"".join(lines)
+
+    def process_chunk(
+        self,
+        path: str,
+        start: int,
+        end: int,
+        start_lnum: int,
+        prev_coffset: Optional[int] = None,
+        bgzf: bool = False,
+    ):
+        """Annotates the lines in a byte range of `path`, or a range of BGZF
+        blocks if `bgzf` is True. uids start from 1 in each chunk and are
+        shifted when chunks are put together."""
+        from io import BytesIO
+        from io import TextIOWrapper
+
+        self.load_run_modules()
+        if bgzf:
+            data = self.read_bgzf_chunk(path, start, end, prev_coffset)
+        else:
+            with open(path, "rb") as f:
+                f.seek(start)
+                data = f.read(end - start)
+        lines = TextIOWrapper(BytesIO(data)).readlines()
+        del data
+        out = []
+        uid = 0
+        halt = False
+        for i in range(0, len(lines), self.batch_size):
+            out_lines, uid, halt = self.process_lines(
+                lines[i : i + self.batch_size],
+                start_lnum + i,
+                uid,
+                self.mapper,
+                self.modules,
+                self.all_col_names,
+            )
+            out.append("".join(out_lines))
+            if halt:
+                break
+        return "".join(out), uid, halt
+
+    def shift_uids(self, text: str, offset: int) -> str:
+        key = f"{self.OV_PREFIX}base__uid="
+        lines = text.split("\n")
+        for i, line in enumerate(lines):
+            idx = line.rfind(key)
+            if idx == -1:
+                continue
+            start = idx + len(key)
+            ends = [line.find(";", start), line.find("\t", start)]
+            ends = [v for v in ends if v != -1]
+            end = min(ends) if ends else len(line)
+            uids = [
+                str(int(v) + offset) if v else v for v in line[start:end].split(",")
+            ]
+            lines[i] = line[:start] + ",".join(uids) + line[end:]
+        return "\n".join(lines)
+
+    def run_file_parallel(self, p, wf) -> bool:
+        """Annotates the data lines of `p` in worker processes, each loading the
+        mapper and the annotators once, and writes the annotated chunks to
+        `wf` in input order. BGZF inputs are split at block boundaries and
+        their line numbers in logs are counted from the start of each chunk.
+        Returns False if `p` is too small to split or is compressed with
+        plain gzip, which cannot be read from the middle."""
+        from collections import deque
+        from multiprocessing import get_context
+        from oakvar.lib.util.bgzf import BgzfReader
+        from oakvar.lib.util.bgzf import is_bgzf
+        from oakvar.lib.util.bgzf import is_gzip
+        from oakvar.lib.base.mp_runners import init_vcf2vcf_worker
+        from oakvar.lib.base.mp_runners import vcf2vcf_chunk_runner
+
+        bgzf = is_bgzf(p)
+        if bgzf:
+            with BgzfReader(p) as bf:
+                data_start = self.get_data_start(bf)
+            if data_start is None:
+                return False
+            ranges = self.get_bgzf_chunk_ranges(p, data_start)
+        elif is_gzip(p):
+            return False
+        else:
+            with open(p, "rb") as bf:
+                data_start = self.get_data_start(bf)
+                if data_start is None:
+                    return False
+                ranges = self.get_chunk_ranges(bf, data_start)
+        if len(ranges) <= 1:
+            return False
+        num_workers = min(self.num_workers, len(ranges))
+        if self.logger:
+            self.logger.info(
+                f"{len(ranges)} chunks of {p} with {num_workers} workers"
+            )
+        uid_offset = 0
+        ranges = deque(ranges)
+        jobs = deque()
+        # Workers are spawned because a forked child would inherit the thread
+        # pool of polars, which deadlocks once this process has used it.
+        ctx = get_context("spawn")
+        initargs = (self.worker_kwargs,)
+        with ctx.Pool(num_workers, init_vcf2vcf_worker, initargs) as pool:
+            while ranges or jobs:
+                while ranges and len(jobs) < num_workers * 2:
+                    if bgzf:
+                        start, end, prev_coffset = ranges.popleft()
+                        args = (str(p), start, end, 1, prev_coffset, True)
+                    else:
+                        start, end, lnum = ranges.popleft()
+                        args = (str(p), start, end, lnum)
+                    job = pool.apply_async(vcf2vcf_chunk_runner, args)
+                    jobs.append(job)
+                text, num_uids, halt = jobs.popleft().get()
+                wf.write(self.shift_uids(text, uid_offset) if uid_offset else text)
+                uid_offset += num_uids
+                if halt:
+                    break
+        return True
 
     def setup_logger(self):
         import logging
@@ -19,6 +19,10 @@ crs_idx = [["uid"], ["sample_id"], ["sample_id", "uid"]]
 crv_idx = [["uid"]]
 crx_idx = [["uid"]]
 crg_idx = [["hugo"]]
+# Indexes built by the aggregator after loading, for per-gene and per-position
+# queries of the result viewer and reporters. Overridable per level with the
+# `aggregator: indexes:` run configuration.
+aggregator_secondary_idx = {"variant": [["hugo"], ["chrom", "pos"]]}
 
 all_mappings_col_name = "all_mappings"
 mapping_parser_name = "mapping_parser"
@@ -59,6 +63,7 @@ for g in ["hg18", "hg19"]:
         dirname(__file__), "liftover", g + "ToHg38.over.chain"
     )
 result_db_suffix = ".sqlite"
+RESULT_DB_BULK_COPY_CACHE_SIZE = 256 * 1024  # KiB
 LOG_SUFFIX = ".log"
 ERROR_LOG_SUFFIX = ".err"
 
@@ -3,11 +3,18 @@ from typing import Tuple
 from typing import List
 from typing import Dict
 from pathlib import Path
+from threading import Lock
 from . import local
 from . import remote
 
 _ = local or remote
 
+MODULE_PACK_COPY_BUFFER_SIZE = 16 * 1024 * 1024
+# pip does not support concurrent runs on the same environment.
+pypi_install_lock = Lock()
+module_swap_lock = Lock()
+MODULE_INSTALL_WORKERS = 4
+
 
 class InstallProgressHandler:
     def __init__(
@@ -144,13 +151,14 @@ def install_pypi_dependency(pypi_dependency: Optional[List[str]] = None, outer=N
     if outer:
         outer.write("Installing required PyPI packages...")
     idx = 0
-    while idx < len(pypi_dependency):
-        dep = pypi_dependency[idx]
-        r = run(["pip", "install", dep])
-        if r.returncode == 0:
-            pypi_dependency.remove(dep)
-        else:
-            idx += 1
+    with pypi_install_lock:
+        while idx < len(pypi_dependency):
+            dep = pypi_dependency[idx]
+            r = run(["pip", "install", dep])
+            if r.returncode == 0:
+                pypi_dependency.remove(dep)
+            else:
+                idx += 1
     if len(pypi_dependency) > 0 and outer:
         outer.write("Following PyPI dependencies could not be installed.")
         for dep in pypi_dependency:
@@ -290,6 +298,111 @@ def get_download_zipfile_path(
     return zipfile_path
 
 
+def get_url_list(urls: Optional[str]) -> List[str]:
+    from json import loads
+
+    if not urls:
+        return []
+    if urls[0] == "[":  # a list of URLs
+        return loads(urls)
+    return [urls]
+
+
+def get_module_pack_part_paths(zipfile_path: str, num_parts: int) -> List[str]:
+    return [f"{zipfile_path}{i:03d}" for i in range(num_parts)]
+
+
+def download_module_pack_part(
+    url: str,
+    part_path: str,
+    is_last_part: bool,
+    module_name: Optional[str] = None,
+    kind: Optional[str] = None,
+    total_size: int = 0,
+    cur_size: int = 0,
+    outer=None,
+    system_worker_state=None,
+):
+    from pathlib import Path
+    from os.path import getsize
+    from os import remove
+    from ..util.download import download
+    from ..exceptions import ModuleInstallationError
+    from ..store.consts import MODULE_PACK_SPLIT_FILE_SIZE
+
+    # A finished part is moved from its .part file into place, so an existing
+    # part of the right size is complete and is not downloaded again.
+    if Path(part_path).exists() and (
+        is_last_part or getsize(part_path) == MODULE_PACK_SPLIT_FILE_SIZE
+    ):
+        return
+    download(
+        url,
+        part_path,
+        system_worker_state=system_worker_state,
+        check_install_kill=check_install_kill,
+        module_name=module_name,
+        total_size=total_size,
+        cur_size=cur_size,
+        kind=kind or "file",
+        outer=outer,
+    )
+    if not is_last_part and getsize(part_path) != MODULE_PACK_SPLIT_FILE_SIZE:
+        remove(part_path)
+        raise ModuleInstallationError(
+            f"{module_name}: corrupt download of {url}"
+        )
+
+
+def iter_downloaded_module_pack_parts(
+    url_list: List[str],
+    part_paths: List[str],
+    skip_parts: int = 0,
+    module_name: Optional[str] = None,
+    kind: Optional[str] = None,
+    outer=None,
+    system_worker_state=None,
+):
+    """Downloads the parts of a split module pack concurrently and yields the
+    index of each part as its download finishes. The last part, which holds
+    the zip central directory, is downloaded first."""
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures import as_completed
+    from ..store.consts import MODULE_PACK_SPLIT_FILE_SIZE
+    from ..store.consts import MODULE_PACK_DOWNLOAD_WORKERS
+
+    num_parts = len(url_list)
+    total_size = num_parts * MODULE_PACK_SPLIT_FILE_SIZE
+    order = [i for i in [num_parts - 1] + list(range(num_parts - 1)) if i >= skip_parts]
+    if not order:
+        return
+    with ThreadPoolExecutor(
+        max_workers=min(MODULE_PACK_DOWNLOAD_WORKERS, len(order))
+    ) as pool:
+        futures = {
+            pool.submit(
+                download_module_pack_part,
+                url_list[i],
+                part_paths[i],
+                i == num_parts - 1,
+                module_name=module_name,
+                kind=kind,
+                total_size=total_size,
+                cur_size=i * MODULE_PACK_SPLIT_FILE_SIZE,
+                outer=outer,
+                system_worker_state=system_worker_state,
+            ): i
+            for i in order
+        }
+        try:
+            for future in as_completed(futures):
+                future.result()
+                yield futures[future]
+        finally:
+            for future in futures:
+                future.cancel()
+
+
 def download_code_or_data(
     urls: Optional[str] = None,
     module_name: Optional[str] = None,
@@ -303,7 +416,7 @@ def download_code_or_data(
     from pathlib import Path
     from os.path import getsize
     from os import remove
-    from json import loads
+    from shutil import copyfileobj
     from ..util.download import download
     from ..store.consts import MODULE_PACK_SPLIT_FILE_SIZE
 
@@ -317,22 +430,12 @@ def download_code_or_data(
     zipfile_path = get_download_zipfile_path(module_name, version, temp_dir, kind)
     if not zipfile_path:
         return
-    if urls is None:
+    url_list = get_url_list(urls)
+    if not url_list:
         return
-    one_url = ""
-    url_list: List[str] = []
-    if urls[0] == "[":  # a list of URLs
-        url_list = loads(urls)
-        if len(url_list) == 1:
-            one_url = url_list[0]
-            url_list = []
-    else:
-        one_url = urls
-    if not one_url and not url_list:
-        return
-    if one_url:
+    if len(url_list) == 1:
         download(
-            url=one_url,
+            url=url_list[0],
             fpath=zipfile_path,
             directory=temp_dir,
             system_worker_state=system_worker_state,
@@ -341,50 +444,36 @@ def download_code_or_data(
             kind=kind,
             outer=outer,
         )
-    elif url_list:
-        num_urls = len(url_list)
-        download_from = 0
-        total_size = num_urls * MODULE_PACK_SPLIT_FILE_SIZE
-        if Path(zipfile_path).exists():
-            zs = getsize(zipfile_path)
-            if zs % MODULE_PACK_SPLIT_FILE_SIZE == 0:
-                # partial download completed
-                download_from = int(getsize(zipfile_path) / MODULE_PACK_SPLIT_FILE_SIZE)
-            else:
-                remove(zipfile_path)
-        cur_size = download_from
-        with open(zipfile_path, "ab") as wf:
-            for i in range(num_urls):
-                if i < download_from:
-                    continue
-                part_path = f"{zipfile_path}{i:03d}"
-                if (
-                    Path(part_path).exists()
-                    and getsize(part_path) == MODULE_PACK_SPLIT_FILE_SIZE
-                ):
-                    continue
-                download(
-                    url_list[i],
-                    part_path,
-                    system_worker_state=system_worker_state,
-                    check_install_kill=check_install_kill,
-                    module_name=module_name,
-                    total_size=total_size,
-                    cur_size=cur_size,
-                    kind=kind,
-                    outer=outer,
-                )
-                if i < num_urls - 1:
-                    if getsize(part_path) != MODULE_PACK_SPLIT_FILE_SIZE:
-                        if outer:
-                            outer.write(
-                                f"corrupt download {part_path} at " + f"{url_list[i]}"
-                            )
-                        remove(part_path)
-                        return
-                with open(part_path, "rb") as f:
-                    wf.write(f.read())
-                remove(part_path)
+        return zipfile_path
+    download_from = 0
+    if Path(zipfile_path).exists():
+        zs = getsize(zipfile_path)
+        if zs % MODULE_PACK_SPLIT_FILE_SIZE == 0:
+            # partial download completed
+            download_from = int(zs / MODULE_PACK_SPLIT_FILE_SIZE)
+        else:
+            remove(zipfile_path)
+    part_paths = get_module_pack_part_paths(zipfile_path, len(url_list))
+    downloaded = set()
+    next_part = download_from
+    with open(zipfile_path, "ab") as wf:
+        for i in iter_downloaded_module_pack_parts(
+            url_list,
+            part_paths,
+            skip_parts=download_from,
+            module_name=module_name,
+            kind=kind,
+            outer=outer,
+            system_worker_state=system_worker_state,
+        ):
+            downloaded.add(i)
+            # Appends finished parts in order while later parts are downloading.
+            while next_part in downloaded:
+                with open(part_paths[next_part], "rb") as f:
+                    copyfileobj(f, wf, MODULE_PACK_COPY_BUFFER_SIZE)
+                wf.flush()
+                remove(part_paths[next_part])
+                next_part += 1
     return zipfile_path
 
 
@@ -412,8 +501,137 @@ def extract_code_or_data(
     remove(zipfile_path)
 
 
+def get_zip_member_part_ranges(zf, reader) -> List[Tuple[object, int, int]]:
+    infos = sorted(zf.infolist(), key=lambda info: info.header_offset)
+    member_ranges = []
+    for i, info in enumerate(infos):
+        start = info.header_offset
+        if i < len(infos) - 1:
+            end = infos[i + 1].header_offset
+        else:
+            end = getattr(zf, "start_dir", reader.size)
+        member_ranges.append(
+            (
+                info,
+                reader.get_part_index(start),
+                reader.get_part_index(max(start, end - 1)),
+            )
+        )
+    return member_ranges
+
+
+def download_and_extract_code_or_data(
+    urls: Optional[str] = None,
+    module_name: Optional[str] = None,
+    version: Optional[str] = None,
+    kind: Optional[str] = None,
+    temp_dir: Optional[Path] = None,
+    outer=None,
+    stage_handler=None,
+    system_worker_state=None,
+) -> bool:
+    """Downloads and extracts module code or data. For split module packs,
+    parts are downloaded concurrently and zip members are extracted as soon
+    as all the parts holding them have arrived, without concatenating the
+    parts. Extraction verifies the CRC of each member."""
+    from zipfile import ZipFile
+    from zipfile import BadZipFile
+    from os.path import getsize
+    from os import remove
+    from ..util.download import SplitPartsReader
+    from ..store.consts import MODULE_PACK_SPLIT_FILE_SIZE
+
+    url_list = get_url_list(urls)
+    if len(url_list) <= 1 or not module_name or not version or not temp_dir:
+        zipfile_path = download_code_or_data(
+            urls=urls,
+            module_name=module_name,
+            version=version,
+            kind=kind,
+            temp_dir=temp_dir,
+            outer=outer,
+            stage_handler=stage_handler,
+            system_worker_state=system_worker_state,
+        )
+        if not zipfile_path or not module_name or not kind:
+            return False
+        extract_code_or_data(
+            module_name=module_name,
+            kind=kind,
+            zipfile_path=zipfile_path,
+            temp_dir=temp_dir,
+            stage_handler=stage_handler,
+            system_worker_state=system_worker_state,
+        )
+        return True
+    check_install_kill(system_worker_state=system_worker_state, module_name=module_name)
+    if not kind or kind not in ["code", "data"]:
+        return False
+    if stage_handler:
+        stage_handler.stage_start(f"download_{kind}")
+    zipfile_path = get_download_zipfile_path(module_name, version, temp_dir, kind)
+    num_parts = len(url_list)
+    part_paths = get_module_pack_part_paths(zipfile_path, num_parts)
+    downloaded = set()
+    reader = None
+    zf = None
+    member_ranges = []
+    extraction_started = False
+    try:
+        for i in iter_downloaded_module_pack_parts(
+            url_list,
+            part_paths,
+            module_name=module_name,
+            kind=kind,
+            outer=outer,
+            system_worker_state=system_worker_state,
+        ):
+            downloaded.add(i)
+            if zf is None and num_parts - 1 in downloaded:
+                part_sizes = [MODULE_PACK_SPLIT_FILE_SIZE] * (num_parts - 1) + [
+                    getsize(part_paths[-1])
+                ]
+                reader = SplitPartsReader(part_paths, part_sizes)
+                try:
+                    zf = ZipFile(reader)
+                    member_ranges = get_zip_member_part_ranges(zf, reader)
+                except (BadZipFile, FileNotFoundError):
+                    # The central directory spans parts not downloaded yet.
+                    zf = None
+            if zf is None:
+                continue
+            remaining = []
+            for info, first_part, last_part in member_ranges:
+                if all(
+                    [j in downloaded for j in range(first_part, last_part + 1)]
+                ):
+                    if not extraction_started:
+                        if stage_handler:
+                            stage_handler.stage_start(f"extract_{kind}")
+                        extraction_started = True
+                    check_install_kill(
+                        system_worker_state=system_worker_state,
+                        module_name=module_name,
+                    )
+                    zf.extract(info, temp_dir)
+                else:
+                    remaining.append((info, first_part, last_part))
+            member_ranges = remaining
+        if zf is None:
+            return False
+        if member_ranges:
+            return False
+    finally:
+        if zf is not None:
+            zf.close()
+        if reader is not None:
+            reader.close()
+    for part_path in part_paths:
+        remove(part_path)
+    return True
+
+
 def cleanup_install(
-    module_name: str,
     module_dir: str,
     temp_dir: Path,
     installation_finished: bool,
@@ -422,31 +640,39 @@ def cleanup_install(
 ):
     from pathlib import Path
     from shutil import rmtree
-    from shutil import move
-    from os import listdir
-    from .local import remove_code_part_of_module
+    from os import rename
 
     if not module_dir:
         return
     # Unsuccessful installation
     if not installation_finished:
         return
+    write_install_marks(str(temp_dir))
     # New installation
     if not Path(module_dir).exists():
-        move(str(temp_dir), module_dir)
+        Path(module_dir).parent.mkdir(parents=True, exist_ok=True)
+        rename(temp_dir, module_dir)
         return
-    # Update
-    if data_installed:
-        rmtree(module_dir)
-        move(str(temp_dir), module_dir)
-    elif code_installed:
-        remove_code_part_of_module(module_name)
-        for item in listdir(temp_dir):
-            old_path = Path(temp_dir) / item
-            new_path = Path(module_dir) / item
-            if item != "data":
-                move(str(old_path), new_path)
-        rmtree(temp_dir)
+    # Update. The new module directory is completed in the temp directory and
+    # swapped in with renames, so that the module is never half-updated.
+    keep_data = code_installed and not data_installed
+    old_dir = Path(temp_dir).parent / (Path(temp_dir).name + ".old")
+    rmtree(old_dir, ignore_errors=True)
+    if keep_data:
+        rmtree(Path(temp_dir) / "data", ignore_errors=True)
+    rename(module_dir, old_dir)
+    data_moved = False
+    try:
+        if keep_data and (old_dir / "data").exists():
+            rename(old_dir / "data", Path(temp_dir) / "data")
+            data_moved = True
+        rename(temp_dir, module_dir)
+    except Exception:
+        if data_moved:
+            rename(Path(temp_dir) / "data", old_dir / "data")
+        rename(old_dir, module_dir)
+        raise
+    rmtree(old_dir, ignore_errors=True)
 
 
 def write_install_marks(module_dir: str):
@@ -742,7 +968,7 @@ def install_module(
             module_type + "s",
             module_name,
         )
-        zipfile_path = download_code_or_data(
+        if not download_and_extract_code_or_data(
             urls=code_url,
             module_name=module_name,
             version=code_version,
@@ -751,19 +977,10 @@ def install_module(
             outer=outer,
             stage_handler=stage_handler,
             system_worker_state=system_worker_state,
-        )
-        if not zipfile_path:
+        ):
             if outer:
                 outer.error("code download failed")
             raise ModuleInstallationError(module_name)
-        extract_code_or_data(
-            module_name=module_name,
-            kind="code",
-            zipfile_path=zipfile_path,
-            temp_dir=temp_dir,
-            stage_handler=stage_handler,
-            system_worker_state=system_worker_state,
-        )
         code_installed = True
         if (
             not skip_data
@@ -774,7 +991,7 @@ def install_module(
                 if outer:
                     outer.error("data_url is empty.")
                 raise ModuleInstallationError(module_name)
-            data_zipfile_path: Optional[str] = download_code_or_data(
+            if not download_and_extract_code_or_data(
                 urls=data_url,
                 module_name=module_name,
                 version=remote_data_version,
@@ -783,31 +1000,21 @@ def install_module(
                 outer=outer,
                 stage_handler=stage_handler,
                 system_worker_state=system_worker_state,
-            )
-            if not data_zipfile_path:
+            ):
                 if error:
                     error.write("Data download failed")
                 raise ModuleInstallationError(module_name)
-            extract_code_or_data(
-                module_name=module_name,
-                kind="data",
-                zipfile_path=data_zipfile_path,
-                temp_dir=temp_dir,
-                stage_handler=stage_handler,
-                system_worker_state=system_worker_state,
-            )
             data_installed = True
         installation_finished = True
-        cleanup_install(
-            module_name,
-            module_dir,
-            temp_dir,
-            installation_finished,
-            code_installed,
-            data_installed,
-        )
-        write_install_marks(module_dir)
-        get_module_cache().update_local()
+        with module_swap_lock:
+            cleanup_install(
+                module_dir,
+                temp_dir,
+                installation_finished,
+                code_installed,
+                data_installed,
+            )
+            get_module_cache().update_local()
         if stage_handler:
             stage_handler.stage_start("finish")
         if outer:
@@ -824,7 +1031,6 @@ def install_module(
             if outer:
                 outer.error(e)
             cleanup_install(
-                module_name,
                 module_dir,
                 temp_dir,
                 installation_finished,
@@ -835,7 +1041,6 @@ def install_module(
             if stage_handler:
                 stage_handler.stage_start("killed")
             cleanup_install(
-                module_name,
                 module_dir,
                 temp_dir,
                 installation_finished,
@@ -850,7 +1055,6 @@ def install_module(
             return False
         else:
             cleanup_install(
-                module_name,
                 module_dir,
                 temp_dir,
                 installation_finished,
@@ -863,6 +1067,63 @@ def install_module(
     #    signal.signal(signal.SIGINT, original_sigint)
 
 
+def install_modules(
+    module_versions: Dict[str, Optional[str]],
+    max_workers: Optional[int] = None,
+    max_downloads: Optional[int] = None,
+    max_download_bandwidth: Optional[int] = None,
+    stage_handler: Optional[InstallProgressHandler] = None,
+    outer=None,
+    **kwargs,
+) -> Dict[str, bool]:
+    """Installs store modules concurrently.
+
+    Args:
+        module_versions (Dict[str, Optional[str]]): Module names and versions to install. `None` version installs the latest version.
+        max_workers (Optional[int]): Number of modules to install at the same time
+        max_downloads (Optional[int]): Number of HTTP downloads across all modules at the same time
+        max_download_bandwidth (Optional[int]): Bandwidth limit across all downloads in bytes per second
+        **kwargs: passed to `install_module`
+
+    Returns:
+        A dict of module names and whether each was installed.
+    """
+    from copy import copy
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures import as_completed
+    from ..util.download_library import set_download_limits
+
+    results: Dict[str, bool] = {}
+    if not module_versions:
+        return results
+    set_download_limits(
+        max_concurrent=max_downloads, max_bytes_per_sec=max_download_bandwidth
+    )
+    num_workers = min(max_workers or MODULE_INSTALL_WORKERS, len(module_versions))
+    num_workers = max(1, num_workers)
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        futures = {
+            pool.submit(
+                install_module,
+                module_name,
+                version=version,
+                stage_handler=copy(stage_handler) if stage_handler else None,
+                outer=outer,
+                **kwargs,
+            ): module_name
+            for module_name, version in module_versions.items()
+        }
+        for future in as_completed(futures):
+            module_name = futures[future]
+            try:
+                results[module_name] = bool(future.result())
+            except Exception as e:
+                results[module_name] = False
+                if outer:
+                    outer.error(e)
+    return results
+
+
 def uninstall_module(module_name, outer=None):
     import shutil
     from .local import get_local_module_info
@@ -1,9 +1,33 @@
 from typing import Optional
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Iterable
+from typing import Tuple
+
+DEFAULT_MEMORY_CACHE_SIZE = 10000
+DEFAULT_WRITE_BATCH_SIZE = 1000
+SQLITE_BUSY_TIMEOUT = 60
+SQLITE_MAX_VARIABLES = 500
+ANNOTATION_CACHE_BATCH_SIZE = 1000
 
 
 class ModuleDataCache:
-    def __init__(self, module_name: str, module_type: str = ""):
+    """Two-tier key-value cache of a module.
+
+    An in-process LRU sits in front of a per-module `cache/cache.sqlite`
+    which is opened in WAL mode so that several annotator processes can use
+    it at the same time. Writes are committed right away unless deferred,
+    in which case they are buffered and committed in batches. The module's
+    yml can set, under `cache`, `expiration` (in days),
+    `max_entries` (size bound of the sqlite tier, evicted in LRU order) and
+    `memory_size` (size of the in-process LRU).
+    """
+
+    def __init__(self, module_name: str, module_type: str = "", logger=None):
         from pathlib import Path
+        from collections import OrderedDict
+        from logging import getLogger
         from .local import get_cache_conf
         from .local import get_module_dir
 
@@ -11,11 +35,26 @@ class ModuleDataCache:
         self.module_name = module_name
         self.module_type = module_type
         self.module_dir = get_module_dir(module_name, module_type=module_type)
-        self.conf = get_cache_conf(module_name, module_type=module_type)
-        self.expiration_in_day = self.conf.get("expiration") if self.conf else None
+        self.conf = get_cache_conf(module_name, module_type=module_type) or {}
+        self.expiration_in_day = self.conf.get("expiration")
         self.expiration = (
             self.expiration_in_day * 60 * 60 * 24 if self.expiration_in_day else None
         )
+        self.max_entries: Optional[int] = self.conf.get("max_entries")
+        self.memory_size: int = self.conf.get("memory_size", DEFAULT_MEMORY_CACHE_SIZE)
+        self.write_batch_size: int = self.conf.get(
+            "write_batch_size", DEFAULT_WRITE_BATCH_SIZE
+        )
+        self.logger = logger or getLogger("oakvar." + module_name)
+        self.memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.pending_writes: Dict[str, Tuple[str, float]] = {}
+        self.pending_accesses: Dict[str, float] = {}
+        self.num_writes_since_eviction: int = 0
+        self.num_memory_hits: int = 0
+        self.num_db_hits: int = 0
+        self.num_misses: int = 0
+        self.num_expired: int = 0
+        self.num_evicted: int = 0
         self.dir = Path(self.module_dir) / "cache" if self.module_dir else None
         self.path = self.dir / "cache.sqlite" if self.dir else None
         if self.path:
@@ -27,7 +66,7 @@ class ModuleDataCache:
         from pathlib import Path
 
         if self.dir and not Path(self.dir).exists():
-            self.dir.mkdir()
+            self.dir.mkdir(parents=True, exist_ok=True)
 
     def get_conn(self):
         from sqlite3 import connect
@@ -37,14 +76,17 @@ class ModuleDataCache:
             return None
         if not self.conn:
             try:
-                self.conn = connect(str(self.path))
+                self.conn = connect(str(self.path), timeout=SQLITE_BUSY_TIMEOUT)
+                self.conn.execute("pragma journal_mode=wal")
             except Exception:
                 print(
                     f"Could not open module cache for {self.module_name}. "
                     + "Restarting the cache db."
                 )
                 remove(self.path)
-                self.conn = connect(str(self.path))
+                self.conn = connect(str(self.path), timeout=SQLITE_BUSY_TIMEOUT)
+                self.conn.execute("pragma journal_mode=wal")
+            self.conn.execute("pragma synchronous=normal")
         return self.conn
 
     def create_cache_table_if_needed(self):
@@ -52,15 +94,56 @@ class ModuleDataCache:
             return
         q = (
             "create table if not exists cache (k text primary key, v text, "
-            + "timestamp float)"
+            + "timestamp float, accessed float)"
         )
         self.conn.execute(q)
+        col_names = [row[1] for row in self.conn.execute("pragma table_info(cache)")]
+        if "accessed" not in col_names:
+            self.conn.execute("alter table cache add column accessed float")
+            self.conn.execute("update cache set accessed=timestamp")
+        self.conn.execute(
+            "create index if not exists cache_accessed on cache (accessed)"
+        )
         self.conn.commit()
 
     def commit(self):
         if not self.conn:
             return
+        self.flush()
+
+    def flush(self):
+        if not self.conn:
+            return
+        if self.pending_writes:
+            q = (
+                "insert or replace into cache (k, v, timestamp, accessed) "
+                + "values (?, ?, ?, ?)"
+            )
+            self.conn.executemany(
+                q, [(k, v, ts, ts) for k, (v, ts) in self.pending_writes.items()]
+            )
+            self.num_writes_since_eviction += len(self.pending_writes)
+            self.pending_writes.clear()
+        if self.pending_accesses:
+            q = "update cache set accessed=? where k=?"
+            self.conn.executemany(
+                q, [(ts, k) for k, ts in self.pending_accesses.items()]
+            )
+            self.pending_accesses.clear()
+        num_deleted = 0
+        if self.num_writes_since_eviction >= self.write_batch_size:
+            num_deleted = self.delete_evictable()
         self.conn.commit()
+        self.num_evicted += num_deleted
+
+    def remember(self, key, value, timestamp: float):
+        self.memory[key] = (value, timestamp)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def is_expired(self, timestamp: float, now: float) -> bool:
+        return bool(self.expiration) and now - timestamp > self.expiration
 
     def add_cache(self, key, value, defer_commit=False):
         import time
@@ -68,45 +151,325 @@ class ModuleDataCache:
 
         if not self.conn:
             return
-        key = key
-        value = dumps(value)
-        q = "insert or replace into cache (k, v, timestamp) values (?, ?, ?)"
         ts = time.time()
-        self.conn.execute(q, (key, value, ts))
+        self.pending_writes[key] = (dumps(value), ts)
+        self.pending_accesses.pop(key, None)
+        self.remember(key, value, ts)
+        if not defer_commit or len(self.pending_writes) >= self.write_batch_size:
+            self.flush()
+
+    def put_many(self, items: Iterable[Tuple[str, Any]], defer_commit=False):
+        import time
+        from json import dumps
+
+        if not self.conn:
+            return
+        ts = time.time()
+        for key, value in items:
+            self.pending_writes[key] = (dumps(value), ts)
+            self.pending_accesses.pop(key, None)
+            self.remember(key, value, ts)
         if not defer_commit:
-            self.conn.commit()
+            self.flush()
 
     def delete_cache(self, key, defer_commit=False):
         if not self.conn:
             return
-        q = "delete from cache where key=?"
+        self.memory.pop(key, None)
+        self.pending_writes.pop(key, None)
+        self.pending_accesses.pop(key, None)
+        q = "delete from cache where k=?"
         self.conn.execute(q, (key,))
         if not defer_commit:
             self.conn.commit()
 
     def get_cache(self, key) -> Optional[str]:
+        ret = self.get_many([key])
+        return ret.get(key)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
         import time
         from json import loads
         from traceback import print_exc
 
+        ret: Dict[str, Any] = {}
+        if not self.conn:
+            return ret
+        now = time.time()
+        expired: List[str] = []
+        db_keys: List[str] = []
+        for key in keys:
+            cached = self.memory.get(key)
+            if cached is None:
+                pending = self.pending_writes.get(key)
+                if pending is not None:
+                    cached = (loads(pending[0]), pending[1])
+            if cached is None:
+                db_keys.append(key)
+                continue
+            value, timestamp = cached
+            if self.is_expired(timestamp, now):
+                expired.append(key)
+                continue
+            self.remember(key, value, timestamp)
+            self.pending_accesses[key] = now
+            self.num_memory_hits += 1
+            ret[key] = value
+        for i in range(0, len(db_keys), SQLITE_MAX_VARIABLES):
+            chunk = db_keys[i : i + SQLITE_MAX_VARIABLES]
+            q = (
+                "select k, v, timestamp from cache where k in ("
+                + ",".join(["?"] * len(chunk))
+                + ")"
+            )
+            for k, v, timestamp in self.conn.execute(q, chunk):
+                timestamp = float(timestamp)
+                if self.is_expired(timestamp, now):
+                    expired.append(k)
+                    continue
+                try:
+                    v = loads(v)
+                except Exception:
+                    print_exc()
+                self.remember(k, v, timestamp)
+                self.pending_accesses[k] = now
+                self.num_db_hits += 1
+                ret[k] = v
+        for key in expired:
+            self.delete_cache(key, defer_commit=True)
+        self.num_expired += len(expired)
+        self.num_misses += len(keys) - len(ret)
+        if expired:
+            self.conn.commit()
+        if len(self.pending_accesses) >= self.write_batch_size:
+            self.flush()
+        return ret
+
+    def delete_evictable(self) -> int:
+        """Deletes expired rows and the least recently used rows beyond
+        `max_entries` without committing. Returns the number of deleted
+        rows."""
+        import time
+
+        if not self.conn:
+            return 0
+        self.num_writes_since_eviction = 0
+        num_deleted = 0
+        if self.expiration:
+            cursor = self.conn.execute(
+                "delete from cache where timestamp<?", (time.time() - self.expiration,)
+            )
+            num_deleted += cursor.rowcount
+        if self.max_entries:
+            cursor = self.conn.execute(
+                "delete from cache where k in (select k from cache order by accessed "
+                + "limit max(0, (select count(*) from cache) - ?))",
+                (self.max_entries,),
+            )
+            num_deleted += cursor.rowcount
+        return max(num_deleted, 0)
+
+    def evict(self):
         if not self.conn:
             return
-        q = "select v, timestamp from cache where k=?"
-        ret = self.conn.execute(q, (key,)).fetchone()
-        if ret:
-            v = ret[0]  # type: ignore
-            try:
-                v = loads(v)
-            except Exception:
-                print_exc()
-            timestamp = float(ret[1])  # type: ignore
-            if self.expiration:
-                if time.time() - timestamp > self.expiration:
-                    self.delete_cache(key)
-                    return
-                else:
-                    return v
-            else:
-                return v
-        else:
+        self.flush()
+        num_deleted = self.delete_evictable()
+        self.conn.commit()
+        self.num_evicted += num_deleted
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.num_memory_hits,
+            "db_hits": self.num_db_hits,
+            "misses": self.num_misses,
+            "expired": self.num_expired,
+            "evicted": self.num_evicted,
+        }
+
+    def log_stats(self):
+        stats = self.get_stats()
+        if not self.logger or not any(stats.values()):
+            return
+        self.logger.info(
+            f"{self.module_name} cache: "
+            + ", ".join([f"{k}={v}" for k, v in stats.items()])
+        )
+
+    def close(self):
+        if not self.conn:
             return
+        self.evict()
+        self.log_stats()
+        self.conn.close()
+        self.conn = None
+        self.memory.clear()
+
+
+class AnnotationCache:
+    """Shared on-disk cache of annotator outputs by variant.
+
+    Each module has `<annotation_cache_dir>/<module_name>.sqlite`, which all
+    jobs on a node share. Rows are keyed by module version, chromosome,
+    position, reference and alternate bases. The database is in WAL mode so
+    that readers do not block writers, and writes are short `begin immediate`
+    transactions so that concurrent jobs wait on the busy timeout instead of
+    failing on a stale snapshot. Rows not used for the longest time are
+    evicted beyond `annotation_cache_max_entries`.
+    """
+
+    def __init__(self, module_name: str, version: str, logger=None):
+        from logging import getLogger
+        from ..system import get_annotation_cache_dir
+        from ..system import get_annotation_cache_max_entries
+
+        self.conn = None
+        self.module_name = module_name
+        self.version = version
+        self.logger = logger or getLogger("oakvar." + module_name)
+        self.max_entries: int = get_annotation_cache_max_entries()
+        self.num_hits: int = 0
+        self.num_misses: int = 0
+        self.num_evicted: int = 0
+        self.dir = get_annotation_cache_dir()
+        self.path = self.dir / (module_name + ".sqlite") if self.dir else None
+        if self.path:
+            self.conn = self.get_conn()
+
+    def get_conn(self):
+        from sqlite3 import connect
+        from sqlite3 import DatabaseError
+
+        if not self.path:
+            return None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = connect(
+                str(self.path), timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None
+            )
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            conn.execute(
+                "create table if not exists annotation (version text, chrom text, "
+                + "pos integer, ref text, alt text, v text, accessed float, "
+                + "primary key (version, chrom, pos, ref, alt)) without rowid"
+            )
+            conn.execute(
+                "create index if not exists annotation_accessed on annotation "
+                + "(accessed)"
+            )
+        except (OSError, DatabaseError) as e:
+            self.logger.warning(
+                f"annotation cache of {self.module_name} is not used: {e}"
+            )
+            return None
+        return conn
+
+    def get_many(
+        self, keys: List[Tuple[str, int, str, str]]
+    ) -> Dict[Tuple[str, int, str, str], Any]:
+        """Cached outputs of (chrom, pos, ref, alt) keys. A cached output can
+        be None, for a variant which the module did not annotate."""
+        import time
+        from json import loads
+
+        ret: Dict[Tuple[str, int, str, str], Any] = {}
+        if not self.conn or not keys:
+            return ret
+        stale: List[Tuple[str, int, str, str]] = []
+        # Last access times are refreshed at most hourly to save writes.
+        now = time.time()
+        num_per_key = 4
+        chunk_size = SQLITE_MAX_VARIABLES // num_per_key
+        uniq_keys = list(dict.fromkeys(keys))
+        for i in range(0, len(uniq_keys), chunk_size):
+            chunk = uniq_keys[i : i + chunk_size]
+            q = (
+                "select chrom, pos, ref, alt, v, accessed from annotation "
+                + "where version=? and ("
+                + " or ".join(["(chrom=? and pos=? and ref=? and alt=?)"] * len(chunk))
+                + ")"
+            )
+            values: List[Any] = [self.version]
+            for key in chunk:
+                values.extend(key)
+            for chrom, pos, ref, alt, v, accessed in self.conn.execute(q, values):
+                key = (chrom, pos, ref, alt)
+                ret[key] = loads(v)
+                if now - accessed > 3600:
+                    stale.append(key)
+        self.num_hits += len(ret)
+        self.num_misses += len(uniq_keys) - len(ret)
+        if stale:
+            self.write(
+                "update annotation set accessed=? where version=? and chrom=? "
+                + "and pos=? and ref=? and alt=?",
+                [(now, self.version, *key) for key in stale],
+            )
+        return ret
+
+    def put_many(self, items: Iterable[Tuple[Tuple[str, int, str, str], Any]]):
+        import time
+        from json import dumps
+
+        if not self.conn:
+            return
+        now = time.time()
+        rows = [(self.version, *key, dumps(value), now) for key, value in items]
+        if not rows:
+            return
+        self.write(
+            "insert or replace into annotation (version, chrom, pos, ref, alt, v, "
+            + "accessed) values (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def write(self, q: str, rows: List[Tuple]) -> int:
+        """Runs `q` on `rows` in one transaction and returns the number of rows
+        changed, which is 0 if the transaction failed and was rolled back."""
+        from sqlite3 import DatabaseError
+
+        if not self.conn:
+            return 0
+        try:
+            self.conn.execute("begin immediate")
+            num_changes = self.conn.total_changes
+            self.conn.executemany(q, rows)
+            num_changes = self.conn.total_changes - num_changes
+            self.conn.execute("commit")
+        except DatabaseError as e:
+            if self.conn.in_transaction:
+                self.conn.execute("rollback")
+            self.logger.warning(f"annotation cache of {self.module_name}: {e}")
+            return 0
+        return num_changes
+
+    def evict(self):
+        """Deletes the least recently used rows beyond `max_entries`."""
+        if not self.conn or not self.max_entries:
+            return
+        (num_rows,) = self.conn.execute("select count(*) from annotation").fetchone()
+        num_over = num_rows - self.max_entries
+        if num_over <= 0:
+            return
+        self.num_evicted += self.write(
+            "delete from annotation where (version, chrom, pos, ref, alt) in "
+            + "(select version, chrom, pos, ref, alt from annotation "
+            + "order by accessed limit ?)",
+            [(num_over,)],
+        )
+
+    def log_stats(self):
+        if not self.logger or not (self.num_hits or self.num_misses):
+            return
+        self.logger.info(
+            f"{self.module_name} annotation cache: hits={self.num_hits}, "
+            + f"misses={self.num_misses}, evicted={self.num_evicted}"
+        )
+
+    def close(self):
+        if not self.conn:
+            return
+        self.evict()
+        self.log_stats()
+        self.conn.close()
+        self.conn = None
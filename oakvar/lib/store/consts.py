@@ -17,5 +17,8 @@ versions_table_cols = [
 ]
 logo_size = (275, 170)
 MODULE_PACK_SPLIT_FILE_SIZE = 100 * 1024 * 1024
+MODULE_PACK_DOWNLOAD_WORKERS = 4
 pack_ignore_fnames = [".DS_Store", "__pycache__"]
 store_url_key = "store_url"
+STORE_FETCH_WORKERS = 16
+STORE_FETCH_RETRIES = 3
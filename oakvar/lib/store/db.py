@@ -3,21 +3,55 @@ from typing import List
 from typing import Tuple
 from typing import Any
 from pathlib import Path
+from threading import local
+
+store_thread_locals = local()
+module_cache_file_exts = {"readme": "", "logo": ".png", "conf": ".json"}
+module_cache_file_empty_contents = {"readme": b"", "logo": b"", "conf": b"{}"}
 
 
 def get_ov_store_cache_conn(conf=None):
+    """Returns a connection to the store cache DB and a new cursor. Connections
+    are reused per process and thread, since sqlite3 connections cannot be
+    shared across threads or forks."""
     from sqlite3 import connect
+    from os import getpid
+    from os.path import exists
     from .consts import ov_store_cache_fn
     from os.path import join
     from ..system import get_conf_dir
 
     conf_dir: Optional[Path] = get_conf_dir(conf=conf)
-    if conf_dir:
-        ov_store_cache_path = join(conf_dir, ov_store_cache_fn)
+    if not conf_dir:
+        return None, None
+    ov_store_cache_path = join(conf_dir, ov_store_cache_fn)
+    conns = getattr(store_thread_locals, "conns", None)
+    if conns is None:
+        conns = {}
+        store_thread_locals.conns = conns
+    key = (getpid(), ov_store_cache_path)
+    conn = conns.get(key)
+    if conn is None or not exists(ov_store_cache_path):
+        if conn is not None:
+            conn.close()
         conn = connect(ov_store_cache_path)
-        cursor = conn.cursor()
-        return conn, cursor
-    return None, None
+        conns[key] = conn
+    cursor = conn.cursor()
+    return conn, cursor
+
+
+def close_ov_store_thread_locals():
+    """Closes the store cache DB connections and the HTTP session of the
+    current thread."""
+    conns = getattr(store_thread_locals, "conns", None)
+    if conns:
+        for conn in conns.values():
+            conn.close()
+        conns.clear()
+    session = getattr(store_thread_locals, "session", None)
+    if session is not None:
+        session.close()
+        store_thread_locals.session = None
 
 
 def db_func(func):
@@ -469,59 +503,64 @@ def fetch_ov_store_cache(
     from .ov import get_server_last_updated
     from ..module.remote import make_remote_manifest
 
-    if not conn or not cursor:
-        return False
-    if not login_with_token_set():
+    try:
+        if not conn or not cursor:
+            return False
+        if not login_with_token_set():
+            if outer:
+                outer.write("Not logged in")
+            return False
+        if is_new_store_db_setup():
+            refresh_db = True
+            clean_cache_files = True
+            local_last_updated = ""
+        else:
+            local_last_updated = get_local_last_updated()
+        if is_store_db_schema_changed():
+            if outer:
+                outer.write("Need to fetch store cache due to schema change")
+        server_last_updated, status_code = get_server_last_updated()
+        if status_code != 200:
+            if status_code == 401:
+                raise AuthorizationError()
+            elif status_code == 500:
+                raise StoreServerError()
+            return False
+        if (
+            not refresh_db
+            and not clean_cache_files
+            and local_last_updated
+            and local_last_updated >= server_last_updated
+        ):
+            if outer:
+                outer.write("No store update to fetch")
+            return True
+        publish_time = local_last_updated
+        drop_ov_store_cache(refresh_db=refresh_db, clean_cache_files=clean_cache_files)
+        create_ov_store_cache()
+        fetch_summary_cache(publish_time=publish_time, outer=outer)
+        fetch_versions_cache(publish_time=publish_time, outer=outer)
+        if clean_cache_files or clean:
+            publish_time = ""
+        else:
+            publish_time = local_last_updated
         if outer:
-            outer.write("Not logged in")
-        return False
-    if is_new_store_db_setup():
-        refresh_db = True
-        clean_cache_files = True
-        local_last_updated = ""
-    else:
-        local_last_updated = get_local_last_updated()
-    if is_store_db_schema_changed():
+            outer.write("Fetching store cache 3/3...")
+        fetch_module_cache_files(
+            ["readme", "logo", "conf"], publish_time=publish_time, outer=outer
+        )
+        q = "insert or replace into info ( key, value ) values ( ?, ? )"
+        cursor.execute(q, (ov_store_last_updated_col, str(server_last_updated)))
+        conn.commit()
         if outer:
-            outer.write("Need to fetch store cache due to schema change")
-    server_last_updated, status_code = get_server_last_updated()
-    if status_code != 200:
-        if status_code == 401:
-            raise AuthorizationError()
-        elif status_code == 500:
-            raise StoreServerError()
-        return False
-    if (
-        not refresh_db
-        and not clean_cache_files
-        and local_last_updated
-        and local_last_updated >= server_last_updated
-    ):
+            outer.write("Finalizing fetch...")
+        content = make_remote_manifest()
+        save_remote_manifest_cache(content)
         if outer:
-            outer.write("No store update to fetch")
+            outer.write("OakVar store cache has been fetched.")
         return True
-    publish_time = local_last_updated
-    drop_ov_store_cache(refresh_db=refresh_db, clean_cache_files=clean_cache_files)
-    create_ov_store_cache()
-    fetch_summary_cache(publish_time=publish_time, outer=outer)
-    fetch_versions_cache(publish_time=publish_time, outer=outer)
-    if clean_cache_files or clean:
-        publish_time = ""
-    else:
-        publish_time = local_last_updated
-    fetch_readme_cache(publish_time=publish_time, outer=outer)
-    fetch_logo_cache(publish_time=publish_time, outer=outer)
-    fetch_conf_cache(publish_time=publish_time, outer=outer)
-    q = "insert or replace into info ( key, value ) values ( ?, ? )"
-    cursor.execute(q, (ov_store_last_updated_col, str(server_last_updated)))
-    conn.commit()
-    if outer:
-        outer.write("Finalizing fetch...")
-    content = make_remote_manifest()
-    save_remote_manifest_cache(content)
-    if outer:
-        outer.write("OakVar store cache has been fetched.")
-    return True
+    finally:
+        close_ov_store_thread_locals()
 
 
 @db_func
@@ -549,138 +588,118 @@ def get_summary_module_store_list(publish_time: str = "", conn=None, cursor=None
     return out
 
 
-@db_func
-def fetch_conf_cache(
-    publish_time: str = "", outer=None, conn=None, cursor=None, conf={}
-):
+def make_store_fetch_session():
+    """Returns a new HTTP session for store fetches. Failed requests are
+    retried with backoff."""
     from requests import Session
-    from .ov.account import get_current_id_token
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    from .consts import STORE_FETCH_RETRIES
+
+    retry = Retry(
+        total=STORE_FETCH_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry)
+    session = Session()
+    session.headers["User-Agent"] = "oakvar"
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_store_fetch_session():
+    """Returns the HTTP session of the current thread for store fetches."""
+    session = getattr(store_thread_locals, "session", None)
+    if session is None:
+        session = make_store_fetch_session()
+        store_thread_locals.session = session
+    return session
+
+
+def get_module_cache_file_path(kind: str, store: str, name: str, conf={}) -> Path:
     from ..system import get_cache_dir
-    from .ov import get_store_url
     from ..exceptions import SystemMissingException
 
-    if not conn or not cursor:
-        return
-    module_stores = get_summary_module_store_list(publish_time=publish_time)
-    if not module_stores:
-        return
-    id_token = get_current_id_token()
-    params = {"idToken": id_token, "publish_time": publish_time}
-    s = Session()
-    s.headers["User-Agent"] = "oakvar"
-    if outer:
-        outer.write("Fetching store cache 5/5...")
-    for module_store in module_stores:
-        name = module_store["name"]
-        store = module_store["store"]
-        conf_dir = get_cache_dir("conf", conf=conf)
-        if not conf_dir:
-            raise SystemMissingException(
-                msg="readme directory is missing. Consider running `ov system setup`?"
-            )
-        fpath = conf_dir / store / (name + ".json")
-        url = f"{get_store_url()}/fetch_conf/{store}/{name}"
-        res = s.post(url, json=params)
-        content = b"{}"
-        if res.status_code == 200:
-            content = res.content
-        elif res.status_code == 404:
-            content = b"{}"
-        else:
-            continue
-        with open(fpath, "wb") as wf:
-            wf.write(content)
+    cache_dir = get_cache_dir(kind, conf=conf)
+    if not cache_dir:
+        raise SystemMissingException(
+            msg=f"{kind} directory is missing. Consider running `ov system setup`?"
+        )
+    return cache_dir / store / (name + module_cache_file_exts[kind])
 
 
-@db_func
-def fetch_logo_cache(
-    publish_time: str = "", outer=None, conn=None, cursor=None, conf={}
-):
-    from requests import Session
-    from .ov.account import get_current_id_token
-    from ..system import get_cache_dir
+def fetch_module_cache_file(
+    kind: str, store: str, name: str, params: dict, session, conf={}
+) -> bool:
+    from requests import RequestException
     from .ov import get_store_url
-    from ..exceptions import SystemMissingException
 
-    if not conn or not cursor:
-        return
-    module_stores = get_summary_module_store_list(publish_time=publish_time)
-    if not module_stores:
-        return
-    id_token = get_current_id_token()
-    params = {"idToken": id_token, "publish_time": publish_time}
-    s = Session()
-    s.headers["User-Agent"] = "oakvar"
-    if outer:
-        outer.write("Fetching store cache 4/5...")
-    for module_store in module_stores:
-        name = module_store["name"]
-        store = module_store["store"]
-        logo_dir = get_cache_dir("logo", conf=conf)
-        if not logo_dir:
-            raise SystemMissingException(
-                msg="readme directory is missing. Consider running `ov system setup`?"
-            )
-        fpath = logo_dir / store / (name + ".png")
-        url = f"{get_store_url()}/fetch_logo/{store}/{name}"
-        res = s.post(url, json=params)
-        content = b""
-        if res.status_code == 200:
-            content = res.content
-        elif res.status_code == 404:
-            content = b""
-        else:
-            continue
-        with open(fpath, "wb") as wf:
-            wf.write(content)
+    fpath = get_module_cache_file_path(kind, store, name, conf=conf)
+    url = f"{get_store_url()}/fetch_{kind}/{store}/{name}"
+    try:
+        res = session.post(url, json=params)
+    except RequestException:
+        return False
+    if res.status_code == 200:
+        content = res.content
+    elif res.status_code == 404:
+        content = module_cache_file_empty_contents[kind]
+    else:
+        return False
+    with open(fpath, "wb") as wf:
+        wf.write(content)
+    return True
 
 
-@db_func
-def fetch_readme_cache(
-    publish_time: str = "", outer=None, conn=None, cursor=None, conf={}
+def fetch_module_cache_files(
+    kinds: List[str], publish_time: str = "", outer=None, conf={}
 ):
-    from requests import Session
+    """Fetches the readme, logo and conf files of modules concurrently. Only
+    modules published at or after `publish_time` are fetched. The workers
+    share a pool of HTTP sessions, which are closed when done."""
+    from concurrent.futures import ThreadPoolExecutor
+    from queue import SimpleQueue
     from .ov.account import get_current_id_token
-    from ..system import get_cache_dir
-    from .ov import get_store_url
-    from ..exceptions import SystemMissingException
+    from .consts import STORE_FETCH_WORKERS
 
-    if not conn or not cursor:
-        return
     module_stores = get_summary_module_store_list(publish_time=publish_time)
     if not module_stores:
         return
     id_token = get_current_id_token()
     params = {"idToken": id_token, "publish_time": publish_time}
-    s = Session()
-    s.headers["User-Agent"] = "oakvar"
-    if outer:
-        outer.write("Fetching store cache 3/5...")
-    for module_store in module_stores:
-        name = module_store["name"]
-        store = module_store["store"]
-        readme_dir = get_cache_dir("readme", conf=conf)
-        if not readme_dir:
-            raise SystemMissingException(
-                msg="readme directory is missing. Consider running `ov system setup`?"
-            )
-        fpath = readme_dir / store / name
-        url = f"{get_store_url()}/fetch_readme/{store}/{name}"
-        res = s.post(url, json=params)
-        content = b""
-        if res.status_code == 200:
-            content = res.content
-        elif res.status_code == 404:
-            content = b""
-        else:
-            continue
-        with open(fpath, "wb") as wf:
-            wf.write(content)
+    jobs = [
+        (kind, module_store["store"], module_store["name"])
+        for kind in kinds
+        for module_store in module_stores
+    ]
+    sessions = [make_store_fetch_session() for _ in range(STORE_FETCH_WORKERS)]
+    idle_sessions = SimpleQueue()
+    for session in sessions:
+        idle_sessions.put(session)
+
+    def fetch(job):
+        session = idle_sessions.get()
+        try:
+            return fetch_module_cache_file(*job, params, session, conf=conf)
+        finally:
+            idle_sessions.put(session)
+
+    try:
+        with ThreadPoolExecutor(max_workers=STORE_FETCH_WORKERS) as pool:
+            num_failed = len([ret for ret in pool.map(fetch, jobs) if not ret])
+    finally:
+        for session in sessions:
+            session.close()
+    if num_failed and outer:
+        outer.write(f"Fetching {num_failed} store cache files failed.")
 
 
 @db_func
 def fetch_summary_cache(publish_time: str = "", outer=None, conn=Any, cursor=Any):
-    from requests import Session
     from .ov.account import get_current_id_token
     from ..exceptions import StoreServerError
     from ..exceptions import AuthorizationError
@@ -690,34 +709,29 @@ def fetch_summary_cache(publish_time: str = "", outer=None, conn=Any, cursor=Any
     url = f"{get_store_url()}/fetch_summary"
     id_token = get_current_id_token()
     params = {"idToken": id_token, "publish_time": publish_time}
-    s = Session()
-    s.headers["User-Agent"] = "oakvar"
     if outer:
-        outer.write("Fetching store cache 1/5...")
-    res = s.post(url, json=params)
+        outer.write("Fetching store cache 1/3...")
+    res = get_store_fetch_session().post(url, json=params)
     if res.status_code != 200:
         if res.status_code == 401:
             raise AuthorizationError()
         elif res.status_code == 500:
             raise StoreServerError()
         return False
-    q = "delete from summary"
-    cursor.execute(q)
-    conn.commit()
     res = res.json()
     cols = res["cols"]
-    for row in res["data"]:
+    # Replaces the table in one transaction.
+    with conn:
+        cursor.execute("delete from summary")
         q = (
             f"insert or replace into summary ( {', '.join(cols)} ) "
             + f"values ( {', '.join(['?'] * len(cols))} )"
         )
-        cursor.execute(q, row)
-    conn.commit()
+        cursor.executemany(q, res["data"])
 
 
 @db_func
 def fetch_versions_cache(publish_time: str = "", outer=None, conn=None, cursor=None):
-    from requests import Session
     from json import dumps
     from .ov.account import get_current_id_token
     from ..exceptions import StoreServerError
@@ -731,29 +745,25 @@ def fetch_versions_cache(publish_time: str = "", outer=None, conn=None, cursor=N
     id_token = get_current_id_token()
     cols = dumps(versions_table_cols)
     params = {"idToken": id_token, "publish_time": publish_time, "cols": cols}
-    s = Session()
-    s.headers["User-Agent"] = "oakvar"
     if outer:
-        outer.write("Fetching store cache 2/5...")
-    res = s.post(url, json=params)
+        outer.write("Fetching store cache 2/3...")
+    res = get_store_fetch_session().post(url, json=params)
     if res.status_code != 200:
         if res.status_code == 401:
             raise AuthorizationError()
         elif res.status_code == 500:
             raise StoreServerError(text=res.text)
         return False
-    q = "delete from versions"
-    cursor.execute(q)
-    conn.commit()
     res = res.json()
     cols = res["cols"]
-    for row in res["data"]:
+    # Replaces the table in one transaction.
+    with conn:
+        cursor.execute("delete from versions")
         q = (
             f"insert or replace into versions ( {', '.join(cols)} ) "
             + f"values ( {', '.join(['?'] * len(cols))} )"
         )
-        cursor.execute(q, row)
-    conn.commit()
+        cursor.executemany(q, res["data"])
 
 
 @db_func
@@ -704,6 +704,29 @@ def get_max_num_concurrent_modules_per_job() -> int:
     return value
 
 
+def get_annotation_cache_dir(conf=None) -> Optional[Path]:
+    from .consts import annotation_cache_dir_key
+    from .consts import ANNOTATION_CACHE_DIR_NAME
+
+    d = get_conf_dirvalue(annotation_cache_dir_key, conf=conf)
+    if d:
+        return d
+    root_dir = get_root_dir(conf=conf)
+    if root_dir:
+        return root_dir / ANNOTATION_CACHE_DIR_NAME
+    return None
+
+
+def get_annotation_cache_max_entries() -> int:
+    from .consts import annotation_cache_max_entries_key
+    from .consts import DEFAULT_ANNOTATION_CACHE_MAX_ENTRIES
+
+    value = get_sys_conf_int_value(annotation_cache_max_entries_key)
+    if value is None:
+        value = DEFAULT_ANNOTATION_CACHE_MAX_ENTRIES
+    return value
+
+
 def save_system_conf(conf: Dict):
     from .consts import sys_conf_path_key
     from oyaml import dump
@@ -12,6 +12,7 @@ jobs_dir_name = "jobs"
 log_dir_name = "logs"
 cache_dirs = ["readme", "logo", "conf"]
 LIFTOVER_DIR_NAME = "liftover"
+ANNOTATION_CACHE_DIR_NAME = "annotation_cache"
 
 #
 # file names
@@ -36,6 +37,8 @@ max_num_concurrent_annotators_per_job_key = "max_num_concurrent_annotators_per_j
 max_num_concurrent_modules_per_job_key = "max_num_concurrent_modules_per_job"
 default_assembly_key = "default_assembly"
 report_filter_max_num_cache_per_user_key = "report_filter_max_num_cache_per_user"
+annotation_cache_dir_key = "annotation_cache_dir"
+annotation_cache_max_entries_key = "annotation_cache_max_entries"
 
 #
 # default system conf values
@@ -46,6 +49,7 @@ default_gui_port_ssl = 8443
 default_assembly = "hg38"
 default_postaggregator_names = ["tagsampler", "vcfinfo"]
 DEFAULT_REPORT_FILTER_MAX_NUM_CACHE_PER_USER = 20
+DEFAULT_ANNOTATION_CACHE_MAX_ENTRIES = 10000000
 
 #
 # Server
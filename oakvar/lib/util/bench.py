@@ -0,0 +1,730 @@
+from typing import Optional
+from typing import Any
+from typing import List
+from typing import Dict
+from typing import Callable
+from pathlib import Path
+from ..base.postaggregator import BasePostAggregator
+from ..base.reporter import BaseReporter
+
+BENCH_RESULT_VERSION = 1
+BENCH_RUN_NAME = "bench"
+BENCH_ANNOTATOR_NAME = "benchannot"
+BENCH_POSTAGGREGATOR_NAME = "benchpostagg"
+BENCH_REPORTER_NAME = "benchreporter"
+BENCH_USER = "oakvar_bench"
+DEFAULT_BENCH_SIZES = [10000]
+DEFAULT_BENCH_REPEAT = 3
+DEFAULT_REGRESSION_THRESHOLD = 0.1
+BENCH_SO_TERMS = ["MIS", "SYN", "FSI", "FSD", "STG", "SPL", "INT", "UT3", "UT5"]
+BENCH_SAMPLES = ["s1", "s2", "s3", "s4"]
+BENCH_SO_SUBS = {"MIS": "missense_variant", "SYN": "synonymous_variant"}
+BENCH_FILTER = {
+    "variant": {
+        "operator": "and",
+        "rules": [
+            {
+                "column": f"{BENCH_ANNOTATOR_NAME}__score",
+                "test": "greaterThan",
+                "value": 0.5,
+                "level": "variant",
+            },
+            {
+                "column": "base__so",
+                "test": "select",
+                "value": ["MIS", "FSI", "FSD", "STG"],
+                "level": "variant",
+            },
+        ],
+    }
+}
+BENCH_ANNOTATOR_COLUMNS = [
+    {"name": "uid", "title": "UID", "type": "int"},
+    {"name": "score", "title": "Score", "type": "float"},
+    {"name": "label", "title": "Label", "type": "string", "category": "single"},
+]
+
+
+class BenchContext:
+    """Synthetic run files and the result database of one benchmark size."""
+
+    def __init__(self, work_dir: Path, size: int, seed: int = 0):
+        self.work_dir = work_dir
+        self.size = size
+        self.seed = seed
+        self.run_dir = work_dir / f"n{size}"
+        self.dbpath = self.run_dir / (BENCH_RUN_NAME + ".sqlite")
+        self.all_mappings: List[str] = []
+
+
+class BenchPostAggregator(BasePostAggregator):
+    """Stub postaggregator, which needs no installed module."""
+
+    def get_bench_conf(self) -> Dict[str, Any]:
+        return {
+            "name": BENCH_POSTAGGREGATOR_NAME,
+            "title": "Benchmark PostAggregator",
+            "version": "1.0.0",
+            "level": "variant",
+            "input_columns": ["base__uid", f"{BENCH_ANNOTATOR_NAME}__score"],
+            "output_columns": [
+                {"name": "score2", "title": "Score x2", "type": "float"},
+                {
+                    "name": "tier",
+                    "title": "Tier",
+                    "type": "string",
+                    "category": "single",
+                },
+            ],
+        }
+
+    def make_conf_and_level(self):
+        from ..consts import LEVELS
+
+        self.conf = self.get_bench_conf()
+        self.level = self.conf["level"]
+        self.levelno = LEVELS[self.level]
+
+    def annotate(self, input_data):
+        score = input_data.get(f"{BENCH_ANNOTATOR_NAME}__score")
+        if score is None:
+            return None
+        return {"score2": score * 2, "tier": "high" if score > 0.5 else "low"}
+
+
+class BenchSampler(BenchPostAggregator):
+    """Stub of the tagsampler postaggregator, whose sample columns reporters
+    need."""
+
+    def get_bench_conf(self) -> Dict[str, Any]:
+        return {
+            "name": "tagsampler",
+            "title": "Benchmark Sampler",
+            "version": "1.0.0",
+            "level": "variant",
+            "input_columns": ["base__uid"],
+            "output_columns": [
+                {"name": "numsample", "title": "Sample Count", "type": "int"},
+                {"name": "samples", "title": "Samples", "type": "string"},
+                {"name": "tags", "title": "Tags", "type": "string"},
+            ],
+        }
+
+    def setup(self):
+        self.samples: Dict[int, List[str]] = {}
+        if not self.cursor:
+            return
+        self.cursor.execute("select base__uid, base__sample_id from sample")
+        for uid, sample_id in self.cursor.fetchall():
+            self.samples.setdefault(uid, []).append(sample_id)
+
+    def annotate(self, input_data):
+        samples = self.samples.get(input_data["base__uid"], [])
+        return {"numsample": len(samples), "samples": ";".join(samples), "tags": ""}
+
+
+class BenchReporter(BaseReporter):
+    """Stub reporter writing tab-separated rows. Only write_data is timed."""
+
+    def __init__(self, *args, timer=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timer = timer
+        self.num_rows = 0
+        self.wf = None
+
+    def setup(self):
+        if not self.output_dir:
+            return False
+        self.wf = open(Path(self.output_dir) / (BENCH_RUN_NAME + ".tsv"), "w")
+
+    async def prep(self, user=None):
+        _ = user
+        await super().prep(user=BENCH_USER)
+
+    async def write_data(self, level: str, **kwargs):
+        if self.timer:
+            with self.timer:
+                await super().write_data(level, **kwargs)
+        else:
+            await super().write_data(level, **kwargs)
+
+    def write_table_row(self, row):
+        if not self.wf:
+            return
+        if isinstance(row, dict):
+            row = list(row.values())
+        self.wf.write("\t".join(["" if v is None else str(v) for v in row]) + "\n")
+        self.num_rows += 1
+
+    def end(self):
+        if self.wf:
+            self.wf.close()
+
+
+def make_all_mappings(rng, hugo: str, so: str, exonno: int) -> str:
+    """A JSON all_mappings value of 1 to 4 transcripts of a gene, in the
+    format of mapper output."""
+    from json import dumps
+
+    ts = []
+    for i in range(rng.randint(1, 4)):
+        pos = rng.randint(1, 3000)
+        ts.append(
+            [
+                f"ENSP{rng.randint(0, 99999999):011d}",
+                f"p.Ala{pos // 3 + 1}Val",
+                so if i == 0 else rng.choice(BENCH_SO_TERMS),
+                f"ENST{rng.randint(0, 99999999):011d}.{i + 1}",
+                f"c.{pos}C>T",
+                exonno,
+            ]
+        )
+    return dumps({hugo: ts})
+
+
+def write_synthetic_run(ctx: BenchContext) -> Dict[str, str]:
+    """Writes crv, crx, crg, crs and crm files and the output of a stub
+    annotator for `ctx.size` variants spread over chr1 to chrY in position
+    order. The same seed gives the same files."""
+    from random import Random
+    from os import makedirs
+    from .inout import FileWriter
+    from .util import get_crv_def
+    from .util import get_crx_def
+    from .util import get_crg_def
+    from .util import get_crs_def
+    from .util import get_crm_def
+    from ..consts import crv_idx
+    from ..consts import crx_idx
+    from ..consts import crg_idx
+    from ..consts import crs_idx
+    from ..consts import crm_idx
+    from ..consts import STANDARD_INPUT_FILE_SUFFIX
+    from ..consts import VARIANT_LEVEL_MAPPED_FILE_SUFFIX
+    from ..consts import GENE_LEVEL_MAPPED_FILE_SUFFIX
+    from ..consts import SAMPLE_FILE_SUFFIX
+    from ..consts import MAPPING_FILE_SUFFIX
+    from ..consts import VARIANT_LEVEL_OUTPUT_SUFFIX
+
+    rng = Random(ctx.seed)
+    makedirs(ctx.run_dir, exist_ok=True)
+    prefix = ctx.run_dir / BENCH_RUN_NAME
+    paths = {
+        "crv": str(prefix) + STANDARD_INPUT_FILE_SUFFIX,
+        "crx": str(prefix) + VARIANT_LEVEL_MAPPED_FILE_SUFFIX,
+        "crg": str(prefix) + GENE_LEVEL_MAPPED_FILE_SUFFIX,
+        "crs": str(prefix) + SAMPLE_FILE_SUFFIX,
+        "crm": str(prefix) + MAPPING_FILE_SUFFIX,
+        "var": f"{prefix}.{BENCH_ANNOTATOR_NAME}{VARIANT_LEVEL_OUTPUT_SUFFIX}",
+    }
+    writers = {}
+    for key, col_defs, idx in [
+        ("crv", get_crv_def(), crv_idx),
+        ("crx", get_crx_def(), crx_idx),
+        ("crg", get_crg_def(), crg_idx),
+        ("crs", get_crs_def(), crs_idx),
+        ("crm", get_crm_def(), crm_idx),
+    ]:
+        writer = FileWriter(paths[key])
+        writer.add_columns(col_defs)
+        writer.write_definition()
+        for index_columns in idx:
+            writer.add_index(index_columns)
+        writers[key] = writer
+    writers["crx"].write_meta_line("title", "Benchmark Mapper")
+    writers["crx"].write_meta_line("version", "1.0.0")
+    writers["crx"].write_meta_line("modulename", "benchmapper")
+    writers["crm"].write_input_paths({"0": "bench.vcf"})
+    writer = FileWriter(paths["var"])
+    writer.write_names(BENCH_ANNOTATOR_NAME, "Benchmark Annotator", "1.0.0")
+    writer.add_columns([dict(v) for v in BENCH_ANNOTATOR_COLUMNS])
+    writer.write_definition()
+    writers["var"] = writer
+    chroms = [f"chr{v}" for v in list(range(1, 23)) + ["X", "Y"]]
+    num_genes = max(ctx.size // 10, 1)
+    per_chrom = -(-ctx.size // len(chroms))
+    ctx.all_mappings = []
+    for gene_no in range(num_genes):
+        writers["crg"].write_data({"hugo": f"GENE{gene_no}", "note": ""})
+    pos = 0
+    for i in range(ctx.size):
+        uid = i + 1
+        if i % per_chrom == 0:
+            pos = 10000
+        chrom = chroms[i // per_chrom]
+        pos += rng.randint(1, 2000)
+        ref = rng.choice("ACGT")
+        alt = rng.choice([v for v in "ACGT" if v != ref])
+        hugo = f"GENE{i * num_genes // ctx.size}"
+        so = rng.choice(BENCH_SO_TERMS)
+        exonno = rng.randint(1, 20)
+        all_mappings = make_all_mappings(rng, hugo, so, exonno)
+        ctx.all_mappings.append(all_mappings)
+        crv = {
+            "uid": uid,
+            "chrom": chrom,
+            "pos": pos,
+            "pos_end": pos,
+            "ref_base": ref,
+            "alt_base": alt,
+            "tags": "",
+        }
+        writers["crv"].write_data(crv)
+        crx = dict(crv)
+        crx.update(
+            {
+                "coding": "Y" if so in ["MIS", "SYN", "FSI", "FSD", "STG"] else "",
+                "hugo": hugo,
+                "transcript": f"ENST{uid:011d}.1",
+                "so": so,
+                "cchange": f"c.{uid % 3000 + 1}{ref}>{alt}",
+                "achange": f"p.Ala{uid % 1000 + 1}Val",
+                "exonno": exonno,
+                "all_mappings": all_mappings,
+            }
+        )
+        writers["crx"].write_data(crx)
+        for sample_id in rng.sample(BENCH_SAMPLES, rng.randint(1, 2)):
+            writers["crs"].write_data({"uid": uid, "sample_id": sample_id})
+        writers["crm"].write_data(
+            {"original_line": uid, "tags": "", "uid": uid, "fileno": 0}
+        )
+        score = rng.random()
+        writers["var"].write_data(
+            {
+                "uid": uid,
+                "score": round(score, 4),
+                "label": "damaging" if score > 0.5 else "benign",
+            }
+        )
+    for writer in writers.values():
+        writer.close()
+    return paths
+
+
+def write_bench_info_table(ctx: BenchContext):
+    import sqlite3
+    from json import dumps
+    from datetime import datetime
+    from .admin_util import oakvar_version
+
+    conn = sqlite3.connect(str(ctx.dbpath))
+    c = conn.cursor()
+    c.execute("drop table if exists info")
+    c.execute("create table info (colkey text primary key, colval text)")
+    c.execute("select count(*) from variant")
+    num_variants = c.fetchone()[0]
+    rows = {
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "inputs": dumps(["bench.vcf"]),
+        "genome_assemblies": dumps(["hg38"]),
+        "num_variants": str(num_variants),
+        "oakvar": oakvar_version(),
+        "mapper": "benchmapper==1.0.0",
+        "input_paths": dumps({"0": "bench.vcf"}),
+        "primary_transcript": "mane",
+        "job_name": BENCH_RUN_NAME,
+        "converter_format": dumps(["vcf"]),
+        "annotators": dumps([f"{BENCH_ANNOTATOR_NAME}==1.0.0"]),
+    }
+    c.executemany("insert into info values (?, ?)", list(rows.items()))
+    conn.commit()
+    c.close()
+    conn.close()
+
+
+def aggregate(ctx: BenchContext):
+    from ..base.aggregator import Aggregator
+
+    for level in ["variant", "gene", "sample", "mapping"]:
+        Aggregator(
+            input_dir=str(ctx.run_dir),
+            level=level,
+            run_name=BENCH_RUN_NAME,
+            delete=level == "variant",
+        ).run()
+
+
+def finish_result_db(ctx: BenchContext):
+    """Adds what the rest of a run would add to an aggregated result
+    database."""
+    write_bench_info_table(ctx)
+    BenchSampler(
+        module_name="tagsampler", run_name=BENCH_RUN_NAME, output_dir=str(ctx.run_dir)
+    ).run()
+
+
+def get_bench_filter_db_path() -> Path:
+    from ..base.report_filter import ReportFilter
+
+    return ReportFilter(user=BENCH_USER).get_report_filter_db_path()
+
+
+def remove_bench_filter_db():
+    from ..exceptions import SystemMissingException
+
+    try:
+        path = get_bench_filter_db_path()
+    except SystemMissingException:
+        return
+    if path.exists():
+        path.unlink()
+
+
+def bench_all_mappings(ctx: BenchContext, timer) -> int:
+    """Parsing all_mappings values with a cold parser cache, in the stages
+    which parse them: the mapper, annotator input and reporter."""
+    from .inout import get_all_mappings_parser
+    from .inout import parse_tchange
+    from .inout import parse_achange
+    from .inout import _all_mappings_data
+
+    _all_mappings_data.clear()
+    parse_tchange.cache_clear()
+    parse_achange.cache_clear()
+    with timer:
+        for s in ctx.all_mappings:
+            get_all_mappings_parser(s).get_genes()
+        for s in ctx.all_mappings:
+            get_all_mappings_parser(s).get_uniq_sos()
+        for s in ctx.all_mappings:
+            parser = get_all_mappings_parser(s).substitute_sos(BENCH_SO_SUBS)
+            get_all_mappings_parser(parser.to_json()).get_report_string()
+    return len(ctx.all_mappings)
+
+
+def bench_file_writer(ctx: BenchContext, timer) -> int:
+    from .inout import FileReader
+    from .inout import FileWriter
+    from .util import get_crx_def
+
+    rows = [rd for _, _, rd in FileReader(str(ctx.run_dir / "bench.crx")).loop_data()]
+    with timer:
+        writer = FileWriter(ctx.work_dir / "bench_writer.crx")
+        writer.add_columns(get_crx_def())
+        writer.write_definition()
+        for row in rows:
+            writer.write_data(row)
+        writer.close()
+    return len(rows)
+
+
+def bench_file_reader(ctx: BenchContext, timer) -> int:
+    from .inout import FileReader
+
+    n = 0
+    with timer:
+        reader = FileReader(str(ctx.run_dir / "bench.crx"))
+        for _ in reader.loop_data():
+            n += 1
+    return n
+
+
+def bench_aggregator(ctx: BenchContext, timer) -> int:
+    with timer:
+        aggregate(ctx)
+    finish_result_db(ctx)
+    return ctx.size
+
+
+def bench_postaggregator(ctx: BenchContext, timer) -> int:
+    post_agg = BenchPostAggregator(
+        module_name=BENCH_POSTAGGREGATOR_NAME,
+        run_name=BENCH_RUN_NAME,
+        output_dir=str(ctx.run_dir),
+    )
+    with timer:
+        post_agg.run()
+    return post_agg.num_input_rows
+
+
+async def bench_report_filter(ctx: BenchContext, timer) -> int:
+    from ..base.report_filter import ReportFilter
+
+    remove_bench_filter_db()
+    cf = None
+    try:
+        cf = await ReportFilter.create(
+            dbpath=str(ctx.dbpath), filter=BENCH_FILTER, user=BENCH_USER, strict=False
+        )
+        with timer:
+            await cf.make_ftables()
+    finally:
+        if cf:
+            await cf.close_db()
+    return ctx.size
+
+
+async def bench_reporter(ctx: BenchContext, timer, columnar: bool = False) -> int:
+    reporter = BenchReporter(
+        dbpath=str(ctx.dbpath),
+        module_name=BENCH_REPORTER_NAME,
+        output_dir=str(ctx.run_dir),
+        run_name=BENCH_RUN_NAME,
+        timer=timer,
+    )
+    reporter.columnar = columnar
+    await reporter.run(tab="variant")
+    return reporter.num_rows
+
+
+async def bench_reporter_columnar(ctx: BenchContext, timer) -> int:
+    return await bench_reporter(ctx, timer, columnar=True)
+
+
+def bench_mergesqlite(ctx: BenchContext, timer) -> int:
+    """Merges two halves of the result database, as in gathering shards."""
+    import sqlite3
+    from shutil import copyfile
+    from contextlib import redirect_stdout
+    from io import StringIO
+    from ...api.util import mergesqlite
+
+    half = ctx.size // 2
+    dbpaths = []
+    for i, cond in enumerate([f"base__uid > {half}", f"base__uid <= {half}"]):
+        dbpath = str(ctx.run_dir / f"{BENCH_RUN_NAME}.half{i}.sqlite")
+        copyfile(ctx.dbpath, dbpath)
+        conn = sqlite3.connect(dbpath)
+        for table in ["variant", "sample", "mapping"]:
+            conn.execute(f"delete from {table} where {cond}")
+        conn.commit()
+        conn.close()
+        dbpaths.append(dbpath)
+    outpath = str(ctx.run_dir / f"{BENCH_RUN_NAME}.merged.sqlite")
+    with timer:
+        with redirect_stdout(StringIO()):
+            mergesqlite(dbpaths=dbpaths, outpath=outpath)
+    for path in dbpaths + [outpath]:
+        Path(path).unlink()
+    return ctx.size
+
+
+def get_liftover_input(ctx: BenchContext):
+    """Chromosomes and positions of the synthetic variants, taken as hg19
+    positions. Each position is repeated for 1 to 3 alternate alleles, as
+    converters write a row for each alternate allele."""
+    from random import Random
+    from .inout import FileReader
+
+    rng = Random(ctx.seed)
+    chroms = []
+    poss = []
+    for _, _, rd in FileReader(str(ctx.run_dir / "bench.crv")).loop_data():
+        for _ in range(rng.randint(1, 3)):
+            chroms.append(rd["chrom"])
+            poss.append(rd["pos"])
+    return chroms, poss
+
+
+def bench_liftover(ctx: BenchContext, timer, per_variant: bool = False) -> int:
+    """Lifts over the synthetic variants from hg19 in one batch, or one
+    variant at a time with `per_variant`. The hg19 chain file is downloaded
+    to the liftover directory if it is not there."""
+    from .seq import get_lifter
+    from .seq import liftover_one_pos
+    from .seq import liftover_one_pos_many
+    from ..exceptions import SystemMissingException
+
+    chroms, poss = get_liftover_input(ctx)
+    lifter = get_lifter("hg19")
+    if not lifter:
+        raise SystemMissingException(msg="the liftover directory is not set up")
+    with timer:
+        if per_variant:
+            for chrom, pos in zip(chroms, poss):
+                liftover_one_pos(chrom, pos, lifter=lifter)
+        else:
+            liftover_one_pos_many(chroms, poss, lifter=lifter)
+    return len(chroms)
+
+
+def bench_liftover_per_variant(ctx: BenchContext, timer) -> int:
+    return bench_liftover(ctx, timer, per_variant=True)
+
+
+# In run order. The aggregator makes the result database which the later
+# benchmarks use.
+BENCHMARKS: Dict[str, Callable] = {
+    "all_mappings": bench_all_mappings,
+    "file_writer": bench_file_writer,
+    "file_reader": bench_file_reader,
+    "aggregator": bench_aggregator,
+    "postaggregator": bench_postaggregator,
+    "report_filter": bench_report_filter,
+    "reporter": bench_reporter,
+    "reporter_columnar": bench_reporter_columnar,
+    "mergesqlite": bench_mergesqlite,
+    "liftover": bench_liftover,
+    "liftover_per_variant": bench_liftover_per_variant,
+}
+# Benchmarks which use the report filter database, module lookups or the
+# liftover directory
+SYSTEM_BENCHMARKS = [
+    "report_filter",
+    "reporter",
+    "reporter_columnar",
+    "liftover",
+    "liftover_per_variant",
+]
+
+
+def run_benchmark(ctx: BenchContext, name: str, repeat: int) -> Dict[str, Any]:
+    """Runs a benchmark `repeat` times and returns the record of the fastest
+    run with the wall times of all runs. A failed benchmark is returned with
+    its error so that the rest of the suite can go on."""
+    from inspect import iscoroutinefunction
+    from .metrics import Measure
+    from .metrics import make_record
+    from .asyn import get_event_loop
+
+    func = BENCHMARKS[name]
+    records = []
+    for _ in range(max(repeat, 1)):
+        record = make_record("bench", module=name, worker=str(ctx.size))
+        timer = Measure(record, children=False)
+        try:
+            if iscoroutinefunction(func):
+                rows = get_event_loop().run_until_complete(func(ctx, timer))
+            else:
+                rows = func(ctx, timer)
+        except Exception as e:
+            return {"benchmark": name, "size": ctx.size, "error": repr(e)}
+        record["rows_in"] = rows
+        if rows and record["wall_time"]:
+            record["rows_per_sec"] = round(rows / record["wall_time"], 1)
+        records.append(record)
+    best = dict(min(records, key=lambda v: v["wall_time"]))
+    ret = {
+        "benchmark": name,
+        "size": ctx.size,
+        "rows": best["rows_in"],
+        "wall_time": best["wall_time"],
+        "cpu_time": best["cpu_time"],
+        "peak_rss_mb": best["peak_rss_mb"],
+        "rows_per_sec": best["rows_per_sec"],
+        "wall_times": [v["wall_time"] for v in records],
+    }
+    return ret
+
+
+def check_bench_system(names: List[str]):
+    """Raises SystemMissingException if a benchmark of `names` needs the
+    OakVar system and it is not set up."""
+    from ..system import get_conf_dir
+    from ..system import get_modules_dir
+    from ..exceptions import SystemMissingException
+
+    needs_system = [v for v in names if v in SYSTEM_BENCHMARKS]
+    if not needs_system:
+        return
+    conf_dir = get_conf_dir()
+    modules_dir = get_modules_dir()
+    if conf_dir and conf_dir.exists() and modules_dir and modules_dir.exists():
+        return
+    raise SystemMissingException(
+        msg="the conf and modules directories are needed by "
+        + ", ".join(needs_system)
+    )
+
+
+def run_benchmarks(
+    sizes: List[int] = DEFAULT_BENCH_SIZES,
+    benchmarks: Optional[List[str]] = None,
+    repeat: int = DEFAULT_BENCH_REPEAT,
+    rundir: Optional[str] = None,
+    keep: bool = False,
+    seed: int = 0,
+    outer=None,
+) -> Dict[str, Any]:
+    """Generates synthetic runs of `sizes` variants and runs the benchmarks
+    on them. No installed module or network access is needed, but the
+    benchmarks of SYSTEM_BENCHMARKS need `ov system setup`."""
+    from sys import version
+    from platform import platform
+    from shutil import rmtree
+    from tempfile import mkdtemp
+    from datetime import datetime
+    from .admin_util import oakvar_version
+    from ..exceptions import ArgumentError
+
+    names = benchmarks or list(BENCHMARKS.keys())
+    unknown = [v for v in names if v not in BENCHMARKS]
+    if unknown:
+        raise ArgumentError(
+            msg=f"Unknown benchmarks: {', '.join(unknown)}. "
+            + f"Choose from {', '.join(BENCHMARKS.keys())}."
+        )
+    names = [v for v in BENCHMARKS if v in names]
+    check_bench_system(names)
+    if rundir:
+        work_dir = Path(rundir).absolute()
+        work_dir.mkdir(parents=True, exist_ok=True)
+    else:
+        work_dir = Path(mkdtemp(prefix="ov_bench_"))
+    results = []
+    try:
+        for size in sizes:
+            ctx = BenchContext(work_dir, size, seed=seed)
+            if outer:
+                outer.write(f"generating {size} synthetic variants in {ctx.run_dir}")
+            write_synthetic_run(ctx)
+            if "aggregator" not in names:
+                aggregate(ctx)
+                finish_result_db(ctx)
+            for name in names:
+                result = run_benchmark(ctx, name, repeat)
+                results.append(result)
+                if outer and "error" in result:
+                    outer.write(f"{name} n={size}: failed ({result['error']})")
+                elif outer:
+                    outer.write(
+                        f"{name} n={size}: {result['wall_time']}s "
+                        + f"({result['rows_per_sec']} rows/s)"
+                    )
+    finally:
+        remove_bench_filter_db()
+        if not keep and not rundir:
+            rmtree(work_dir, ignore_errors=True)
+    return {
+        "version": BENCH_RESULT_VERSION,
+        "oakvar": oakvar_version(),
+        "python": version.split()[0],
+        "platform": platform(),
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "sizes": sizes,
+        "repeat": repeat,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare_bench_results(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """Compares the wall times of benchmarks run at the same sizes. A
+    benchmark slower than the baseline by more than `threshold` (a fraction)
+    is marked as a regression."""
+    baseline_times = {
+        (v["benchmark"], v["size"]): v.get("wall_time")
+        for v in baseline["results"]
+    }
+    comparisons = []
+    for v in results["results"]:
+        base_time = baseline_times.get((v["benchmark"], v["size"]))
+        if not base_time or not v.get("wall_time"):
+            continue
+        ratio = round(v["wall_time"] / base_time, 3)
+        comparisons.append(
+            {
+                "benchmark": v["benchmark"],
+                "size": v["size"],
+                "baseline": base_time,
+                "current": v["wall_time"],
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold,
+            }
+        )
+    return comparisons
@@ -0,0 +1,317 @@
+from typing import Optional
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Union
+
+BGZF_MAX_BLOCK_DATA_SIZE = 0xFF00
+BGZF_HEADER = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"
+BGZF_EOF_BLOCK = (
+    b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00\x1b\x00"
+    + b"\x03\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+)
+TABIX_LINEAR_SHIFT = 14
+
+
+def is_gzip(path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(2) == b"\x1f\x8b"
+
+
+def is_bgzf(path) -> bool:
+    """Checks if the first block of `path` is a BGZF block, a gzip member with
+    a BC extra subfield."""
+    from struct import unpack
+
+    with open(path, "rb") as f:
+        header = f.read(18)
+    if len(header) < 18 or header[:4] != b"\x1f\x8b\x08\x04":
+        return False
+    xlen = unpack("<H", header[10:12])[0]
+    return xlen >= 6 and header[12:14] == b"BC"
+
+
+def make_virtual_offset(coffset: int, uoffset: int) -> int:
+    return (coffset << 16) | uoffset
+
+
+def split_virtual_offset(voffset: int) -> Tuple[int, int]:
+    return voffset >> 16, voffset & 0xFFFF
+
+
+def read_block_header(f) -> Optional[Tuple[int, int]]:
+    """Reads the header of the BGZF block at the current position of `f` and
+    returns the block size and the uncompressed size, leaving `f` at the
+    start of the next block."""
+    from struct import unpack
+    from ..exceptions import BadFormatError
+
+    start = f.tell()
+    header = f.read(12)
+    if not header:
+        return None
+    if len(header) < 12 or header[:4] != b"\x1f\x8b\x08\x04":
+        raise BadFormatError(f"Not a BGZF block at {start}")
+    xlen = unpack("<H", header[10:12])[0]
+    extra = f.read(xlen)
+    bsize = None
+    i = 0
+    while i + 4 <= xlen:
+        slen = unpack("<H", extra[i + 2 : i + 4])[0]
+        if extra[i : i + 2] == b"BC" and slen == 2:
+            bsize = unpack("<H", extra[i + 4 : i + 6])[0] + 1
+        i += 4 + slen
+    if bsize is None:
+        raise BadFormatError(f"Not a BGZF block at {start}")
+    f.seek(start + bsize - 4)
+    isize = unpack("<I", f.read(4))[0]
+    return bsize, isize
+
+
+def iter_block_offsets(path):
+    """Yields (compressed offset, block size, uncompressed size) of the blocks
+    of a BGZF file without decompressing them."""
+    with open(path, "rb") as f:
+        while True:
+            coffset = f.tell()
+            ret = read_block_header(f)
+            if ret is None:
+                break
+            bsize, isize = ret
+            yield coffset, bsize, isize
+
+
+class BgzfReader:
+    """Binary reader of a BGZF file. tell() and seek() use virtual offsets,
+    (compressed offset of a block << 16) | offset in the uncompressed block,
+    so that a reader can start at any block of the file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        self.coffset = 0
+        self.next_coffset = 0
+        self.data = b""
+        self.pos = 0
+        self.load_block(0)
+
+    def load_block(self, coffset: int):
+        from zlib import decompress
+
+        self.f.seek(coffset)
+        ret = read_block_header(self.f)
+        self.coffset = coffset
+        self.pos = 0
+        if ret is None:
+            self.data = b""
+            self.next_coffset = coffset
+            return
+        bsize, _ = ret
+        self.f.seek(coffset)
+        block = self.f.read(bsize)
+        xlen = block[10] | (block[11] << 8)
+        self.data = decompress(block[12 + xlen : -8], -15)
+        self.next_coffset = coffset + bsize
+
+    def next_block(self) -> bool:
+        if self.next_coffset == self.coffset:
+            return False
+        self.load_block(self.next_coffset)
+        return True
+
+    def tell(self) -> int:
+        if self.pos == len(self.data) and self.data:
+            return make_virtual_offset(self.next_coffset, 0)
+        return make_virtual_offset(self.coffset, self.pos)
+
+    def seek(self, voffset: int):
+        coffset, uoffset = split_virtual_offset(voffset)
+        if coffset != self.coffset or not self.data:
+            self.load_block(coffset)
+        self.pos = uoffset
+
+    def read(self, size: int = -1) -> bytes:
+        chunks = []
+        while size < 0 or size > 0:
+            if self.pos >= len(self.data):
+                if not self.next_block():
+                    break
+                continue
+            end = len(self.data)
+            if size > 0:
+                end = min(end, self.pos + size)
+            chunks.append(self.data[self.pos : end])
+            if size > 0:
+                size -= end - self.pos
+            self.pos = end
+        return b"".join(chunks)
+
+    def readline(self) -> bytes:
+        chunks = []
+        while True:
+            if self.pos >= len(self.data):
+                if not self.next_block():
+                    break
+                continue
+            idx = self.data.find(b"\n", self.pos)
+            if idx == -1:
+                chunks.append(self.data[self.pos :])
+                self.pos = len(self.data)
+                continue
+            chunks.append(self.data[self.pos : idx + 1])
+            self.pos = idx + 1
+            break
+        return b"".join(chunks)
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                break
+            yield line
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class BgzfWriter:
+    """Writes text or bytes as BGZF blocks. tell() returns the virtual offset
+    of the next byte to be written."""
+
+    def __init__(self, path, compresslevel: int = 6, encoding: str = "utf-8"):
+        self.path = path
+        self.f = open(path, "wb")
+        self.compresslevel = compresslevel
+        self.encoding = encoding
+        self.buf = bytearray()
+
+    def write(self, data: Union[str, bytes]):
+        if isinstance(data, str):
+            data = data.encode(self.encoding)
+        self.buf += data
+        while len(self.buf) >= BGZF_MAX_BLOCK_DATA_SIZE:
+            self.write_block(bytes(self.buf[:BGZF_MAX_BLOCK_DATA_SIZE]))
+            del self.buf[:BGZF_MAX_BLOCK_DATA_SIZE]
+        return len(data)
+
+    def write_block(self, data: bytes):
+        from struct import pack
+        from zlib import compressobj
+        from zlib import crc32
+        from zlib import DEFLATED
+
+        c = compressobj(self.compresslevel, DEFLATED, -15)
+        cdata = c.compress(data) + c.flush()
+        bsize = len(BGZF_HEADER) + 2 + len(cdata) + 8
+        self.f.write(BGZF_HEADER)
+        self.f.write(pack("<H", bsize - 1))
+        self.f.write(cdata)
+        self.f.write(pack("<II", crc32(data), len(data)))
+
+    def tell(self) -> int:
+        return make_virtual_offset(self.f.tell(), len(self.buf))
+
+    def flush(self):
+        if self.buf:
+            self.write_block(bytes(self.buf))
+            self.buf = bytearray()
+
+    def close(self):
+        self.flush()
+        self.f.write(BGZF_EOF_BLOCK)
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def reg2bin(beg: int, end: int) -> int:
+    end -= 1
+    if beg >> 14 == end >> 14:
+        return ((1 << 15) - 1) // 7 + (beg >> 14)
+    if beg >> 17 == end >> 17:
+        return ((1 << 12) - 1) // 7 + (beg >> 17)
+    if beg >> 20 == end >> 20:
+        return ((1 << 9) - 1) // 7 + (beg >> 20)
+    if beg >> 23 == end >> 23:
+        return ((1 << 6) - 1) // 7 + (beg >> 23)
+    if beg >> 26 == end >> 26:
+        return ((1 << 3) - 1) // 7 + (beg >> 26)
+    return 0
+
+
+def write_tabix_index(path, index_path=None) -> str:
+    """Writes a tabix (.tbi) index of a coordinate-sorted BGZF VCF file and
+    returns its path."""
+    from struct import pack
+    from ..exceptions import BadFormatError
+
+    path = str(path)
+    index_path = index_path or path + ".tbi"
+    names: List[str] = []
+    bins: Dict[str, Dict[int, List[List[int]]]] = {}
+    linear: Dict[str, List[int]] = {}
+    last: Tuple[str, int] = ("", -1)
+    with BgzfReader(path) as f:
+        while True:
+            start = f.tell()
+            line = f.readline()
+            if not line:
+                break
+            if line.startswith(b"#") or not line.strip():
+                continue
+            end = f.tell()
+            toks = line.split(b"\t", 4)
+            chrom = toks[0].decode()
+            beg = int(toks[1]) - 1
+            rend = beg + max(len(toks[3]), 1)
+            if chrom not in bins:
+                names.append(chrom)
+                bins[chrom] = {}
+                linear[chrom] = []
+            elif chrom != last[0]:
+                raise BadFormatError(f"{path} is not sorted by chromosome ({chrom})")
+            elif beg < last[1]:
+                raise BadFormatError(f"{path} is not sorted by position ({chrom})")
+            last = (chrom, beg)
+            chunks = bins[chrom].setdefault(reg2bin(beg, rend), [])
+            if chunks and chunks[-1][1] == start:
+                chunks[-1][1] = end
+            else:
+                chunks.append([start, end])
+            ioffs = linear[chrom]
+            first_w = beg >> TABIX_LINEAR_SHIFT
+            last_w = (rend - 1) >> TABIX_LINEAR_SHIFT
+            for w in range(first_w, last_w + 1):
+                if w >= len(ioffs):
+                    ioffs.extend([-1] * (w + 1 - len(ioffs)))
+                if ioffs[w] == -1:
+                    ioffs[w] = start
+    names_b = b"".join([name.encode() + b"\x00" for name in names])
+    out = [b"TBI\x01", pack("<iiiiiii", len(names), 2, 1, 2, 0, ord("#"), 0)]
+    out.append(pack("<i", len(names_b)) + names_b)
+    for name in names:
+        out.append(pack("<i", len(bins[name])))
+        for bin_no in sorted(bins[name]):
+            chunks = bins[name][bin_no]
+            out.append(pack("<Ii", bin_no, len(chunks)))
+            out.append(b"".join([pack("<QQ", b, e) for b, e in chunks]))
+        ioffs = linear[name]
+        prev = 0
+        for i, v in enumerate(ioffs):
+            if v == -1:
+                ioffs[i] = prev
+            prev = ioffs[i]
+        out.append(pack("<i", len(ioffs)) + b"".join([pack("<Q", v) for v in ioffs]))
+    with BgzfWriter(index_path) as wf:
+        wf.write(b"".join(out))
+    return index_path
@@ -0,0 +1,155 @@
+from typing import Optional
+from typing import Any
+from typing import List
+from typing import Dict
+from pathlib import Path
+
+CHECKPOINT_FILE_SUFFIX = ".checkpoint.json"
+CHECKPOINT_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def get_file_hash(path) -> str:
+    from hashlib import blake2b
+
+    h = blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def get_file_entry(path) -> Dict[str, Any]:
+    return {"size": Path(path).stat().st_size, "hash": get_file_hash(path)}
+
+
+def get_key(*parts) -> str:
+    """Key of a piece of work from what determines its outputs, such as the
+    key of the work before it, module versions and options."""
+    from json import dumps
+    from hashlib import blake2b
+
+    s = dumps(parts, sort_keys=True, default=str)
+    return blake2b(s.encode(), digest_size=16).hexdigest()
+
+
+def get_module_fingerprint(module) -> Optional[Dict[str, Any]]:
+    """Name, version and script hash of a module, so that a changed module
+    invalidates its outputs even without a version change."""
+    if module is None:
+        return None
+    script_path = getattr(module, "script_path", None)
+    script_hash = None
+    if script_path and Path(script_path).exists():
+        script_hash = get_file_hash(script_path)
+    return {
+        "name": module.name,
+        "version": getattr(module, "version", None),
+        "script": script_hash,
+    }
+
+
+class RunCheckpoint:
+    """Checkpoints of the stages and modules of a run.
+
+    Each checkpoint has a key of what produced the work, the sizes and hashes
+    of its output files and any state which later stages need. Work is done
+    if its checkpoint has the same key and its outputs are unchanged. The
+    checkpoints are kept in `<run_name>.checkpoint.json` in the output
+    directory."""
+
+    def __init__(self, output_dir: str, run_name: str, logger=None):
+        self.path = Path(output_dir) / (run_name + CHECKPOINT_FILE_SUFFIX)
+        self.logger = logger
+        self.checkpoints: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def load(self):
+        from json import load
+
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                data = load(f)
+        except ValueError:
+            if self.logger:
+                self.logger.warning(f"ignoring a corrupt checkpoint file {self.path}")
+            return
+        if data.get("version") == CHECKPOINT_VERSION:
+            self.checkpoints = data.get("checkpoints", {})
+
+    def save(self):
+        """Writes the checkpoints to a temporary file first so that a crash
+        does not leave a partial checkpoint file."""
+        from json import dump
+        from os import replace
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as wf:
+            dump(
+                {"version": CHECKPOINT_VERSION, "checkpoints": self.checkpoints},
+                wf,
+                indent=2,
+            )
+        replace(tmp_path, self.path)
+
+    def is_done(self, name: str, key: str) -> bool:
+        checkpoint = self.checkpoints.get(name)
+        if not checkpoint or checkpoint.get("key") != key:
+            return False
+        for path, entry in checkpoint["outputs"].items():
+            if not Path(path).exists():
+                return False
+            if Path(path).stat().st_size != entry["size"]:
+                return False
+            if get_file_hash(path) != entry["hash"]:
+                return False
+        if self.logger:
+            self.logger.info(f"resuming: {name} is done")
+        return True
+
+    def get_state(self, name: str) -> Dict[str, Any]:
+        checkpoint = self.checkpoints.get(name) or {}
+        return checkpoint.get("state") or {}
+
+    def record(
+        self,
+        name: str,
+        key: str,
+        outputs: List[str],
+        state: Optional[Dict[str, Any]] = None,
+    ):
+        from datetime import datetime
+
+        self.checkpoints[name] = {
+            "key": key,
+            "outputs": {
+                str(path): get_file_entry(path)
+                for path in outputs
+                if Path(path).is_file()
+            },
+            "state": state or {},
+            "finished_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self.save()
+
+    def refresh(self, name: str):
+        """Updates the output hashes of a checkpoint after its outputs were
+        changed in a way which does not invalidate the work, such as a
+        metrics table added to a result database."""
+        checkpoint = self.checkpoints.get(name)
+        if not checkpoint:
+            return
+        for path in list(checkpoint["outputs"].keys()):
+            if Path(path).is_file():
+                checkpoint["outputs"][path] = get_file_entry(path)
+        self.save()
+
+    def remove(self, names: List[str]):
+        for name in names:
+            self.checkpoints.pop(name, None)
+        self.save()
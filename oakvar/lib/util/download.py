@@ -1,6 +1,11 @@
 from typing import Optional
 from typing import Tuple
+from typing import List
 from pathlib import Path
+from io import RawIOBase
+from io import SEEK_SET
+from io import SEEK_CUR
+from io import SEEK_END
 
 
 def download(
@@ -184,3 +189,82 @@ def is_zip_path(url):
 
     p = Path(url)
     return p.exists() and p.suffix == ".zip"
+
+
+class SplitPartsReader(RawIOBase):
+    """Seekable read-only view over the parts of a split file.
+
+    Parts are opened lazily, so a zip archive split into parts can be read
+    (e.g. its central directory in the last part) before all the parts have
+    been downloaded, as long as the bytes actually read are present.
+    """
+
+    def __init__(self, part_paths: List[str], part_sizes: List[int]):
+        super().__init__()
+        self.part_paths = part_paths
+        self.part_sizes = part_sizes
+        self.part_starts: List[int] = []
+        start = 0
+        for size in part_sizes:
+            self.part_starts.append(start)
+            start += size
+        self.size = start
+        self.pos = 0
+        self.fds = {}
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=SEEK_SET):
+        if whence == SEEK_SET:
+            self.pos = offset
+        elif whence == SEEK_CUR:
+            self.pos += offset
+        elif whence == SEEK_END:
+            self.pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        return self.pos
+
+    def get_part_index(self, pos: int) -> int:
+        from bisect import bisect_right
+
+        return bisect_right(self.part_starts, pos) - 1
+
+    def get_part_fd(self, part_index: int):
+        fd = self.fds.get(part_index)
+        if fd is None:
+            fd = open(self.part_paths[part_index], "rb")
+            self.fds[part_index] = fd
+        return fd
+
+    def readinto(self, b):
+        view = memoryview(b).cast("B")
+        num_read = 0
+        while num_read < len(view) and self.pos < self.size:
+            part_index = self.get_part_index(self.pos)
+            part_offset = self.pos - self.part_starts[part_index]
+            fd = self.get_part_fd(part_index)
+            fd.seek(part_offset)
+            to_read = min(
+                len(view) - num_read, self.part_sizes[part_index] - part_offset
+            )
+            chunk = fd.read(to_read)
+            if not chunk:
+                break
+            view[num_read : num_read + len(chunk)] = chunk
+            num_read += len(chunk)
+            self.pos += len(chunk)
+        return num_read
+
+    def close(self):
+        for fd in self.fds.values():
+            fd.close()
+        self.fds = {}
+        super().close()
@@ -14,10 +14,84 @@ import ftplib
 from functools import partial
 from tqdm import tqdm
 
+from threading import Lock
+from threading import Semaphore
+from threading import local
+from contextlib import contextmanager
+
 ALLOWED_KINDS = ["file", "tar", "zip", "tar.gz"]
 ZIP_KINDS = ["tar", "zip", "tar.gz"]
 
 
+class DownloadLimiter:
+    """Limits the number and the total bandwidth of HTTP downloads shared by
+    all the threads of a process."""
+
+    def __init__(self):
+        self.semaphore: Optional[Semaphore] = None
+        self.max_bytes_per_sec: Optional[int] = None
+        self.lock = Lock()
+        self.next_time = 0.0
+
+    def set_limits(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_bytes_per_sec: Optional[int] = None,
+    ):
+        self.semaphore = Semaphore(max_concurrent) if max_concurrent else None
+        self.max_bytes_per_sec = max_bytes_per_sec or None
+
+    @contextmanager
+    def slot(self):
+        semaphore = self.semaphore
+        if semaphore:
+            semaphore.acquire()
+        try:
+            yield
+        finally:
+            if semaphore:
+                semaphore.release()
+
+    def throttle(self, num_bytes: int):
+        from time import time
+        from time import sleep
+
+        if not self.max_bytes_per_sec:
+            return
+        with self.lock:
+            now = time()
+            self.next_time = (
+                max(self.next_time, now) + num_bytes / self.max_bytes_per_sec
+            )
+            delay = self.next_time - now
+        if delay > 0:
+            sleep(delay)
+
+
+download_limiter = DownloadLimiter()
+http_sessions = local()
+
+
+def set_download_limits(
+    max_concurrent: Optional[int] = None, max_bytes_per_sec: Optional[int] = None
+):
+    download_limiter.set_limits(
+        max_concurrent=max_concurrent, max_bytes_per_sec=max_bytes_per_sec
+    )
+
+
+def get_http_session():
+    """Returns the HTTP session of the current thread, which keeps connections
+    to the same hosts alive across downloads."""
+    import requests
+
+    session = getattr(http_sessions, "session", None)
+    if session is None:
+        session = requests.Session()
+        http_sessions.session = session
+    return session
+
+
 def download(
     url,
     path,
@@ -413,12 +487,44 @@ def _get_http(
     outer=None,
 ):
     """Safely (resume a) download to a file from http(s)."""
-    import requests
+    assert module_name is not None
+    with download_limiter.slot():
+        _get_http_limited(
+            url,
+            temp_file_name,
+            cur_file_size,
+            remote_file_size,
+            progressbar,
+            file_kind,
+            ncols=ncols,
+            system_worker_state=system_worker_state,
+            check_install_kill=check_install_kill,
+            module_name=module_name,
+            cur_size=cur_size,
+            total_size=total_size,
+            outer=outer,
+        )
+
+
+def _get_http_limited(
+    url,
+    temp_file_name,
+    cur_file_size,
+    remote_file_size,
+    progressbar,
+    file_kind: str,
+    ncols=80,
+    system_worker_state=None,
+    check_install_kill=None,
+    module_name=None,
+    cur_size=0,
+    total_size=0,
+    outer=None,
+):
     from time import time
     from ...gui.util import GuiOuter
 
-    assert module_name is not None
-    session = requests.Session()
+    session = get_http_session()
     headers = {"User-Agent": "oakvar"}
     if cur_file_size > 0:
         headers["Range"] = "bytes=%s-" % (cur_file_size,)
@@ -478,6 +584,7 @@ def _get_http(
                 chunk_size = max(chunk_size // 2, 512)
             local_file.write(chunk)
             read_size = len(chunk)
+            download_limiter.throttle(read_size)
             if progress:
                 progress.update(read_size)
             cur_size += read_size
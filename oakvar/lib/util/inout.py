@@ -2,7 +2,11 @@ from typing import Union
 from typing import Optional
 from typing import Dict
 from typing import Any
+from typing import Tuple
 from pathlib import Path
+from collections import OrderedDict
+from functools import lru_cache
+import re
 
 
 class BaseFile(object):
@@ -353,9 +357,40 @@ class FileWriter(BaseFile):
         self.wf.close()
 
 
+TCHANGE_RE = re.compile(r"([AaTtCcGgUuNn_-]+)(\d+)([AaTtCcGgUuNn_-]+)")
+ACHANGE_RE = re.compile(r"([a-zA-Z_\*]+)(\d+)([AaTtCcGgUuNn_\*]+)")
+ALL_MAPPINGS_PARSER_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=65536)
+def parse_tchange(tchange: str):
+    tchange_match = TCHANGE_RE.match(tchange)
+    if tchange_match:
+        return (
+            tchange_match.group(1),
+            int(tchange_match.group(2)),
+            tchange_match.group(3),
+        )
+    return None, None, None
+
+
+@lru_cache(maxsize=65536)
+def parse_achange(achange: str):
+    achange_match = ACHANGE_RE.match(achange)
+    if achange_match:
+        return (
+            achange_match.group(1),
+            int(achange_match.group(2)),
+            achange_match.group(3),
+        )
+    return None, None, None
+
+
 class CrxMapping(object):
+    tchange_re = TCHANGE_RE
+    achange_re = ACHANGE_RE
+
     def __init__(self):
-        from re import compile
         from typing import Optional
 
         self.protein: Optional[str] = None
@@ -371,8 +406,6 @@ class CrxMapping(object):
         self.apos_start = None
         self.aalt = None
         self.mapping = None
-        self.tchange_re = compile(r"([AaTtCcGgUuNn_-]+)(\d+)([AaTtCcGgUuNn_-]+)")
-        self.achange_re = compile(r"([a-zA-Z_\*]+)(\d+)([AaTtCcGgUuNn_\*]+)")
 
     def load_tchange(self, tchange):
         self.tchange = tchange
@@ -381,11 +414,11 @@ class CrxMapping(object):
 
     def parse_tchange(self):
         if self.tchange is not None:
-            tchange_match = self.tchange_re.match(self.tchange)
-            if tchange_match:
-                self.tref = tchange_match.group(1)
-                self.tpos_start = int(tchange_match.group(2))
-                self.talt = tchange_match.group(3)
+            tref, tpos_start, talt = parse_tchange(self.tchange)
+            if tpos_start is not None:
+                self.tref = tref
+                self.tpos_start = tpos_start
+                self.talt = talt
 
     def load_achange(self, achange):
         self.achange = achange
@@ -394,37 +427,103 @@ class CrxMapping(object):
 
     def parse_achange(self):
         if self.achange is not None:
-            achange_match = self.achange_re.match(self.achange)
-            if achange_match:
-                self.aref = achange_match.group(1)
-                self.apos_start = int(achange_match.group(2))
-                self.aalt = achange_match.group(3)
+            aref, apos_start, aalt = parse_achange(self.achange)
+            if apos_start is not None:
+                self.aref = aref
+                self.apos_start = apos_start
+                self.aalt = aalt
 
 
-class AllMappingsParser(object):
-    def __init__(self, s):
+class AllMappingsData(object):
+    """Decoded all_mappings value, shared through the LRU cache by the parsers
+    of the same string. Genes and transcript rows are tuples, and the derived
+    values are computed once, so no parser can change them."""
+
+    def __init__(self, s: str, items: Optional[Tuple] = None):
         from json import loads
-        from collections import OrderedDict
 
+        self.s = s
+        if items is None:
+            d = loads(s) if s else {}
+            items = tuple(
+                (gene, tuple(tuple(t) for t in ts)) for gene, ts in d.items()
+            )
+        self.items: Tuple = items
+        self.mapping_fields: Optional[Tuple] = None
+        self.report_string: Optional[str] = None
+
+
+class AllMappingsParser(object):
+    _protein_index = 0
+    _achange_index = 1
+    _so_index = 2
+    _transc_index = 3
+    _tchange_index = 4
+    _exonno_index = 5
+    mapping_field_names = (
+        "gene",
+        "transcript",
+        "so",
+        "tchange",
+        "tref",
+        "tpos_start",
+        "talt",
+        "achange",
+        "aref",
+        "apos_start",
+        "aalt",
+        "protein",
+    )
+
+    def __init__(self, s, data: Optional[AllMappingsData] = None):
         if type(s) == str:
-            self._d = loads(s, object_pairs_hook=OrderedDict)
+            self._s: Optional[str] = s
+            self._data = data or AllMappingsData(s)
+            self._decoded = None
         else:
-            self._d = s
-        self._protein_index = 0
-        self._achange_index = 1
-        self._so_index = 2
-        self._transc_index = 3
-        self._tchange_index = 4
-        self.mappings = self.get_all_mappings()
+            self._s = None
+            self._data = None
+            self._decoded = s if s is not None else {}
+        self._mappings = None
+
+    @property
+    def _d(self):
+        if self._decoded is None:
+            self._decoded = {
+                gene: [list(t) for t in ts] for gene, ts in self.get_data().items
+            }
+        return self._decoded
+
+    @property
+    def mappings(self):
+        if self._mappings is None:
+            self._mappings = self.get_all_mappings()
+        return self._mappings
+
+    def get_data(self) -> AllMappingsData:
+        if self._data is None:
+            items = tuple(
+                (gene, tuple(tuple(t) for t in ts)) for gene, ts in self._d.items()
+            )
+            self._data = AllMappingsData(self.to_json(), items=items)
+        return self._data
+
+    def to_json(self) -> str:
+        from json import dumps
+
+        if self._s is None:
+            self._s = dumps(self._d)
+        return self._s
 
     def get_genes(self):
-        return list(self._d.keys())
+        return [gene for gene, _ in self.get_data().items]
 
     def get_uniq_sos(self):
         sos = {}
-        for mapping in self.mappings:
-            for so in mapping.so.split(","):
-                sos[so] = True
+        for _, ts in self.get_data().items:
+            for t in ts:
+                for so in self.none_to_empty(t[self._so_index]).split(","):
+                    sos[so] = True
         sos = list(sos.keys())
         return sos
 
@@ -443,13 +542,29 @@ class AllMappingsParser(object):
         mapping.protein = self.none_to_empty(t[self._protein_index])
         return mapping
 
+    def get_mapping_fields(self) -> Tuple:
+        """Returns the values of mapping_field_names of each mapping. The
+        changes are parsed once for all the parsers of a string."""
+        data = self.get_data()
+        if data.mapping_fields is None:
+            fields = []
+            for gene, ts in data.items:
+                for t in ts:
+                    mapping = self.get_mapping(t)
+                    mapping.gene = gene
+                    fields.append(
+                        tuple(getattr(mapping, k) for k in self.mapping_field_names)
+                    )
+            data.mapping_fields = tuple(fields)
+        return data.mapping_fields
+
     def get_all_mappings(self):
         mappings = []
-        for gene, ts in self._d.items():
-            for t in ts:
-                mapping = self.get_mapping(t)
-                mapping.gene = gene
-                mappings.append(mapping)
+        for fields in self.get_mapping_fields():
+            mapping = CrxMapping()
+            for k, v in zip(self.mapping_field_names, fields):
+                setattr(mapping, k, v)
+            mappings.append(mapping)
         return mappings
 
     def get_transcript_mapping(self, transcript):
@@ -458,6 +573,75 @@ class AllMappingsParser(object):
                 return mapping
         return None
 
+    def substitute_sos(self, subs: Dict[str, str]) -> "AllMappingsParser":
+        from json import dumps
+
+        items = []
+        for gene, ts in self.get_data().items:
+            new_ts = []
+            for t in ts:
+                if t[self._so_index]:
+                    so = ",".join(
+                        [subs.get(so, so) for so in t[self._so_index].split(",")]
+                    )
+                    t = t[: self._so_index] + (so,) + t[self._so_index + 1 :]
+                new_ts.append(t)
+            items.append((gene, tuple(new_ts)))
+        s = dumps(dict(items))
+        return AllMappingsParser(s, data=get_all_mappings_data(s, items=tuple(items)))
+
+    def get_report_string(self) -> str:
+        data = self.get_data()
+        if data.report_string is not None:
+            return data.report_string
+        newvals = []
+        for hugo, ts in data.items:
+            for maprow in ts:
+                if len(maprow) == 5:
+                    # Written before the exon number was added to all_mappings
+                    [protid, protchange, so, transcript, rnachange] = maprow
+                    exonno = ""
+                else:
+                    [protid, protchange, so, transcript, rnachange, exonno] = maprow
+                if protid is None:
+                    protid = "(na)"
+                if protchange is None:
+                    protchange = "(na)"
+                if rnachange is None:
+                    rnachange = "(na)"
+                newval = (
+                    f"{transcript}:{hugo}:{protid}:{so}:{protchange}"
+                    + f":{rnachange}:{exonno}"
+                )
+                newvals.append(newval)
+        newvals.sort()
+        data.report_string = "; ".join(newvals)
+        return data.report_string
+
+
+_all_mappings_data: "OrderedDict[str, AllMappingsData]" = OrderedDict()
+
+
+def get_all_mappings_data(s: str, items: Optional[Tuple] = None) -> AllMappingsData:
+    data = _all_mappings_data.get(s)
+    if data is None:
+        data = AllMappingsData(s, items=items)
+        _all_mappings_data[s] = data
+        if len(_all_mappings_data) > ALL_MAPPINGS_PARSER_CACHE_SIZE:
+            _all_mappings_data.popitem(last=False)
+    else:
+        _all_mappings_data.move_to_end(s)
+    return data
+
+
+def get_all_mappings_parser(s) -> AllMappingsParser:
+    """Returns a new parser of `s`. Parsers of the same string share its
+    decoded data through an LRU cache, so a parser can be changed by module
+    code without affecting the others."""
+    if type(s) != str:
+        return AllMappingsParser(s)
+    return AllMappingsParser(s, data=get_all_mappings_data(s))
+
 
 class ColumnDefinition(object):
 
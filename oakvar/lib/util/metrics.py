@@ -0,0 +1,241 @@
+from typing import Optional
+from typing import Any
+from typing import List
+from typing import Dict
+
+METRICS_TABLE = "metrics"
+METRICS_FILE_SUFFIX = ".metrics.json"
+METRICS_COLUMNS = [
+    "stage",
+    "module",
+    "worker",
+    "wall_time",
+    "cpu_time",
+    "peak_rss_mb",
+    "rows_in",
+    "rows_out",
+    "rows_per_sec",
+]
+PROFILERS = ["cprofile", "pyinstrument"]
+
+
+def get_cpu_time(children: bool = True) -> float:
+    """CPU time of this process, plus that of its child processes which have
+    been waited for if `children` is True."""
+    from time import process_time
+
+    try:
+        from resource import getrusage
+        from resource import RUSAGE_SELF
+        from resource import RUSAGE_CHILDREN
+    except ImportError:
+        return process_time()
+    ru = getrusage(RUSAGE_SELF)
+    cpu_time = ru.ru_utime + ru.ru_stime
+    if children:
+        ru = getrusage(RUSAGE_CHILDREN)
+        cpu_time += ru.ru_utime + ru.ru_stime
+    return cpu_time
+
+
+def get_peak_rss_mb(children: bool = True) -> Optional[float]:
+    """Peak resident set size in MB of this process, or of the largest of it
+    and its child processes which have been waited for."""
+    from sys import platform
+
+    try:
+        from resource import getrusage
+        from resource import RUSAGE_SELF
+        from resource import RUSAGE_CHILDREN
+    except ImportError:
+        return None
+    peak = getrusage(RUSAGE_SELF).ru_maxrss
+    if children:
+        peak = max(peak, getrusage(RUSAGE_CHILDREN).ru_maxrss)
+    # bytes on macOS and kilobytes on Linux
+    unit = 1024 * 1024 if platform == "darwin" else 1024
+    return round(peak / unit, 1)
+
+
+class Measure:
+    """Context manager which fills a metrics record with the wall time, CPU
+    time and peak RSS of the code run inside it."""
+
+    def __init__(self, record: Dict[str, Any], children: bool = True):
+        self.record = record
+        self.children = children
+        self.start_time = 0.0
+        self.start_cpu_time = 0.0
+
+    def __enter__(self) -> Dict[str, Any]:
+        from time import perf_counter
+
+        self.start_time = perf_counter()
+        self.start_cpu_time = get_cpu_time(children=self.children)
+        return self.record
+
+    def __exit__(self, *_):
+        from time import perf_counter
+
+        self.record["wall_time"] = round(perf_counter() - self.start_time, 3)
+        self.record["cpu_time"] = round(
+            get_cpu_time(children=self.children) - self.start_cpu_time, 3
+        )
+        self.record["peak_rss_mb"] = get_peak_rss_mb(children=self.children)
+
+
+def make_record(stage: str, module: str = "", worker: str = "") -> Dict[str, Any]:
+    record: Dict[str, Any] = {k: None for k in METRICS_COLUMNS}
+    record["stage"] = stage
+    record["module"] = module
+    record["worker"] = worker
+    return record
+
+
+def measure(
+    stage: str, module: str = "", worker: str = "", children: bool = False
+) -> Measure:
+    """Measures a piece of work in a worker process. The record can be sent
+    back to the main process and added with `PipelineMetrics.add`."""
+    return Measure(make_record(stage, module=module, worker=worker), children=children)
+
+
+class PipelineMetrics:
+    """Per-stage, per-module and per-worker metrics of a run.
+
+    Records have the wall time, CPU time, peak RSS, rows in and out and rows
+    per second of a piece of work. CPU times of stages include those of
+    worker processes once the workers have exited. Records are written to the
+    `metrics` table of the result database and to `<run_name>.metrics.json`.
+    """
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+
+    def measure(self, stage: str, module: str = "", worker: str = "") -> Measure:
+        record = make_record(stage, module=module, worker=worker)
+        self.records.append(record)
+        return Measure(record)
+
+    def add(self, record: Dict[str, Any]):
+        self.records.append(record)
+
+    def update(self, stage: str, module: str = "", **values):
+        """Updates the last record of `stage` and `module`, such as with rows
+        counted while the work was being measured."""
+        for record in reversed(self.records):
+            if record["stage"] == stage and record["module"] == module:
+                record.update(values)
+                return
+
+    def get_records(self) -> List[Dict[str, Any]]:
+        for record in self.records:
+            rows = record.get("rows_out") or record.get("rows_in")
+            wall_time = record.get("wall_time")
+            if rows and wall_time:
+                record["rows_per_sec"] = round(rows / wall_time, 1)
+        return self.records
+
+    def write_json(self, path):
+        from json import dump
+
+        with open(path, "w") as wf:
+            dump(self.get_records(), wf, indent=2)
+
+    def write_table(self, dbpath):
+        """Replaces the `metrics` table of a result database."""
+        import sqlite3
+
+        records = self.get_records()
+        conn = sqlite3.connect(str(dbpath))
+        cursor = conn.cursor()
+        cursor.execute(f"drop table if exists {METRICS_TABLE}")
+        cursor.execute(
+            f"create table {METRICS_TABLE} (stage text, module text, worker text, "
+            + "wall_time real, cpu_time real, peak_rss_mb real, rows_in integer, "
+            + "rows_out integer, rows_per_sec real)"
+        )
+        q = (
+            f"insert into {METRICS_TABLE} ({', '.join(METRICS_COLUMNS)}) values "
+            + f"({', '.join(['?'] * len(METRICS_COLUMNS))})"
+        )
+        cursor.executemany(q, [[r.get(c) for c in METRICS_COLUMNS] for r in records])
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    def log(self, logger):
+        if not logger:
+            return
+        for record in self.get_records():
+            name = ":".join(
+                [v for v in [record["stage"], record["module"], record["worker"]] if v]
+            )
+            values = ", ".join(
+                [
+                    f"{k}={record[k]}"
+                    for k in METRICS_COLUMNS[3:]
+                    if record[k] is not None
+                ]
+            )
+            logger.info(f"metrics {name}: {values}")
+
+
+def run_with_profiler(func, profiler: Optional[str], path, *args, **kwargs):
+    """Runs `func` under cProfile or pyinstrument and writes the profile to
+    `path`, `.prof` for cProfile and `.html` for pyinstrument. Runs `func`
+    as it is if `profiler` is not given."""
+    if not profiler:
+        return func(*args, **kwargs)
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            profiler = "cprofile"
+        else:
+            p = Profiler()
+            p.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                p.stop()
+                with open(f"{path}.html", "w") as wf:
+                    wf.write(p.output_html())
+    from cProfile import Profile
+
+    p = Profile()
+    try:
+        return p.runcall(func, *args, **kwargs)
+    finally:
+        p.dump_stats(f"{path}.prof")
+
+
+async def run_with_profiler_async(
+    func, profiler: Optional[str], path, *args, **kwargs
+):
+    """run_with_profiler for coroutine functions."""
+    if not profiler:
+        return await func(*args, **kwargs)
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            profiler = "cprofile"
+        else:
+            p = Profiler(async_mode="enabled")
+            p.start()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                p.stop()
+                with open(f"{path}.html", "w") as wf:
+                    wf.write(p.output_html())
+    from cProfile import Profile
+
+    p = Profile()
+    p.enable()
+    try:
+        return await func(*args, **kwargs)
+    finally:
+        p.disable()
+        p.dump_stats(f"{path}.prof")
@@ -0,0 +1,272 @@
+from typing import Optional
+from typing import Any
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Iterator
+
+REGION_INDEX_SUFFIX = ".ovidx"
+REGION_INDEX_VERSION = 1
+REGION_INDEX_BLOCK_LINES = 1000
+WHOLE_CHROM_END = 1 << 31
+REGION_INPUT_FORMATS = ["vcf", "cravat"]
+
+
+def normalize_chrom(chrom: str) -> str:
+    if chrom.startswith("chr"):
+        return chrom
+    return "chr" + chrom
+
+
+def merge_intervals(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for beg, end in sorted(intervals):
+        if merged and beg <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((beg, end))
+    return merged
+
+
+def parse_region(region: str) -> Tuple[str, int, int]:
+    """Parses `chr1` or `chr1:10000-20000` (1-based, inclusive, as in tabix)
+    into a chromosome and a 0-based half-open interval."""
+    from ..exceptions import ArgumentError
+
+    region = region.strip()
+    if ":" not in region:
+        return normalize_chrom(region), 0, WHOLE_CHROM_END
+    chrom, span = region.rsplit(":", 1)
+    try:
+        if "-" in span:
+            beg, end = span.split("-", 1)
+            beg = int(beg) if beg else 1
+            end = int(end) if end else WHOLE_CHROM_END
+        else:
+            beg = int(span)
+            end = beg
+    except ValueError:
+        raise ArgumentError(msg=f"wrong region: {region}")
+    if beg < 1 or end < beg:
+        raise ArgumentError(msg=f"wrong region: {region}")
+    return normalize_chrom(chrom), beg - 1, end
+
+
+def read_bed(path: str) -> List[Tuple[str, int, int]]:
+    from gzip import open as gzipopen
+    from .bgzf import is_gzip
+
+    regions = []
+    f = gzipopen(path, "rt") if is_gzip(path) else open(path)
+    with f:
+        for line in f:
+            if line.startswith(("#", "track", "browser")) or not line.strip():
+                continue
+            toks = line.split("\t")
+            regions.append((normalize_chrom(toks[0]), int(toks[1]), int(toks[2])))
+    return regions
+
+
+def parse_regions(regions: Any) -> Dict[str, List[Tuple[int, int]]]:
+    """Returns sorted and merged 0-based half-open intervals by chromosome.
+
+    Args:
+        regions: A BED file path, a comma-separated string of regions such as
+            `chr1,chr2:10000-20000`, or a list of such strings.
+    """
+    from pathlib import Path
+
+    if isinstance(regions, str):
+        regions = [regions]
+    parsed: List[Tuple[str, int, int]] = []
+    for v in regions:
+        if Path(v).is_file():
+            parsed.extend(read_bed(v))
+            continue
+        for region in v.split(","):
+            if region.strip():
+                parsed.append(parse_region(region))
+    intervals: Dict[str, List[Tuple[int, int]]] = {}
+    for chrom, beg, end in parsed:
+        intervals.setdefault(chrom, []).append((beg, end))
+    return {chrom: merge_intervals(v) for chrom, v in intervals.items()}
+
+
+def overlaps(intervals: List[Tuple[int, int]], beg: int, end: int) -> bool:
+    from bisect import bisect_right
+
+    idx = bisect_right(intervals, (beg, WHOLE_CHROM_END))
+    if idx > 0 and intervals[idx - 1][1] > beg:
+        return True
+    return idx < len(intervals) and intervals[idx][0] < end
+
+
+def get_record_span(line: bytes) -> Optional[Tuple[str, int, int]]:
+    """Chromosome and 0-based half-open span of a data line of VCF or OakVar
+    (cravat) format, both of which have the chromosome, the position and the
+    reference bases in the 1st, 2nd and 4th columns."""
+    toks = line.split(b"\t", 4)
+    if len(toks) < 4:
+        return None
+    try:
+        beg = int(toks[1]) - 1
+    except ValueError:
+        return None
+    return normalize_chrom(toks[0].decode()), beg, beg + max(len(toks[3]), 1)
+
+
+class RegionIndex:
+    """Lightweight offset index of a VCF or OakVar format input, cached next to
+    the input as `<input>.ovidx`.
+
+    Data lines are grouped into blocks of up to REGION_INDEX_BLOCK_LINES lines
+    of one chromosome. Each block keeps its span, the line number of its first
+    line and its offset (a virtual offset for bgzip files), so that the lines
+    overlapping given regions can be read with their original line numbers
+    without reading the whole file. The cache is rebuilt if the size or
+    modification time of the input changes.
+    """
+
+    def __init__(self, input_path: str, logger=None):
+        from .bgzf import is_bgzf
+        from .bgzf import is_gzip
+
+        self.input_path = str(input_path)
+        self.path = self.input_path + REGION_INDEX_SUFFIX
+        self.logger = logger
+        self.bgzf = is_bgzf(self.input_path)
+        self.seekable = self.bgzf or not is_gzip(self.input_path)
+        self.blocks: List[List[Any]] = []
+        if self.seekable:
+            self.load_or_build()
+
+    def get_stamp(self) -> Dict[str, Any]:
+        from os import stat
+
+        st = stat(self.input_path)
+        return {
+            "version": REGION_INDEX_VERSION,
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+        }
+
+    def load_or_build(self):
+        from json import load
+        from pathlib import Path
+
+        stamp = self.get_stamp()
+        if Path(self.path).exists():
+            try:
+                with open(self.path) as f:
+                    data = load(f)
+                if all([data.get(k) == v for k, v in stamp.items()]):
+                    self.blocks = data["blocks"]
+                    return
+            except Exception:
+                pass
+        self.build()
+        self.save(stamp)
+
+    def open_input(self):
+        from .bgzf import BgzfReader
+
+        if self.bgzf:
+            return BgzfReader(self.input_path)
+        return open(self.input_path, "rb")
+
+    def build(self):
+        if self.logger:
+            self.logger.info(f"building region index of {self.input_path}")
+        blocks: List[List[Any]] = []
+        block: Optional[List[Any]] = None
+        line_no = 0
+        offset = 0
+        with self.open_input() as f:
+            while True:
+                if self.bgzf:
+                    offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                line_no += 1
+                start = offset
+                if not self.bgzf:
+                    offset += len(line)
+                if line.startswith(b"#"):
+                    block = None
+                    continue
+                span = get_record_span(line)
+                if (
+                    block is None
+                    or block[5] >= REGION_INDEX_BLOCK_LINES
+                    or (span and span[0] != block[0])
+                ):
+                    chrom = span[0] if span else ""
+                    block = [chrom, WHOLE_CHROM_END, 0, line_no, start, 0]
+                    blocks.append(block)
+                block[5] += 1
+                if span:
+                    if not block[0]:
+                        block[0] = span[0]
+                    block[1] = min(block[1], span[1])
+                    block[2] = max(block[2], span[2])
+        self.blocks = blocks
+
+    def save(self, stamp: Dict[str, Any]):
+        from json import dump
+
+        data = dict(stamp)
+        data["blocks"] = self.blocks
+        try:
+            with open(self.path, "w") as wf:
+                dump(data, wf)
+        except OSError:
+            if self.logger:
+                self.logger.info(f"region index could not be saved to {self.path}")
+
+    def get_blocks(self, regions: Dict[str, List[Tuple[int, int]]]) -> List[List[Any]]:
+        return [
+            block
+            for block in self.blocks
+            if block[0] in regions and overlaps(regions[block[0]], block[1], block[2])
+        ]
+
+    def iter_lines(
+        self, regions: Dict[str, List[Tuple[int, int]]], encoding: str = "utf-8"
+    ) -> Iterator[Tuple[int, str]]:
+        """Yields the line numbers and the lines of the records overlapping
+        `regions`. Inputs compressed with plain gzip cannot be seeked into and
+        are read from the start."""
+        if not self.seekable:
+            yield from self.scan_lines(regions, encoding)
+            return
+        with self.open_input() as f:
+            for block in self.get_blocks(regions):
+                f.seek(block[4])
+                for i in range(block[5]):
+                    line = f.readline()
+                    if not line:
+                        break
+                    if self.is_in_regions(line, regions):
+                        yield block[3] + i, line.decode(encoding)
+
+    def scan_lines(
+        self, regions: Dict[str, List[Tuple[int, int]]], encoding: str
+    ) -> Iterator[Tuple[int, str]]:
+        from gzip import open as gzipopen
+
+        with gzipopen(self.input_path, "rb") as f:
+            for line_no, line in enumerate(f, start=1):
+                if line.startswith(b"#"):
+                    continue
+                if self.is_in_regions(line, regions):
+                    yield line_no, line.decode(encoding)
+
+    def is_in_regions(
+        self, line: bytes, regions: Dict[str, List[Tuple[int, int]]]
+    ) -> bool:
+        span = get_record_span(line)
+        if not span:
+            return False
+        chrom, beg, end = span
+        return chrom in regions and overlaps(regions[chrom], beg, end)
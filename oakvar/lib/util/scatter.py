@@ -0,0 +1,280 @@
+from typing import Optional
+from typing import Any
+from typing import List
+from typing import Dict
+from typing import Tuple
+
+SCATTER_MANIFEST_SUFFIX = ".scatter.json"
+SCATTER_MANIFEST_VERSION = 1
+SCATTER_BY_OPTIONS = ["chrom", "size"]
+SHARD_RUN_KWARGS_EXCLUDED = [
+    "inputs",
+    "run_name",
+    "output_dir",
+    "regions",
+    "scatter",
+    "scatter_by",
+    "shard",
+    "gather",
+    "uid",
+    "job_name",
+    "outer",
+    "loop",
+]
+
+
+def get_segments(blocks: List[List[Any]], by: str) -> List[Tuple[str, int, int]]:
+    """Groups the blocks of a region index into (chromosome, first position,
+    number of lines) segments between which shards can be cut. With `chrom`,
+    a segment is a whole chromosome. With `size`, a segment is a block and a
+    cut inside a chromosome is allowed where no earlier record of the
+    chromosome reaches into the next block."""
+    from ..exceptions import ArgumentError
+
+    if by == "chrom":
+        weights: Dict[str, int] = {}
+        for block in blocks:
+            if block[0]:
+                weights[block[0]] = weights.get(block[0], 0) + block[5]
+        return [(chrom, 0, weight) for chrom, weight in weights.items()]
+    segments: List[Tuple[str, int, int]] = []
+    seen_chroms = set()
+    prev = None
+    max_end = 0
+    for block in blocks:
+        if not block[0]:
+            continue
+        if prev is None or block[0] != prev[0]:
+            if block[0] in seen_chroms:
+                raise ArgumentError(
+                    msg="--scatter-by size needs an input sorted by chromosome."
+                )
+            seen_chroms.add(block[0])
+            segments.append((block[0], 0, block[5]))
+            max_end = 0
+        elif block[1] < prev[1]:
+            raise ArgumentError(
+                msg="--scatter-by size needs an input sorted by position."
+            )
+        elif max_end <= block[1]:
+            segments.append((block[0], block[1], block[5]))
+        else:
+            chrom, beg, weight = segments[-1]
+            segments[-1] = (chrom, beg, weight + block[5])
+        max_end = max(max_end, block[2])
+        prev = block
+    return segments
+
+
+def partition_segments(
+    segments: List[Tuple[str, int, int]], num_shards: int
+) -> List[List[int]]:
+    """Splits segments into at most `num_shards` contiguous groups of about
+    the same number of lines and returns the segment indices of each group."""
+    num_shards = min(num_shards, len(segments))
+    total = sum([v[2] for v in segments])
+    groups: List[List[int]] = [[] for _ in range(num_shards)]
+    cum = 0
+    group_no = 0
+    for i, segment in enumerate(segments):
+        num_left = len(segments) - i
+        if (
+            groups[group_no]
+            and group_no < num_shards - 1
+            and (
+                cum >= total * (group_no + 1) / num_shards
+                or num_left <= num_shards - group_no - 1
+            )
+        ):
+            group_no += 1
+        groups[group_no].append(i)
+        cum += segment[2]
+    return [group for group in groups if group]
+
+
+def get_group_regions(
+    segments: List[Tuple[str, int, int]], group: List[int]
+) -> List[str]:
+    """Region strings of a group of segments. A segment spans from its first
+    position to right before the next segment of the same chromosome."""
+    regions: List[str] = []
+    for i in group:
+        chrom, beg, _ = segments[i]
+        if i > group[0] and segments[i - 1][0] == chrom:
+            continue
+        last = i
+        while last + 1 <= group[-1] and segments[last + 1][0] == chrom:
+            last += 1
+        start = str(beg + 1) if beg else ""
+        end = ""
+        if last + 1 < len(segments) and segments[last + 1][0] == chrom:
+            end = str(segments[last + 1][1])
+        if not start and not end:
+            regions.append(chrom)
+        else:
+            regions.append(f"{chrom}:{start or 1}-{end}")
+    return regions
+
+
+def get_shard_regions(
+    input_path: str, num_shards: int, by: str = "chrom", logger=None
+) -> List[List[str]]:
+    from .regions import RegionIndex
+    from ..exceptions import ArgumentError
+
+    if by not in SCATTER_BY_OPTIONS:
+        raise ArgumentError(msg=f"--scatter-by should be one of {SCATTER_BY_OPTIONS}.")
+    index = RegionIndex(input_path, logger=logger)
+    if not index.blocks:
+        index.load_or_build()
+    segments = get_segments(index.blocks, by)
+    if not segments:
+        raise ArgumentError(msg=f"No variant was found in {input_path}.")
+    groups = partition_segments(segments, num_shards)
+    return [get_group_regions(segments, group) for group in groups]
+
+
+def get_shard_run_name(run_name: str, shard_no: int) -> str:
+    return f"{run_name}.shard{shard_no}"
+
+
+def write_scatter_manifest(
+    input_path: str,
+    run_name: str,
+    output_dir: str,
+    num_shards: int,
+    by: str = "chrom",
+    run_kwargs: Dict[str, Any] = {},
+    logger=None,
+) -> str:
+    """Splits an input into shards and writes a manifest of the shards to
+    `<output_dir>/<run_name>.scatter.json`. Each shard can then be run on a
+    separate node with `ov run --shard <manifest> <shard_no>` and the shard
+    results put together with `ov run --gather <manifest>`."""
+    from json import dump
+    from json import dumps
+    from pathlib import Path
+
+    shard_regions = get_shard_regions(input_path, num_shards, by=by, logger=logger)
+    kwargs = {}
+    for k, v in run_kwargs.items():
+        if k in SHARD_RUN_KWARGS_EXCLUDED:
+            continue
+        try:
+            dumps(v)
+        except TypeError:
+            continue
+        kwargs[k] = v
+    manifest = {
+        "version": SCATTER_MANIFEST_VERSION,
+        "input": str(Path(input_path).absolute()),
+        "run_name": run_name,
+        "output_dir": str(Path(output_dir).absolute()),
+        "scatter_by": by,
+        "run_kwargs": kwargs,
+        "shards": [
+            {
+                "shard_no": i + 1,
+                "run_name": get_shard_run_name(run_name, i + 1),
+                "regions": regions,
+            }
+            for i, regions in enumerate(shard_regions)
+        ],
+    }
+    manifest_path = Path(output_dir) / (run_name + SCATTER_MANIFEST_SUFFIX)
+    with open(manifest_path, "w") as wf:
+        dump(manifest, wf, indent=2)
+    return str(manifest_path)
+
+
+def load_scatter_manifest(manifest_path: str) -> Dict[str, Any]:
+    from json import load
+    from ..exceptions import ArgumentError
+
+    with open(manifest_path) as f:
+        manifest = load(f)
+    if manifest.get("version") != SCATTER_MANIFEST_VERSION:
+        raise ArgumentError(msg=f"{manifest_path} is not a scatter manifest.")
+    return manifest
+
+
+def get_shard(manifest: Dict[str, Any], shard_no: int) -> Dict[str, Any]:
+    from ..exceptions import ArgumentError
+
+    for shard in manifest["shards"]:
+        if shard["shard_no"] == shard_no:
+            return shard
+    raise ArgumentError(
+        msg=f"Shard {shard_no} does not exist. Shards are 1 to "
+        + f"{len(manifest['shards'])}."
+    )
+
+
+def get_shard_run_kwargs(
+    manifest_path: str,
+    shard_no: int,
+    inputs: Optional[List[str]] = None,
+    output_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Arguments of `oakvar.api.run` for a shard. The input and the output
+    directory in the manifest can be overridden, for example when a workflow
+    engine stages files into a task directory. Shards end at the
+    postaggregator step and reports are made after gathering."""
+    manifest = load_scatter_manifest(manifest_path)
+    shard = get_shard(manifest, shard_no)
+    kwargs = dict(manifest["run_kwargs"])
+    kwargs["inputs"] = inputs or [manifest["input"]]
+    kwargs["run_name"] = [shard["run_name"]]
+    kwargs["output_dir"] = [output_dir or manifest["output_dir"]]
+    kwargs["regions"] = shard["regions"]
+    kwargs["endat"] = "postaggregator"
+    kwargs["report_types"] = []
+    kwargs["combine_input"] = False
+    return kwargs
+
+
+def gather_shards(
+    manifest_path: str,
+    output_dir: Optional[str] = None,
+    parallel: int = 1,
+    outer=None,
+) -> Dict[str, Any]:
+    """Merges the result databases of the shards of a manifest, in shard
+    order, into `<run_name>.sqlite` and makes the reports of the original
+    run. Shard result databases are looked up in `output_dir`, which is the
+    output directory in the manifest by default."""
+    from pathlib import Path
+    from shutil import copyfile
+    from ..exceptions import ArgumentError
+    from ...api import report
+    from ...api.util import mergesqlite
+
+    manifest = load_scatter_manifest(manifest_path)
+    output_dir = output_dir or manifest["output_dir"]
+    dbpaths = [
+        str(Path(output_dir) / (shard["run_name"] + ".sqlite"))
+        for shard in manifest["shards"]
+    ]
+    missing = [v for v in dbpaths if not Path(v).exists()]
+    if missing:
+        raise ArgumentError(msg=f"Shard results are missing: {', '.join(missing)}")
+    dbpath = str(Path(output_dir) / (manifest["run_name"] + ".sqlite"))
+    if len(dbpaths) == 1:
+        copyfile(dbpaths[0], dbpath)
+    else:
+        mergesqlite(dbpaths=dbpaths, outpath=dbpath, parallel=parallel)
+    if outer:
+        outer.write(f"gathered {len(dbpaths)} shards into {dbpath}")
+    ret: Dict[str, Any] = {"dbpath": dbpath}
+    run_kwargs = manifest["run_kwargs"]
+    report_types = run_kwargs.get("report_types") or run_kwargs.get("reports")
+    if report_types:
+        ret["reports"] = report(
+            dbpath,
+            report_types=report_types,
+            output_dir=Path(output_dir),
+            run_name=manifest["run_name"],
+            module_options=run_kwargs.get("module_options") or {},
+            outer=outer,
+        )
+    return ret
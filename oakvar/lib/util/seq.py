@@ -1,5 +1,6 @@
 from typing import Optional
 from typing import Tuple
+from typing import List
 from liftover.chain_file import ChainFile
 from liftover.download_file import download_file
 
@@ -263,6 +264,200 @@ def normalize_variant_dict_left(wdict):
     return wdict
 
 
+def _get_common_affix_lengths(refs, alts, suffix: bool = False):
+    """Lengths of the common prefixes, or suffixes if `suffix` is True, of
+    two polars string Series. Most variants differ at the first compared base,
+    and the lengths of the rest are found by a binary search on those rows at
+    once, so the number of polars operations grows only with the logarithm of
+    the longest bases in a batch.
+    """
+    import polars as pl
+
+    ref_len = pl.col("ref").str.len_chars().cast(pl.Int64)
+    alt_len = pl.col("alt").str.len_chars().cast(pl.Int64)
+    if suffix:
+
+        def affix(name, name_len, length):
+            return pl.col(name).str.slice(name_len - length, length)
+
+    else:
+
+        def affix(name, _, length):
+            return pl.col(name).str.slice(0, length)
+
+    df = pl.DataFrame({"ref": refs, "alt": alts}).with_row_index("i")
+    df = df.with_columns(pl.min_horizontal(ref_len, alt_len).alias("hi"))
+    first_same = (pl.col("hi") > 0) & (
+        affix("ref", ref_len, 1) == affix("alt", alt_len, 1)
+    )
+    df = df.with_columns(
+        pl.when(first_same).then(1).otherwise(0).cast(pl.Int64).alias("lo"),
+        pl.when(first_same).then(pl.col("hi")).otherwise(0).alias("hi"),
+    )
+    todo = df.filter(pl.col("lo") < pl.col("hi"))
+    if todo.height == 0:
+        return df["lo"]
+    mid = (pl.col("lo") + pl.col("hi") + 1) // 2
+    same = affix("ref", ref_len, mid) == affix("alt", alt_len, mid)
+    for _ in range(int(todo["hi"].max() or 0).bit_length()):
+        todo = todo.with_columns(
+            pl.when(same).then(mid).otherwise(pl.col("lo")).alias("lo"),
+            pl.when(same).then(pl.col("hi")).otherwise(mid - 1).alias("hi"),
+        )
+    df = df.join(todo.select("i", pl.col("lo").alias("todo_lo")), on="i", how="left")
+    return df.sort("i").select(pl.coalesce("todo_lo", "lo").alias("lo"))["lo"]
+
+
+def _trim_common_bases(df, suffix_first: bool):
+    """Trims the common bases at the ends of the `ref` and `alt` columns of a
+    polars DataFrame, the suffixes and then the prefixes if `suffix_first`,
+    and the other way around otherwise. The number of bases trimmed from the
+    start is added as `prefix_len`.
+    """
+    import polars as pl
+
+    for suffix in [suffix_first, not suffix_first]:
+        lens = _get_common_affix_lengths(df["ref"], df["alt"], suffix=suffix)
+        df = df.with_columns(lens.alias("k"))
+        if suffix:
+            df = df.with_columns(
+                pl.col("ref").str.slice(0, pl.col("ref").str.len_chars() - pl.col("k")),
+                pl.col("alt").str.slice(0, pl.col("alt").str.len_chars() - pl.col("k")),
+            )
+        else:
+            df = df.with_columns(
+                pl.col("ref").str.slice(pl.col("k")),
+                pl.col("alt").str.slice(pl.col("k")),
+                pl.col("k").cast(pl.Int64).alias("prefix_len"),
+            )
+    return df.drop("k")
+
+
+def normalize_variants_left(
+    strand: str, poss: List[int], refs: List[str], alts: List[str]
+) -> Tuple[List[int], List[str], List[str]]:
+    """normalize_variant_left on a batch of variants. Whole columns of
+    reference and alternate bases are trimmed with polars string expressions,
+    and the results are the same as those of `normalize_variant_left` on each
+    variant.
+
+    Args:
+        strand (str): strand
+        poss (List[int]): Positions
+        refs (List[str]): Reference bases
+        alts (List[str]): Alternate bases
+
+    Returns:
+        (positions, reference bases, alternate bases)
+    """
+    import polars as pl
+
+    if not poss:
+        return [], [], []
+    df = pl.DataFrame(
+        {"pos": [int(v) for v in poss], "ref": refs, "alt": alts},
+        schema={"pos": pl.Int64, "ref": pl.Utf8, "alt": pl.Utf8},
+    )
+    # Same single nucleotide for ref and alt is returned without change.
+    df = df.with_columns(
+        (
+            (pl.col("ref").str.len_chars() == 1)
+            & (pl.col("alt").str.len_chars() == 1)
+            & (pl.col("ref") == pl.col("alt"))
+        ).alias("unchanged"),
+        pl.col("ref").alias("orig_ref"),
+        pl.col("alt").alias("orig_alt"),
+    )
+    df = _trim_common_bases(df, suffix_first=True)
+    if strand == "+":
+        new_pos = pl.col("pos") + pl.col("prefix_len")
+    elif strand == "-":
+        new_pos = pl.col("pos") - pl.col("prefix_len")
+    else:
+        new_pos = pl.col("pos")
+    df = df.with_columns(
+        pl.when(pl.col("unchanged")).then(pl.col("pos")).otherwise(new_pos),
+        *[
+            pl.when(pl.col("unchanged"))
+            .then(pl.col("orig_" + name))
+            .when(pl.col(name).is_in(["", "."]))
+            .then(pl.lit("-"))
+            .otherwise(pl.col(name))
+            .alias(name)
+            for name in ["ref", "alt"]
+        ],
+    )
+    return df["pos"].to_list(), df["ref"].to_list(), df["alt"].to_list()
+
+
+def trim_variants_many(
+    poss: List[int], refs: List[str], alts: List[str]
+) -> Tuple[List[int], List[str], List[str]]:
+    """Trims the common bases at the start and then at the end of reference
+    and alternate bases, with polars string expressions on whole columns.
+    Positions are moved by the number of bases trimmed at the start, and
+    empty bases become "-". Single bases are returned without change.
+
+    Args:
+        poss (List[int]): Positions
+        refs (List[str]): Reference bases
+        alts (List[str]): Alternate bases
+
+    Returns:
+        (positions, reference bases, alternate bases)
+    """
+    import polars as pl
+
+    if not poss:
+        return [], [], []
+    df = pl.DataFrame(
+        {"pos": poss, "ref": refs, "alt": alts},
+        schema={"pos": pl.Int64, "ref": pl.Utf8, "alt": pl.Utf8},
+    )
+    df = df.with_columns(
+        (
+            (pl.col("ref").str.len_chars() == 1) & (pl.col("alt").str.len_chars() == 1)
+        ).alias("unchanged"),
+        pl.col("ref").alias("orig_ref"),
+        pl.col("alt").alias("orig_alt"),
+    )
+    df = _trim_common_bases(df, suffix_first=False)
+    df = df.with_columns(
+        pl.when(pl.col("unchanged"))
+        .then(pl.col("pos"))
+        .otherwise(pl.col("pos") + pl.col("prefix_len")),
+        *[
+            pl.when(pl.col("unchanged"))
+            .then(pl.col("orig_" + name))
+            .when(pl.col(name) == "")
+            .then(pl.lit("-"))
+            .otherwise(pl.col(name))
+            .alias(name)
+            for name in ["ref", "alt"]
+        ],
+    )
+    return df["pos"].to_list(), df["ref"].to_list(), df["alt"].to_list()
+
+
+def fullmatch_many(pattern: str, values: List[Optional[str]]) -> List[bool]:
+    """`re.fullmatch` of `pattern` on each of `values` with a polars string
+    expression. None does not match.
+
+    Args:
+        pattern (str): Regular expression
+        values (List[Optional[str]]): Strings to match
+
+    Returns:
+        Whether each value matches `pattern` entirely.
+    """
+    import polars as pl
+
+    if not values:
+        return []
+    s = pl.Series(values, dtype=pl.Utf8)
+    return s.str.contains(f"^(?:{pattern})$").fill_null(False).to_list()
+
+
 def reverse_complement(bases):
     """reverse_complement.
 
@@ -300,6 +495,27 @@ def get_lifter(source_assembly: str) -> Optional[ChainFile]:
     return lifter
 
 
+def _liftover_one_pos(convert, chrom: str, pos: int) -> Optional[Tuple[str, int]]:
+    # res = Optional[[(chrom, pos, strand, score)...]]
+    hits = convert(chrom, pos - 1)
+    converted = None
+    if hits:
+        converted = (hits[0][0], hits[0][1] + 1)
+    else:
+        hits_prev = convert(chrom, pos - 2)
+        hits_next = convert(chrom, pos)
+        if hits_prev and hits_next:
+            hit_prev_1 = hits_prev[0]
+            hit_next_1 = hits_next[0]
+            pos_prev = hit_prev_1[1]
+            pos_next = hit_next_1[1]
+            if pos_prev == pos_next - 2:
+                converted = (hit_prev_1[0], pos_prev + 1 + 1)
+            elif pos_prev == pos_next + 2:
+                converted = (hit_prev_1[0], pos_prev - 1 + 1)
+    return converted
+
+
 def liftover_one_pos(
     chrom: str,
     pos: int,
@@ -324,59 +540,22 @@ def liftover_one_pos(
         lifter = get_lifter(source_assembly)
     if not lifter:
         raise ValueError(f"LiftOver not found for {source_assembly}")
-    # res = Optional[[(chrom, pos, strand, score)...]]
-    hits = lifter.convert_coordinate(chrom, pos - 1)
-    converted = None
-    if hits:
-        converted = (hits[0][0], hits[0][1] + 1)
-    else:
-        hits_prev = lifter.convert_coordinate(chrom, pos - 2)
-        hits_next = lifter.convert_coordinate(chrom, pos)
-        if hits_prev and hits_next:
-            hit_prev_1 = hits_prev[0]
-            hit_next_1 = hits_next[0]
-            pos_prev = hit_prev_1[1]
-            pos_next = hit_next_1[1]
-            if pos_prev == pos_next - 2:
-                converted = (hit_prev_1[0], pos_prev + 1 + 1)
-            elif pos_prev == pos_next + 2:
-                converted = (hit_prev_1[0], pos_prev - 1 + 1)
-    return converted
+    return _liftover_one_pos(lifter.convert_coordinate, chrom, pos)
 
 
-def liftover(
+def _liftover(
+    convert,
     chrom: str,
     pos: int,
     ref: Optional[str] = None,
     alt: Optional[str] = None,
     get_ref: bool = False,
-    lifter=None,
-    source_assembly: Optional[str] = None,
     wgs_reader=None,
 ):
-    """liftover.
-
-    Args:
-        chrom (str): chrom
-        pos (int): pos
-        ref (Optional[str]): ref
-        alt (Optional[str]): alt
-        get_ref (bool): get_ref
-        lifter:
-        source_assembly (Optional[str]): source_assembly
-        wgs_reader:
-    """
     from oakvar.lib.exceptions import LiftoverFailure
-    from oakvar.lib.util.seq import reverse_complement
 
-    if not lifter:
-        if not source_assembly:
-            raise ValueError("Either lifter or source_assembly should be given")
-        lifter = get_lifter(source_assembly)
-    if not lifter:
-        raise ValueError(f"LiftOver not found for {source_assembly}")
     if ref is None:
-        converted = liftover_one_pos(chrom, pos, lifter=lifter)
+        converted = _liftover_one_pos(convert, chrom, pos)
         if converted is None:
             raise LiftoverFailure("Liftover failure")
         newchrom = converted[0]
@@ -393,7 +572,7 @@ def liftover(
     reflen = len(ref)
     altlen = len(alt) if alt else 1
     if reflen == 1 and altlen == 1:
-        converted = liftover_one_pos(chrom, pos, lifter=lifter)
+        converted = _liftover_one_pos(convert, chrom, pos)
         if converted is None:
             raise LiftoverFailure("Liftover failure")
         newchrom = converted[0]
@@ -401,8 +580,8 @@ def liftover(
     elif reflen >= 1 and altlen == 0:  # del
         pos1 = pos
         pos2 = pos + reflen - 1
-        converted1 = liftover_one_pos(chrom, pos1, lifter=lifter)
-        converted2 = liftover_one_pos(chrom, pos2, lifter=lifter)
+        converted1 = _liftover_one_pos(convert, chrom, pos1)
+        converted2 = _liftover_one_pos(convert, chrom, pos2)
         if converted1 is None or converted2 is None:
             raise LiftoverFailure("Liftover failure")
         newchrom = converted1[0]
@@ -410,7 +589,7 @@ def liftover(
         newpos2 = converted2[1]
         newpos = min(newpos1, newpos2)
     elif reflen == 0 and altlen >= 1:  # ins
-        converted = liftover_one_pos(chrom, pos, lifter=lifter)
+        converted = _liftover_one_pos(convert, chrom, pos)
         if converted is None:
             raise LiftoverFailure("Liftover failure")
         newchrom = converted[0]
@@ -418,8 +597,8 @@ def liftover(
     else:
         pos1 = pos
         pos2 = pos + reflen - 1
-        converted1 = liftover_one_pos(chrom, pos1, lifter=lifter)
-        converted2 = liftover_one_pos(chrom, pos2, lifter=lifter)
+        converted1 = _liftover_one_pos(convert, chrom, pos1)
+        converted2 = _liftover_one_pos(convert, chrom, pos2)
         if converted1 is None or converted2 is None:
             raise LiftoverFailure("Liftover failure")
         newchrom1 = converted1[0]
@@ -443,6 +622,201 @@ def liftover(
     return [newchrom, newpos, newref, newalt]
 
 
+def liftover(
+    chrom: str,
+    pos: int,
+    ref: Optional[str] = None,
+    alt: Optional[str] = None,
+    get_ref: bool = False,
+    lifter=None,
+    source_assembly: Optional[str] = None,
+    wgs_reader=None,
+):
+    """liftover.
+
+    Args:
+        chrom (str): chrom
+        pos (int): pos
+        ref (Optional[str]): ref
+        alt (Optional[str]): alt
+        get_ref (bool): get_ref
+        lifter:
+        source_assembly (Optional[str]): source_assembly
+        wgs_reader:
+    """
+    if not lifter:
+        if not source_assembly:
+            raise ValueError("Either lifter or source_assembly should be given")
+        lifter = get_lifter(source_assembly)
+    if not lifter:
+        raise ValueError(f"LiftOver not found for {source_assembly}")
+    return _liftover(
+        lifter.convert_coordinate,
+        chrom,
+        pos,
+        ref=ref,
+        alt=alt,
+        get_ref=get_ref,
+        wgs_reader=wgs_reader,
+    )
+
+
+def get_liftover_sort_order(chroms: List[str], poss: List[int]) -> List[int]:
+    """get_liftover_sort_order.
+
+    Args:
+        chroms (List[str]): Chromosomes
+        poss (List[int]): Positions
+
+    Returns:
+        Indices of the input sorted by (chromosome, position). Records with
+        a missing chromosome or an invalid position come first, in the input
+        order, so that they fail individually.
+    """
+
+    def get_key(i: int):
+        chrom = chroms[i]
+        if chrom is not None:
+            try:
+                return (1, chrom, int(poss[i]))
+            except (TypeError, ValueError):
+                pass
+        return (0, "", i)
+
+    return sorted(range(len(chroms)), key=get_key)
+
+
+def liftover_one_pos_many(
+    chroms: List[str],
+    poss: List[int],
+    lifter=None,
+    source_assembly: Optional[str] = None,
+) -> List[Optional[Tuple[str, int]]]:
+    """liftover_one_pos_many.
+
+    Args:
+        chroms (List[str]): Chromosomes
+        poss (List[int]): Positions
+        lifter: liftover.ChainFile instance. Use `oakvar.get_lifter` to get one.
+        source_assembly (Optional[str]): Genome assembly of input.
+            If `lifter` is given, this parameter will be ignored.
+
+    Returns:
+        (chromosome, position) or `None` for each input position, in the input order.
+    """
+    if not lifter:
+        if not source_assembly:
+            raise ValueError("Either lifter or source_assembly should be given")
+        lifter = get_lifter(source_assembly)
+    if not lifter:
+        raise ValueError(f"LiftOver not found for {source_assembly}")
+    convert = lifter.convert_coordinate
+    converteds: List[Optional[Tuple[str, int]]] = [None] * len(chroms)
+    for i, chrom in enumerate(chroms):
+        if chrom is None:
+            continue
+        try:
+            pos = int(poss[i])
+        except (TypeError, ValueError):
+            continue
+        converteds[i] = _liftover_one_pos(convert, chrom, pos)
+    return converteds
+
+
+def get_liftover_many_errors(
+    chroms: List[str],
+    poss: List[int],
+    refs: Optional[List[Optional[str]]] = None,
+    alts: Optional[List[Optional[str]]] = None,
+    get_ref: bool = False,
+    lifter=None,
+    source_assembly: Optional[str] = None,
+    wgs_reader=None,
+) -> Tuple[List[Optional[list]], List[Optional[Exception]]]:
+    """get_liftover_many_errors.
+
+    Same as `liftover_many` but returns the exception raised for each failed
+    variant instead of a failure mask.
+    """
+    from oakvar.lib.exceptions import LiftoverFailure
+
+    if not lifter:
+        if not source_assembly:
+            raise ValueError("Either lifter or source_assembly should be given")
+        lifter = get_lifter(source_assembly)
+    if not lifter:
+        raise ValueError(f"LiftOver not found for {source_assembly}")
+    if not wgs_reader and (refs is not None or get_ref):
+        wgs_reader = get_wgs_reader()
+    convert = lifter.convert_coordinate
+    num_variants = len(chroms)
+    lifteds: List[Optional[list]] = [None] * num_variants
+    errors: List[Optional[Exception]] = [None] * num_variants
+    for i in get_liftover_sort_order(chroms, poss):
+        try:
+            if chroms[i] is None:
+                raise LiftoverFailure("Liftover failure: no chromosome")
+            try:
+                pos = int(poss[i])
+            except (TypeError, ValueError):
+                raise LiftoverFailure(f"Liftover failure: invalid position {poss[i]}")
+            lifteds[i] = _liftover(
+                convert,
+                chroms[i],
+                pos,
+                ref=refs[i] if refs is not None else None,
+                alt=alts[i] if alts is not None else None,
+                get_ref=get_ref,
+                wgs_reader=wgs_reader,
+            )
+        except Exception as e:
+            errors[i] = e
+    return lifteds, errors
+
+
+def liftover_many(
+    chroms: List[str],
+    poss: List[int],
+    refs: Optional[List[Optional[str]]] = None,
+    alts: Optional[List[Optional[str]]] = None,
+    get_ref: bool = False,
+    lifter=None,
+    source_assembly: Optional[str] = None,
+    wgs_reader=None,
+) -> Tuple[List[Optional[list]], List[bool]]:
+    """liftover_many.
+
+    Lifts over a batch of variants in one call. Variants are processed in
+    (chromosome, position) order so that reference lookups are local, and
+    results are returned in the input order.
+
+    Args:
+        chroms (List[str]): Chromosomes
+        poss (List[int]): Positions
+        refs (Optional[List[Optional[str]]]): Reference bases
+        alts (Optional[List[Optional[str]]]): Alternate bases
+        get_ref (bool): get_ref
+        lifter: liftover.ChainFile instance. Use `oakvar.get_lifter` to get one.
+        source_assembly (Optional[str]): Genome assembly of input.
+            If `lifter` is given, this parameter will be ignored.
+        wgs_reader:
+
+    Returns:
+        ([chrom, pos, ref, alt] or `None` for each variant, failure mask)
+    """
+    lifteds, errors = get_liftover_many_errors(
+        chroms,
+        poss,
+        refs=refs,
+        alts=alts,
+        get_ref=get_ref,
+        lifter=lifter,
+        source_assembly=source_assembly,
+        wgs_reader=wgs_reader,
+    )
+    return lifteds, [e is not None for e in errors]
+
+
 def get_wgs_reader(assembly="hg38"):
     """get_wgs_reader.
 
@@ -458,3 +832,113 @@ def get_wgs_reader(assembly="hg38"):
         wgs = ModuleClass()
         wgs.setup()
     return wgs
+
+
+class CachedWgsReader:
+    """CachedWgsReader.
+
+    Wraps a wgs reader module (e.g. hg38wgs) and serves `get_bases` from
+    fixed-size blocks of reference sequence, so that lookups for sorted input
+    turn into sequential block reads instead of one tiny read per variant.
+    Blocks are evicted in LRU order by (chrom, block number).
+    """
+
+    def __init__(self, wgs_reader, block_size: int = 4096, max_blocks: int = 1024):
+        """__init__.
+
+        Args:
+            wgs_reader: wgs reader module instance. Use `oakvar.get_wgs_reader` to get one.
+            block_size (int): Number of bases read per block
+            max_blocks (int): Maximum number of blocks kept in memory
+        """
+        from collections import OrderedDict
+        from threading import Lock
+
+        self.wgs_reader = wgs_reader
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.blocks: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self.lock = Lock()
+        self.block_read_supported: bool = True
+
+    def __getattr__(self, name):
+        if name == "wgs_reader":
+            raise AttributeError(name)
+        return getattr(self.wgs_reader, name)
+
+    def get_block(self, chrom: str, block_no: int) -> str:
+        """get_block.
+
+        Args:
+            chrom (str): Chromosome
+            block_no (int): 0-based block number
+
+        Returns:
+            Sequence of the block. Shorter than `block_size` at the end of a chromosome.
+        """
+        key = (chrom, block_no)
+        with self.lock:
+            block = self.blocks.get(key)
+            if block is not None:
+                self.blocks.move_to_end(key)
+                return block
+        start = block_no * self.block_size + 1
+        end = start + self.block_size - 1
+        block = self.wgs_reader.get_bases(chrom, start, end) or ""
+        with self.lock:
+            self.blocks[key] = block
+            if len(self.blocks) > self.max_blocks:
+                self.blocks.popitem(last=False)
+        return block
+
+    def get_bases(self, chrom: str, start: int, end: Optional[int] = None) -> str:
+        """get_bases.
+
+        Args:
+            chrom (str): Chromosome
+            start (int): 1-based start position
+            end (Optional[int]): 1-based end position (inclusive). Defaults to `start`.
+
+        Returns:
+            Reference bases between `start` and `end`.
+        """
+        start = int(start)
+        end = start if end is None else int(end)
+        if not self.block_read_supported or end - start + 1 > self.block_size:
+            return self.wgs_reader.get_bases(chrom, start, end)
+        first_block_no = (start - 1) // self.block_size
+        last_block_no = (end - 1) // self.block_size
+        try:
+            seq = "".join(
+                [
+                    self.get_block(chrom, block_no)
+                    for block_no in range(first_block_no, last_block_no + 1)
+                ]
+            )
+        except TypeError:
+            self.block_read_supported = False
+            return self.wgs_reader.get_bases(chrom, start, end)
+        offset = start - 1 - first_block_no * self.block_size
+        return seq[offset : offset + end - start + 1]
+
+    def clear(self):
+        """clear.
+        """
+        with self.lock:
+            self.blocks.clear()
+
+
+def get_cached_wgs_reader(
+    assembly="hg38", block_size: int = 4096, max_blocks: int = 1024
+) -> Optional[CachedWgsReader]:
+    """get_cached_wgs_reader.
+
+    Args:
+        assembly:
+        block_size (int): Number of bases read per block
+        max_blocks (int): Maximum number of blocks kept in memory
+    """
+    wgs = get_wgs_reader(assembly=assembly)
+    if wgs is None:
+        return None
+    return CachedWgsReader(wgs, block_size=block_size, max_blocks=max_blocks)
@@ -0,0 +1,192 @@
+"""The shared all_mappings parser gives the same results as the per-stage
+parsing it replaced."""
+from json import dumps
+from random import Random
+
+import pytest
+
+from oakvar.lib.util.bench import BENCH_SO_SUBS
+from oakvar.lib.util.bench import BENCH_SO_TERMS
+from oakvar.lib.util.bench import make_all_mappings
+from oakvar.lib.util.inout import get_all_mappings_parser
+
+
+def parse_all_mappings_per_stage(s):
+    """Decodes an all_mappings value and parses the changes of all its
+    mappings, as each stage did before the stages shared a lazy parser.
+    Returns the genes and a (gene, transcript, so, tchange, tref, tpos_start,
+    talt, achange, aref, apos_start, aalt, protein) tuple for each mapping."""
+    from re import compile
+    from json import loads
+    from collections import OrderedDict
+    from oakvar.lib.util.inout import TCHANGE_RE
+    from oakvar.lib.util.inout import ACHANGE_RE
+
+    d = loads(s, object_pairs_hook=OrderedDict)
+    mappings = []
+    for gene, ts in d.items():
+        for t in ts:
+            [protein, achange, so, transcript, tchange] = [
+                "" if v is None else v for v in t[:5]
+            ]
+            tchange_match = compile(TCHANGE_RE.pattern).match(tchange)
+            achange_match = compile(ACHANGE_RE.pattern).match(achange)
+            tref, tpos_start, talt = (
+                (
+                    tchange_match.group(1),
+                    int(tchange_match.group(2)),
+                    tchange_match.group(3),
+                )
+                if tchange_match
+                else (None, None, None)
+            )
+            aref, apos_start, aalt = (
+                (
+                    achange_match.group(1),
+                    int(achange_match.group(2)),
+                    achange_match.group(3),
+                )
+                if achange_match
+                else (None, None, None)
+            )
+            mappings.append(
+                (
+                    gene,
+                    transcript,
+                    so,
+                    tchange,
+                    tref,
+                    tpos_start,
+                    talt,
+                    achange,
+                    aref,
+                    apos_start,
+                    aalt,
+                    protein,
+                )
+            )
+    return list(d.keys()), mappings
+
+
+def substitute_all_mappings_sos_per_stage(s, subs):
+    """SO substitution of the reporter before it used the shared parser."""
+    from json import loads
+    from json import dumps
+
+    mappings = loads(s)
+    for gene in mappings:
+        for i in range(len(mappings[gene])):
+            sos = mappings[gene][i][2].split(",")
+            sos = [subs.get(so, so) for so in sos]
+            mappings[gene][i][2] = ",".join(sos)
+    return dumps(mappings)
+
+
+def stringify_all_mappings_per_stage(s):
+    """all_mappings text of the reporter before it used the shared parser."""
+    from json import loads
+
+    newvals = []
+    for hugo, ts in loads(s).items():
+        for maprow in ts:
+            if len(maprow) == 5:
+                [protid, protchange, so, transcript, rnachange] = maprow
+                exonno = ""
+            else:
+                [protid, protchange, so, transcript, rnachange, exonno] = maprow
+            newvals.append(
+                f"{transcript}:{hugo}:{'(na)' if protid is None else protid}:{so}:"
+                + f"{'(na)' if protchange is None else protchange}:"
+                + f"{'(na)' if rnachange is None else rnachange}:{exonno}"
+            )
+    newvals.sort()
+    return "; ".join(newvals)
+
+
+def get_values():
+    rng = Random(0)
+    values = [
+        make_all_mappings(
+            rng, f"GENE{i % 7}", rng.choice(BENCH_SO_TERMS), rng.randint(1, 20)
+        )
+        for i in range(200)
+    ]
+    values += [
+        dumps({}),
+        # Several genes, SO lists and missing fields
+        dumps(
+            {
+                "KRAS": [
+                    ["ENSP1", "p.Gly12Asp", "MIS,SPL", "ENST1.1", "c.35G>A", 2],
+                    [None, None, "INT", "ENST2.1", None, ""],
+                ],
+                "ABC": [["ENSP3", "p.*100Glnext*?", "STL", "ENST3.1", "c.300T>C", 9]],
+            }
+        ),
+        # Rows of 5 fields, written before the exon number was added
+        dumps({"TP53": [["ENSP4", "p.Arg175His", "MIS", "ENST4.1", "c.524G>A"]]}),
+        # Changes which the change regexes parse
+        dumps({"G": [["P", "Ala12Val", "MIS", "T", "AC12TG", 1]]}),
+    ]
+    return values
+
+
+@pytest.mark.parametrize("s", get_values())
+def test_shared_parser_matches_per_stage_parse(s):
+    genes, mappings = parse_all_mappings_per_stage(s)
+    parser = get_all_mappings_parser(s)
+    assert parser.get_genes() == genes
+    assert [
+        (
+            m.gene,
+            m.transcript,
+            m.so,
+            m.tchange,
+            m.tref,
+            m.tpos_start,
+            m.talt,
+            m.achange,
+            m.aref,
+            m.apos_start,
+            m.aalt,
+            m.protein,
+        )
+        for m in parser.mappings
+    ] == mappings
+    sos = list(dict.fromkeys([so for m in mappings for so in m[2].split(",")]))
+    assert parser.get_uniq_sos() == sos
+    assert parser.get_report_string() == stringify_all_mappings_per_stage(s)
+    substituted = substitute_all_mappings_sos_per_stage(s, BENCH_SO_SUBS)
+    sub_parser = parser.substitute_sos(BENCH_SO_SUBS)
+    assert sub_parser.to_json() == substituted
+    assert get_all_mappings_parser(substituted).get_data() is sub_parser.get_data()
+    assert sub_parser.get_report_string() == stringify_all_mappings_per_stage(
+        substituted
+    )
+
+
+def test_parsers_share_data():
+    s = get_values()[0]
+    parser = get_all_mappings_parser(s)
+    assert get_all_mappings_parser(s) is not parser
+    assert get_all_mappings_parser(s).get_data() is parser.get_data()
+
+
+def test_changing_a_parser_does_not_change_others():
+    s = get_values()[-3]
+    parser = get_all_mappings_parser(s)
+    genes = parser.get_genes()
+    report_string = parser.get_report_string()
+    num_mappings = len(parser.mappings)
+    parser.mappings[0].so = "changed"
+    parser.mappings.clear()
+    parser._d["KRAS"].append(["ENSP9", None, "SYN", "ENST9.1", None, 1])
+    parser._d["KRAS"][0][2] = "changed"
+    parser._d["NEW"] = []
+    other = get_all_mappings_parser(s)
+    assert other.get_genes() == genes
+    assert len(other.mappings) == num_mappings
+    assert other.mappings[0].so == "MIS,SPL"
+    assert other._d["KRAS"][0][2] == "MIS,SPL"
+    assert len(other._d["KRAS"]) == 2
+    assert other.get_report_string() == report_string
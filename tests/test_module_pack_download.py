@@ -0,0 +1,228 @@
+"""Download and extraction of split module packs from a local HTTP server."""
+import io
+import random
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from json import dumps
+
+import pytest
+
+from oakvar.lib.exceptions import ModuleInstallationError
+from oakvar.lib.module import download_and_extract_code_or_data
+from oakvar.lib.module import get_download_zipfile_path
+from oakvar.lib.module import get_module_pack_part_paths
+from oakvar.lib.store import consts as store_consts
+
+PART_SIZE = 4096
+MODULE_NAME = "testmodule"
+VERSION = "1.0.0"
+KIND = "data"
+
+
+def make_pack():
+    """Returns the members and the parts of a split zip whose central
+    directory is in the last part."""
+    rng = random.Random(0)
+    members = {
+        "testmodule/data/first.txt": rng.randbytes(1000),
+        "testmodule/data/big.bin": rng.randbytes(5 * PART_SIZE),
+        "testmodule/data/sub/mid.bin": rng.randbytes(2 * PART_SIZE + 123),
+        "testmodule/data/last.txt": rng.randbytes(300),
+    }
+    pad_size = 0
+    while True:
+        members["testmodule/data/pad.bin"] = b"0" * pad_size
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+            for name, data in members.items():
+                zf.writestr(name, data)
+            start_dir = buf.tell()
+        pack = buf.getvalue()
+        # Pads the last member so that the central directory does not span
+        # two parts.
+        if start_dir % PART_SIZE + len(pack) - start_dir <= PART_SIZE:
+            break
+        pad_size += PART_SIZE - start_dir % PART_SIZE
+    parts = [pack[i : i + PART_SIZE] for i in range(0, len(pack), PART_SIZE)]
+    return members, parts
+
+
+class PackServer:
+    """Serves the parts of a module pack and records the requests. Range
+    requests are supported so that partial downloads can resume."""
+
+    def __init__(self, parts):
+        self.parts = {f"part{i:03d}": data for i, data in enumerate(parts)}
+        self.bodies = {}
+        self.before_send = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                name = self.path.strip("/")
+                data = server.bodies.get(name, server.parts.get(name))
+                if data is None:
+                    self.send_error(404)
+                    return
+                # Only the requests of the body download carry this agent.
+                is_body = self.headers.get("User-Agent") == "oakvar"
+                range_header = self.headers.get("Range")
+                if is_body:
+                    server.start_request(name, range_header)
+                try:
+                    if is_body:
+                        hook = server.before_send.get(name)
+                        if hook:
+                            hook()
+                        time.sleep(0.05)
+                    start = 0
+                    if range_header:
+                        start = int(range_header.split("=")[1].split("-")[0])
+                        self.send_response(206)
+                        self.send_header(
+                            "Content-Range",
+                            f"bytes {start}-{len(data) - 1}/{len(data)}",
+                        )
+                    else:
+                        self.send_response(200)
+                    self.send_header("Content-Length", str(len(data) - start))
+                    self.end_headers()
+                    self.wfile.write(data[start:])
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    if is_body:
+                        server.end_request()
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start_request(self, name, range_header):
+        with self.lock:
+            self.requests.append((name, range_header))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def end_request(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def requested(self):
+        return [name for name, _ in self.requests]
+
+    @property
+    def urls(self):
+        port = self.httpd.server_address[1]
+        return dumps([f"http://127.0.0.1:{port}/{name}" for name in self.parts])
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def pack(monkeypatch):
+    monkeypatch.setattr(store_consts, "MODULE_PACK_SPLIT_FILE_SIZE", PART_SIZE)
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    monkeypatch.setenv("no_proxy", "127.0.0.1")
+    return make_pack()
+
+
+def download_and_extract(urls, temp_dir):
+    return download_and_extract_code_or_data(
+        urls=urls,
+        module_name=MODULE_NAME,
+        version=VERSION,
+        kind=KIND,
+        temp_dir=temp_dir,
+    )
+
+
+def get_part_paths(temp_dir, num_parts):
+    zipfile_path = get_download_zipfile_path(MODULE_NAME, VERSION, temp_dir, KIND)
+    return get_module_pack_part_paths(zipfile_path, num_parts)
+
+
+def assert_extracted(temp_dir, members):
+    for name, data in members.items():
+        assert (temp_dir / name).read_bytes() == data
+
+
+def test_parts_are_fetched_concurrently_and_extracted_while_downloading(
+    pack, tmp_path
+):
+    members, parts = pack
+    first_member = tmp_path / "testmodule/data/first.txt"
+    seen = {}
+
+    def wait_for_first_member():
+        # Holds back the last part served until the first member, which is
+        # in the first part, has been extracted.
+        deadline = time.time() + 10
+        while not first_member.exists() and time.time() < deadline:
+            time.sleep(0.01)
+        seen["first_member"] = first_member.exists()
+
+    with PackServer(parts) as server:
+        server.before_send[f"part{len(parts) - 2:03d}"] = wait_for_first_member
+        assert download_and_extract(server.urls, tmp_path)
+    assert seen["first_member"]
+    assert server.max_in_flight > 1
+    # The last part, which holds the central directory, is in the first round
+    # of requests.
+    first_round = server.requested()[: store_consts.MODULE_PACK_DOWNLOAD_WORKERS]
+    assert f"part{len(parts) - 1:03d}" in first_round
+    assert sorted(server.requested()) == sorted(server.parts)
+    assert_extracted(tmp_path, members)
+    for part_path in get_part_paths(tmp_path, len(parts)):
+        assert not (tmp_path / part_path).exists()
+
+
+def test_finished_and_partial_parts_are_resumed(pack, tmp_path):
+    members, parts = pack
+    part_paths = get_part_paths(tmp_path, len(parts))
+    with open(part_paths[1], "wb") as wf:
+        wf.write(parts[1])
+    with open(part_paths[2] + ".part", "wb") as wf:
+        wf.write(parts[2][: PART_SIZE // 2])
+    with PackServer(parts) as server:
+        assert download_and_extract(server.urls, tmp_path)
+    assert "part001" not in server.requested()
+    assert ("part002", f"bytes={PART_SIZE // 2}-") in server.requests
+    assert_extracted(tmp_path, members)
+
+
+def test_failed_part_is_fetched_again_on_retry(pack, tmp_path):
+    members, parts = pack
+    with PackServer(parts) as server:
+        # A truncated part has the wrong size for a non-last part.
+        server.bodies["part002"] = parts[2][:-100]
+        with pytest.raises(ModuleInstallationError):
+            download_and_extract(server.urls, tmp_path)
+        part_paths = get_part_paths(tmp_path, len(parts))
+        assert not (tmp_path / part_paths[2]).exists()
+        finished = [
+            f"part{i:03d}"
+            for i, part_path in enumerate(part_paths)
+            if (tmp_path / part_path).exists()
+        ]
+        del server.bodies["part002"]
+        server.requests.clear()
+        assert download_and_extract(server.urls, tmp_path)
+    assert "part002" in server.requested()
+    assert not set(finished) & set(server.requested())
+    assert_extracted(tmp_path, members)
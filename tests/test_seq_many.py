@@ -0,0 +1,76 @@
+"""Batch base normalization in oakvar.lib.util.seq gives the same results as
+the per-variant functions."""
+import re
+
+import pytest
+
+from oakvar.lib.util.seq import normalize_variant_left
+from oakvar.lib.util.seq import normalize_variants_left
+from oakvar.lib.util.seq import trim_variants_many
+from oakvar.lib.util.seq import fullmatch_many
+from oakvar.lib.base.vcf2vcf import VCF2VCF
+from oakvar.lib.base.master_converter import base_re
+
+hypothesis = pytest.importorskip("hypothesis")
+given = hypothesis.given
+settings = hypothesis.settings
+st = hypothesis.strategies
+
+# Few letters so that common prefixes and suffixes are frequent.
+bases = st.one_of(
+    st.text(alphabet="AC", max_size=8),
+    st.text(alphabet="ACGT", min_size=1, max_size=40),
+    st.sampled_from(["", ".", "-", "*", "N", "a"]),
+)
+
+
+@st.composite
+def variants(draw):
+    ref = draw(bases)
+    kind = draw(st.sampled_from(["any", "same", "inner", "outer"]))
+    if kind == "same":
+        alt = ref
+    elif kind == "inner":
+        start = draw(st.integers(min_value=0, max_value=len(ref)))
+        end = draw(st.integers(min_value=start, max_value=len(ref)))
+        alt = ref[:start] + draw(bases) + ref[end:]
+    elif kind == "outer":
+        alt = draw(bases) + ref + draw(bases)
+    else:
+        alt = draw(bases)
+    pos = draw(st.integers(min_value=1, max_value=250_000_000))
+    return pos, ref, alt
+
+
+variant_lists = st.lists(variants(), max_size=50)
+
+
+def unzip(vs):
+    return [v[0] for v in vs], [v[1] for v in vs], [v[2] for v in vs]
+
+
+@settings(max_examples=300, deadline=None)
+@given(variant_lists, st.sampled_from(["+", "-", "?"]))
+def test_normalize_variants_left(vs, strand):
+    poss, refs, alts = unzip(vs)
+    expected = [normalize_variant_left(strand, p, r, a) for p, r, a in vs]
+    got = list(zip(*normalize_variants_left(strand, poss, refs, alts)))
+    assert got == [tuple(v) for v in expected]
+
+
+@settings(max_examples=300, deadline=None)
+@given(variant_lists)
+def test_trim_variants_many(vs):
+    poss, refs, alts = unzip(vs)
+    expected = [VCF2VCF.trim_variant(None, p, r, a) for p, r, a in vs]
+    got = list(zip(*trim_variants_many(poss, refs, alts)))
+    assert got == expected
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(st.one_of(st.none(), bases), max_size=50))
+def test_fullmatch_many(values):
+    for pattern in [base_re.pattern, "^[*]|[ATGC]+|[-]+$"]:
+        p = re.compile(pattern)
+        expected = [v is not None and bool(p.fullmatch(v)) for v in values]
+        assert fullmatch_many(pattern, values) == expected
@@ -0,0 +1,105 @@
+"""vcf2vcf annotates an input in parallel chunks with the same output as a
+single-worker run."""
+import random
+
+import pytest
+
+from oakvar.lib.base import vcf2vcf
+from oakvar.lib.module import cache as module_cache
+from oakvar.lib.util.util import load_class
+
+MAPPER = """from oakvar import BaseMapper
+
+
+class Mapper(BaseMapper):
+    def setup(self):
+        pass
+
+    def map(self, crv_data):
+        d = dict(crv_data)
+        d.update({"hugo": "G" + str(d["pos"] % 7), "so": "MIS"})
+        return d
+"""
+
+ANNOTATOR = """from oakvar import BaseAnnotator
+
+
+class Annotator(BaseAnnotator):
+    def annotate(self, input_data, secondary_data=None):
+        return {"score": input_data["pos"] / 1000.0}
+"""
+
+ANNOTATOR_YML = """title: Test annotator
+version: 1.0.0
+type: annotator
+level: variant
+output_columns:
+- name: score
+  title: Score
+  type: float
+"""
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    modules_dir = tmp_path / "modules"
+    mapper_dir = modules_dir / "mappers" / "testmapper"
+    mapper_dir.mkdir(parents=True)
+    (mapper_dir / "testmapper.py").write_text(MAPPER)
+    (mapper_dir / "testmapper.yml").write_text(
+        "title: Test mapper\nversion: 1.0.0\ntype: mapper\nlevel: variant\n"
+    )
+    annotator_dir = modules_dir / "annotators" / "testannot"
+    annotator_dir.mkdir(parents=True)
+    (annotator_dir / "testannot.py").write_text(ANNOTATOR)
+    (annotator_dir / "testannot.yml").write_text(ANNOTATOR_YML)
+    sys_conf_path = tmp_path / "system.yml"
+    sys_conf_path.write_text(
+        f"root_dir: {tmp_path}\nconf_dir: {tmp_path}\nmodules_dir: {modules_dir}\n"
+    )
+    monkeypatch.setenv("OV_SYS_CONF_PATH", str(sys_conf_path))
+    monkeypatch.setattr(module_cache, "module_cache", None)
+
+
+def write_vcf(path, num_lines):
+    rng = random.Random(0)
+    lines = ["##fileformat=VCFv4.2\n"]
+    lines.append("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n")
+    for i in range(num_lines):
+        alts = ",".join(rng.sample("CGT", rng.randint(1, 2)))
+        lines.append(f"chr1\t{1000 + i * 10}\t.\tA\t{alts}\t.\t.\t.\n")
+    path.write_text("".join(lines))
+
+
+def run_vcf2vcf(input_path, run_name, num_workers):
+    Module = load_class(vcf2vcf.__file__, "VCF2VCF")
+    m = Module(
+        inputs=[str(input_path)],
+        run_name=run_name,
+        output_dir=str(input_path.parent),
+        annotator_names=["testannot"],
+        mapper_name="testmapper",
+        num_workers=num_workers,
+    )
+    m.chunk_size = 4096
+    ran_parallel = []
+    run_file_parallel = m.run_file_parallel
+
+    def record_run_file_parallel(p, wf):
+        ret = run_file_parallel(p, wf)
+        ran_parallel.append(ret)
+        return ret
+
+    m.run_file_parallel = record_run_file_parallel
+    m.run()
+    return (input_path.parent / (run_name + ".vcf")).read_text(), ran_parallel
+
+
+def test_parallel_output_matches_single_worker(modules, tmp_path):
+    input_path = tmp_path / "input.vcf"
+    write_vcf(input_path, 2000)
+    single, _ = run_vcf2vcf(input_path, "single", 1)
+    parallel, ran_parallel = run_vcf2vcf(input_path, "parallel", 2)
+    assert ran_parallel == [True]
+    assert "OV_testannot__score=" in single
+    assert parallel == single
@@ -1,6 +1,8 @@
 params.module = ""
 //enter your desired output directory using --outputdir parameter in the command line
 params.outputdir = "."
+//number of shards to run in parallel. Use --shards 1 for a single ov run.
+params.shards = 4
 //Generate input file
 process examplefile{
     publishDir params.outputdir, mode: 'copy'
@@ -21,20 +23,47 @@ process install_module{
     ov module install -y $module
     """
 }
-//task for ov run
-process ov_run{
-    stageInMode 'copy'
+//task to split the input into shards
+process ov_scatter{
+    input:
+    path input_file
+
+    script:
+    """
+    ov run $input_file -t vcf --scatter ${params.shards} -d .
+    """
+    output:
+    path "${input_file}.scatter.json"
+}
+//task to run a shard from conversion to post-aggregation
+process ov_shard{
+    input:
+    path input_file
+    path manifest
+    each shard_no
+
+    script:
+    """
+    ov run $input_file --shard $manifest $shard_no -d .
+    """
+    output:
+    path "${input_file}.shard${shard_no}.sqlite"
+}
+//task to merge the shard results and make the reports
+process ov_gather{
     publishDir params.outputdir , mode: 'copy'
     input:
-    path example_file
+    path input_file
+    path manifest
+    path shard_sqlite_files
 
     script:
     """
-    ov run $example_file -t vcf 
+    ov run --gather $manifest -d .
     """
     output:
-    path "${example_file}.sqlite"
-    path "${example_file}.vcf"
+    path "${input_file}.sqlite"
+    path "${input_file}.vcf"
 }
 //task for ov report
 process ov_report{
@@ -53,7 +82,10 @@ process ov_report{
 
 workflow{
     examplefile()
-    (sqlite_file, vcf_file) = ov_run(examplefile.out)
+    manifest = ov_scatter(examplefile.out)
+    shard_nos = manifest.map { new groovy.json.JsonSlurper().parse(it).shards.collect { it.shard_no } }
+    shard_sqlite_files = ov_shard(examplefile.out, manifest, shard_nos)
+    (sqlite_file, vcf_file) = ov_gather(examplefile.out, manifest, shard_sqlite_files.collect())
     ov_report(sqlite_file)
     //if you wish to install an oakvar module , uncomment the following line of code
     //install_module(params.module)